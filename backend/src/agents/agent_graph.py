@@ -6,10 +6,10 @@ from langchain_core.messages import SystemMessage, BaseMessage, HumanMessage
 from langgraph.graph import StateGraph, END
 from agents.agent_utils import extract_json, PlanState
 import agents.agent_utils as agent_utils
-from agents.goal_agent import run_goal_formulator
-from agents.motivator_agent import run_resilience_coach
-from agents.milestone_agent import run_milestone_formulator
-from agents.orchestrator_agent import run_orchestrator
+from agents.goal_agent import run_goal_formulator, arun_goal_formulator
+from agents.motivator_agent import run_resilience_coach, arun_resilience_coach
+from agents.milestone_agent import run_milestone_formulator, arun_milestone_formulator
+from agents.orchestrator_agent import run_orchestrator, arun_orchestrator
 
 # --- Routing Functions ---
 
@@ -50,19 +50,43 @@ def entry_gate(state: PlanState):
     return state.get("stage", agent_utils.ORCHESTRATOR)
 
 
-# --- 3. The Factory Function ---
+# --- 3. The Factory Functions ---
 def build_goal_app(checkpointer):
     """
     Constructs and compiles the graph with a specific checkpointer.
     Returns the runnable 'app'.
     """
+    return _build_workflow(
+        {
+            agent_utils.GOAL_FORMULATOR: run_goal_formulator,
+            agent_utils.MILESTONE_FORMULATOR: run_milestone_formulator,
+            agent_utils.RESILIENCE_COACH: run_resilience_coach,
+            agent_utils.ORCHESTRATOR: run_orchestrator,
+        }
+    ).compile(checkpointer=checkpointer)
+
+
+def build_async_goal_app(checkpointer):
+    """
+    Same graph with async nodes, to be driven with ainvoke/astream.
+    LLM and DynamoDB calls are awaited, so one worker can serve many chats.
+    """
+    return _build_workflow(
+        {
+            agent_utils.GOAL_FORMULATOR: arun_goal_formulator,
+            agent_utils.MILESTONE_FORMULATOR: arun_milestone_formulator,
+            agent_utils.RESILIENCE_COACH: arun_resilience_coach,
+            agent_utils.ORCHESTRATOR: arun_orchestrator,
+        }
+    ).compile(checkpointer=checkpointer)
+
+
+def _build_workflow(nodes: dict) -> StateGraph:
     workflow = StateGraph(PlanState)
 
     # Node Definitions
-    workflow.add_node(agent_utils.GOAL_FORMULATOR, run_goal_formulator)
-    workflow.add_node(agent_utils.MILESTONE_FORMULATOR, run_milestone_formulator)
-    workflow.add_node(agent_utils.RESILIENCE_COACH, run_resilience_coach)
-    workflow.add_node(agent_utils.ORCHESTRATOR, run_orchestrator)
+    for name, node in nodes.items():
+        workflow.add_node(name, node)
 
     # Entry Point
     workflow.set_conditional_entry_point(
@@ -115,4 +139,4 @@ def build_goal_app(checkpointer):
         },
     )
 
-    return workflow.compile(checkpointer=checkpointer)
+    return workflow
@@ -1,9 +1,15 @@
 # agent_graph.py
+import functools
 import json
+import logging
 import operator
-from typing import Annotated, TypedDict, Optional, List
+from typing import Annotated, Any, Dict, TypedDict, Optional, List, Tuple
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import SystemMessage, BaseMessage, HumanMessage
+from llms.openai_api import low_reasoning_gpt5mini, alow_reasoning_gpt5mini
+from prompts.prompts import CONTEXT_SUMMARY_PROMPT
+
+logger = logging.getLogger(__name__)
 
 
 class AgentMessage(TypedDict):
@@ -12,14 +18,26 @@ class AgentMessage(TypedDict):
 
 
 # --- 1. Define the State ---
+# The whole state is written to the checkpointer after every node, so it holds
+# references, not records: structured_data keeps IDs (goal_id, milestone_ids,
+# tracker_ids) and agents load the objects from storage when they need them.
+# Bump STATE_VERSION whenever the shape changes and teach migrate_state about it.
+STATE_VERSION = 2
+
+
 class PlanState(TypedDict):
+    # Unused; kept so checkpoints written before version 2 still load
     message_history: list[BaseMessage]
+    # Content-only messages (see slim_message), bounded by compact_context
     current_context: list[BaseMessage]
+    # Older current_context turns, folded into one summary (see compact_context)
+    context_summary: str
     last_user_message: HumanMessage
     user_id: str
     structured_data: dict
     stage: str
     to_user: List[AgentMessage]
+    state_version: int
 
 
 # Agent types
@@ -30,74 +48,468 @@ RESILIENCE_COACH = "resilience_coach"
 PLANNER = "planner"
 TRACKING_LOGGER = "tracking_logger"
 
+# Shown when a reply still fails its response model after the repair attempt,
+# so the user knows to retry instead of getting no answer
+PARSE_FAILURE_MESSAGE = (
+    "Sorry, I lost my train of thought there. Could you say that again?"
+)
+
 
 def initialize_state() -> PlanState:
     return PlanState(
         message_history=[],
         current_context=[],
+        context_summary="",
         last_user_message=HumanMessage(content=""),
         user_id="",  # In real app, this would come from auth/session
         structured_data={},
         stage="orchestrator",  # Start at orchestrator
         to_user=[],
+        state_version=STATE_VERSION,
     )
 
 
-# --- 2. Helper: JSON Extractor ---
-import json
-import re
-from typing import Any, Optional
+def slim_message(message: BaseMessage) -> BaseMessage:
+    """
+    A copy with only the role and content. Usage, response metadata and ids
+    are not needed to replay the conversation and would be checkpointed on
+    every step.
+    """
+    return type(message)(content=message.content)
+
+
+def _ref_id(value, attr: str) -> Optional[str]:
+    # Old checkpoints hold Pydantic objects, or dicts if they were deserialized
+    # without the model class
+    return value.get(attr) if isinstance(value, dict) else getattr(value, attr, None)
+
+
+def migrate_state(values: dict) -> Optional[dict]:
+    """
+    Updates that bring a checkpointed thread to STATE_VERSION, or None if it is
+    current. Version 1 (unversioned) kept the Goal, Milestone and Tracker
+    objects in structured_data and raw LLM messages in current_context.
+    """
+    if values.get("state_version", 1) >= STATE_VERSION:
+        return None
+
+    structured_data = dict(values.get("structured_data") or {})
+    goal = structured_data.pop("goal", None)
+    if goal is not None and not structured_data.get("goal_id"):
+        structured_data["goal_id"] = _ref_id(goal, "goal_id")
+    milestones = structured_data.pop("milestones", None)
+    if milestones is not None:
+        structured_data["milestone_ids"] = [
+            _ref_id(m, "milestone_id") for m in milestones
+        ]
+    trackers = structured_data.pop("trackers", None)
+    if trackers is not None:
+        structured_data["tracker_ids"] = [_ref_id(t, "tracker_id") for t in trackers]
+
+    context = values.get("current_context") or []
+    return {
+        "structured_data": structured_data,
+        "current_context": [slim_message(m) for m in context[-MAX_CONTEXT_MESSAGES:]],
+        "message_history": [],
+        "state_version": STATE_VERSION,
+    }
+
+
+def report_parse_failure(state: PlanState, agent: str) -> PlanState:
+    logger.error(f"No valid structured response from {agent}; asking user to retry")
+    state["to_user"].append(AgentMessage(agent=agent, message=PARSE_FAILURE_MESSAGE))
+    return state
+
+
+# --- 2. Bounded context window ---
+# Token budget for each agent's conversation history (summary + verbatim turns).
+# The system prompt and the agent's context messages are fixed per turn and
+# not counted.
+CONTEXT_TOKEN_BUDGETS = {
+    ORCHESTRATOR: 2000,
+    GOAL_FORMULATOR: 4000,
+    MILESTONE_FORMULATOR: 6000,
+    RESILIENCE_COACH: 4000,
+    PLANNER: 4000,
+    TRACKING_LOGGER: 2000,
+}
+DEFAULT_CONTEXT_TOKEN_BUDGET = 4000
+# Most recent turns (a user message and the reply) always kept word for word,
+# budget permitting
+KEEP_LAST_TURNS = 4
+# Turns the window grows past KEEP_LAST_TURNS before it slides, so the summary
+# is recomputed once every SLIDE_TURNS turns rather than on every turn
+SLIDE_TURNS = 3
+
+# Per-message overhead of the chat format (role, separators)
+MESSAGE_TOKEN_OVERHEAD = 4
+# Hard cap on current_context, should the summarizer keep failing
+MAX_CONTEXT_MESSAGES = 4 * (KEEP_LAST_TURNS + SLIDE_TURNS)
+
+
+@functools.lru_cache(maxsize=1)
+def _token_encoding():
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        # The BPE file is downloaded on first use; estimate when that's impossible
+        logger.warning(f"tiktoken unavailable ({e}); estimating token counts")
+        return None
+
+
+def count_tokens(messages: List[BaseMessage]) -> int:
+    encoding = _token_encoding()
+    total = 0
+    for msg in messages:
+        text = msg.content if isinstance(msg.content, str) else str(msg.content)
+        total += MESSAGE_TOKEN_OVERHEAD + (
+            len(encoding.encode(text)) if encoding else len(text) // 4
+        )
+    return total
+
+
+def context_summary_messages(state: PlanState) -> List[BaseMessage]:
+    """The folded-away part of the conversation, to go before current_context."""
+    summary = state.get("context_summary")
+    if not summary:
+        return []
+    return [SystemMessage(content=f"# EARLIER IN THIS CONVERSATION\n{summary}")]
+
+
+def reset_context(state: PlanState):
+    """Clears the conversation when handing over to another agent."""
+    state["current_context"] = []
+    state["context_summary"] = ""
+
+
+def _overflow(state: PlanState, agent: str) -> int:
+    """
+    Number of oldest current_context messages to fold into the summary. Zero
+    until the window holds KEEP_LAST_TURNS + SLIDE_TURNS turns or exceeds the
+    agent's budget; then enough to get back to KEEP_LAST_TURNS turns within
+    budget. Whole turns are folded; the newest message is always kept.
+    """
+    messages = state.get("current_context", [])
+    budget = CONTEXT_TOKEN_BUDGETS.get(agent, DEFAULT_CONTEXT_TOKEN_BUDGET)
+    summary_tokens = count_tokens(context_summary_messages(state))
+    kept_tokens = count_tokens(messages)
+    if (
+        len(messages) <= 2 * (KEEP_LAST_TURNS + SLIDE_TURNS)
+        and summary_tokens + kept_tokens <= budget
+    ):
+        return 0
+
+    evict = max(0, len(messages) - 2 * KEEP_LAST_TURNS)
+    kept_tokens -= count_tokens(messages[:evict])
+    while summary_tokens + kept_tokens > budget and evict < len(messages) - 1:
+        step = min(2, len(messages) - 1 - evict)
+        kept_tokens -= count_tokens(messages[evict : evict + step])
+        evict += step
+    return evict
+
+
+def _summary_request(state: PlanState, evicted: List[BaseMessage]):
+    transcript = "\n\n".join(f"{msg.type}: {msg.content}" for msg in evicted)
+    previous = state.get("context_summary") or "(none)"
+    return [
+        static_system_message(CONTEXT_SUMMARY_PROMPT),
+        HumanMessage(
+            content=f"# PREVIOUS SUMMARY\n{previous}\n\n# NEW TURNS\n{transcript}"
+        ),
+    ]
+
+
+def _fold(state: PlanState, evict: int, response) -> PlanState:
+    if response is None or not response.content:
+        # Keep everything and try again next turn rather than lose turns, up
+        # to the hard cap
+        logger.warning("Context summarization failed; window not compacted")
+        state["current_context"] = state["current_context"][-MAX_CONTEXT_MESSAGES:]
+        return state
+    state["context_summary"] = response.content
+    state["current_context"] = state["current_context"][evict:]
+    logger.info(f"Folded {evict} messages into the context summary")
+    return state
+
+
+def compact_context(state: PlanState, agent: str) -> PlanState:
+    """
+    Keeps current_context within the agent's token budget: turns that slide out
+    of the window are folded into state["context_summary"] together with the
+    previous summary. The summary is only recomputed when the window slides,
+    so most turns make no extra LLM call.
+    """
+    evict = _overflow(state, agent)
+    if not evict:
+        return state
+    evicted = state["current_context"][:evict]
+    response = low_reasoning_gpt5mini(_summary_request(state, evicted), agent="summary")
+    return _fold(state, evict, response)
+
+
+async def acompact_context(state: PlanState, agent: str) -> PlanState:
+    """Async twin of compact_context."""
+    evict = _overflow(state, agent)
+    if not evict:
+        return state
+    evicted = state["current_context"][:evict]
+    response = await alow_reasoning_gpt5mini(
+        _summary_request(state, evicted), agent="summary"
+    )
+    return _fold(state, evict, response)
+
+
+# --- 3. Helper: JSON Extractor ---
+_json_decoder = json.JSONDecoder()
 
 
 def extract_json(content: str) -> Optional[Any]:
     """
-    Robustly extract the largest valid JSON object or array from a string.
-    Handles Markdown code blocks and mixed text.
+    Returns the first complete JSON object or array in a string, wherever it
+    sits: inside a Markdown code block, or between prose that may itself
+    contain braces. Each candidate "{" / "[" is tried with raw_decode, which
+    stops at the end of its value, so nothing after it can break the parse.
     """
     if not content:
         return None
 
-    # 1. Strip Markdown Code Blocks (```json ... ```)
-    # This regex looks for ``` optionally followed by 'json',
-    # capturing the content inside, with DOTALL handling newlines.
-    match = re.search(r"```(?:json)?\s*(.*?)```", content, re.DOTALL)
-    if match:
-        content = match.group(1)
+    start = _next_json_start(content, 0)
+    while start != -1:
+        try:
+            return _json_decoder.raw_decode(content, start)[0]
+        except json.JSONDecodeError:
+            start = _next_json_start(content, start + 1)
+    return None
 
-    # 2. Find the starting positions of { and [
-    start_brace = content.find("{")
-    start_bracket = content.find("[")
 
-    # If neither exists, it's not JSON
-    if start_brace == -1 and start_bracket == -1:
-        return None
+def _next_json_start(content: str, pos: int) -> int:
+    brace, bracket = content.find("{", pos), content.find("[", pos)
+    if brace == -1 or bracket == -1:
+        return max(brace, bracket)
+    return min(brace, bracket)
+
+
+class StreamingJSONExtractor:
+    """
+    Bracket-balancing scanner fed with token deltas as they arrive. It finds the
+    first complete, valid JSON object or array (like extract_json), and exposes
+    top-level string fields while they are still being generated, so e.g.
+    `to_user` can be shown before the model finishes.
+
+        extractor = StreamingJSONExtractor()
+        for delta in stream:
+            extractor.feed(delta)
+            text = extractor.string_field("to_user")  # grows as tokens arrive
+        extractor.value  # the parsed object, once complete
+    """
 
-    # 3. Determine the outer bounds based on which appears first
-    # We prioritize the first occurring character to capture the main block
-    if start_brace != -1 and (start_bracket == -1 or start_brace < start_bracket):
-        start = start_brace
-        end = content.rfind("}") + 1
-    else:
-        start = start_bracket
-        end = content.rfind("]") + 1
-
-    # Validation: Ensure we actually found a start and an end
-    if start == -1 or end == 0:
+    def __init__(self):
+        self.buffer = ""
+        self.value: Optional[Any] = None
+        self.done = False
+        self._pos = 0
+        self._reset_candidate(-1)
+
+    def _reset_candidate(self, start: int):
+        self._start = start  # Offset of the candidate's opening bracket
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        # Top-level object fields: the next string is a key / the last key seen
+        self._expect_key = False
+        self._key: Optional[str] = None
+        self._string_start = -1
+        # key -> (start, end) of its raw string value; end is None while open
+        self._fields: Dict[str, Tuple[int, Optional[int]]] = {}
+
+    def feed(self, delta: str) -> Optional[Any]:
+        """Consumes the next chunk. Returns the value once it is complete."""
+        if self.done:
+            return self.value
+        self.buffer += delta
+        buf = self.buffer
+        pos = self._pos
+        while pos < len(buf):
+            ch = buf[pos]
+            if self._start == -1:
+                if ch in "{[":
+                    self._reset_candidate(pos)
+                    self._depth = 1
+                    self._expect_key = ch == "{"
+                pos += 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._close_string(pos)
+            elif ch == '"':
+                self._in_string = True
+                self._string_start = pos + 1
+                if self._depth == 1 and not self._expect_key and self._key:
+                    self._fields[self._key] = (pos + 1, None)
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    candidate = buf[self._start : pos + 1]
+                    try:
+                        self.value = json.loads(candidate)
+                        self.done = True
+                        self._pos = pos + 1
+                        return self.value
+                    except json.JSONDecodeError:
+                        # Braces in prose; rescan from just after this opener
+                        pos = self._start + 1
+                        self._reset_candidate(-1)
+                        continue
+            elif self._depth == 1 and buf[self._start] == "{":
+                if ch == ":":
+                    self._expect_key = False
+                elif ch == ",":
+                    self._expect_key = True
+                    self._key = None
+            pos += 1
+        self._pos = pos
         return None
 
-    # 4. Extract and Parse
-    json_str = content[start:end]
+    def _close_string(self, pos: int):
+        if self._depth != 1 or self.buffer[self._start] != "{":
+            return
+        raw = self.buffer[self._string_start : pos]
+        if self._expect_key:
+            self._key = _decode_json_string(raw)
+        elif self._key in self._fields:
+            self._fields[self._key] = (self._fields[self._key][0], pos)
+
+    def string_field(self, key: str) -> Optional[str]:
+        """
+        The decoded text of a top-level string field so far, or None if it hasn't
+        started. Complete once the field's closing quote has arrived.
+        """
+        if self.done and isinstance(self.value, dict):
+            value = self.value.get(key)
+            return value if isinstance(value, str) else None
+        span = self._fields.get(key)
+        if span is None:
+            return None
+        start, end = span
+        raw = self.buffer[start : end if end is not None else self._pos]
+        if end is None and self._in_string:
+            raw = _trim_partial_escape(raw)
+        return _decode_json_string(raw)
+
+    def close(self) -> Optional[Any]:
+        """End of stream: falls back to extract_json if no candidate closed."""
+        if not self.done:
+            self.value = extract_json(self.buffer)
+            self.done = True
+        return self.value
+
+
+def _trim_partial_escape(raw: str) -> str:
+    """
+    Drops an escape sequence cut off at the end of a streamed string, or the
+    first half of a surrogate pair whose second half hasn't arrived yet.
+    """
+    trimmed = _trim_last_escape(raw)
+    # "\ud83c\ud" loses both halves of the pair
+    return trimmed if trimmed == raw else _trim_partial_escape(trimmed)
+
+
+def _trim_last_escape(raw: str) -> str:
+    backslash = raw.rfind("\\", max(0, len(raw) - 6))
+    if backslash == -1:
+        return raw
+    run = len(raw[: backslash + 1]) - len(raw[: backslash + 1].rstrip("\\"))
+    if run % 2 == 0:
+        return raw  # An escaped backslash, not the start of an escape
+    sequence = raw[backslash:]
+    if sequence[1:2] != "u":
+        return raw if len(sequence) >= 2 else raw[:backslash]
+    if len(sequence) < 6 or sequence[2:4].lower() in ("d8", "d9", "da", "db"):
+        return raw[:backslash]
+    return raw
 
+
+def _decode_json_string(raw: str) -> str:
     try:
-        return json.loads(json_str)
+        return json.loads(f'"{raw}"')
     except json.JSONDecodeError:
-        # Optional: Add error logging here if needed
-        return None
+        # e.g. half of a surrogate pair; better slightly raw than nothing
+        return raw
 
 
-def fill_prompt_template(template: str, variables: dict):
-    """Function to fill in a prompt template with given variables, written within {{}}"""
-    for key, value in variables.items():
+@functools.lru_cache(maxsize=256)
+def _render_template(template: str, values: Tuple[Tuple[str, str], ...]) -> str:
+    for key, value in values:
         placeholder = "{{" + key + "}}"
-        template = template.replace(placeholder, str(value))
+        template = template.replace(placeholder, value)
     return template
+
+
+def fill_prompt_template(template: str, variables: dict):
+    """Function to fill in a prompt template with given variables, written within {{}}"""
+    # Memoized on the rendered values, so unchanged context isn't rebuilt each turn
+    return _render_template(
+        template, tuple((key, str(value)) for key, value in variables.items())
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def static_system_message(template: str) -> SystemMessage:
+    """
+    A variable-free system prompt, rendered once per process. Every turn sends
+    the exact same bytes, which keeps it a cacheable prompt prefix.
+    """
+    return SystemMessage(content=fill_prompt_template(template, {}))
+
+
+def new_user_messages(state: PlanState) -> List[BaseMessage]:
+    """
+    The turn's user message, unless a node earlier in the same turn (the
+    orchestrator, before routing) already recorded it in current_context.
+    """
+    message = state.get("last_user_message")
+    if not message or not message.content:
+        return []
+    context = state.get("current_context") or []
+    if (
+        context
+        and context[-1].type == "human"
+        and context[-1].content == message.content
+    ):
+        return []
+    return [message]
+
+
+def assemble_context(
+    static_prompt: SystemMessage,
+    variable_context: List[BaseMessage],
+    state: PlanState,
+    user_messages: List[BaseMessage],
+) -> List[BaseMessage]:
+    """
+    Orders a prompt from most to least stable, so the provider's prompt cache
+    matches as long a prefix as possible:
+        static system prompt  (never changes)
+        variable context      (goal info etc.; changes between tasks, not turns)
+        summary               (changes when the window slides, see compact_context)
+        current_context       (append-only between slides)
+        new user message
+    current_context must not yet contain user_messages.
+    """
+    return (
+        [static_prompt]
+        + variable_context
+        + context_summary_messages(state)
+        + state.get("current_context", [])
+        + user_messages
+    )
@@ -1,33 +1,49 @@
 import logging
-from typing import List
+from typing import List, Optional
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import SystemMessage, BaseMessage
 from prompts.prompts import GOAL_FORMULATOR_PROMPT
 from agents.agent_utils import (
-    extract_json,
     fill_prompt_template,
     PlanState,
     AgentMessage,
 )
 import agents.agent_utils as agent_utils
-from persistence.dynamodb_database import DynamoDBHandler
+from persistence.storage import get_storage
+from persistence.async_dynamodb_database import get_async_handler
 from schemas.core_v2 import Goal
-from llms.openai_api import low_reasoning_gpt5mini
+from schemas.comm import GoalFormulatorResponse
+from llms.openai_api import (
+    low_reasoning_gpt5mini_structured,
+    alow_reasoning_gpt5mini_structured,
+)
 
 # Setup logging
 logger = logging.getLogger(__name__)
 
 
-def commit_goal(goal: dict, state: PlanState):
-    repo = DynamoDBHandler(region_name="us-east-1")
-    goal_obj = Goal(
+def build_goal(goal: dict, state: PlanState) -> Goal:
+    return Goal(
         user_id=state["user_id"], what=goal["what"], when=goal["when"], why=goal["why"]
     )
+
+
+def commit_goal(goal: dict, state: PlanState):
+    repo = get_storage(region_name="us-east-1")
+    goal_obj = build_goal(goal, state)
     repo.create_goal(goal_obj)
     logger.info(f"Goal saved to DynamoDB for user {state['user_id']}")
     return goal_obj
 
 
+async def acommit_goal(goal: dict, state: PlanState):
+    repo = get_async_handler(region_name="us-east-1")
+    goal_obj = build_goal(goal, state)
+    await repo.create_goal(goal_obj)
+    logger.info(f"Goal saved to DynamoDB for user {state['user_id']}")
+    return goal_obj
+
+
 def get_next_agent_using_intent(intent: str):
     next_agent = (
         agent_utils.ORCHESTRATOR
@@ -39,33 +55,38 @@ def get_next_agent_using_intent(intent: str):
 
 
 def get_full_context(state: PlanState):
-    system_message = SystemMessage(
-        content=fill_prompt_template(GOAL_FORMULATOR_PROMPT, {})
-    )
+    system_message = agent_utils.static_system_message(GOAL_FORMULATOR_PROMPT)
 
-    context_till_now = state.get("current_context", [])
-    user_messages = [state["last_user_message"]] if state["last_user_message"] else []
+    user_messages = agent_utils.new_user_messages(state)
+
+    full_context = agent_utils.assemble_context(
+        system_message, [], state, user_messages
+    )
 
     # Update local state context
     state["current_context"].extend(user_messages)
-
-    full_context = [system_message] + context_till_now + user_messages
     return full_context, state
 
 
-def update_state_on_response(state: PlanState, response: BaseMessage):
-    try:
-        response_json = extract_json(response.content)
-    except Exception as e:
-        logger.error(f"JSON extraction failed: {e}")
-        response_json = {}
+def apply_response(
+    state: PlanState,
+    response: BaseMessage,
+    parsed: Optional[GoalFormulatorResponse],
+):
+    """
+    Applies an LLM response to the state, short of persisting anything.
+    Returns the goal details to commit once the goal is complete, else None.
+    """
+    if parsed is None:
+        agent_utils.report_parse_failure(state, agent_utils.GOAL_FORMULATOR)
+        return None
 
-    intent = response_json.get("intent")
-    is_complete = response_json.get("is_complete", False)
-    goal_details = response_json.get("goal_details")
-    to_user = response_json.get("to_user")
+    intent = parsed.intent
+    is_complete = parsed.is_complete
+    goal_details = parsed.goal_details.model_dump() if parsed.goal_details else None
+    to_user = parsed.to_user
 
-    state["current_context"].append(response)
+    state["current_context"].append(agent_utils.slim_message(response))
 
     if to_user:
         state["to_user"].append(
@@ -76,12 +97,36 @@ def update_state_on_response(state: PlanState, response: BaseMessage):
         state["stage"] = get_next_agent_using_intent(intent)
 
     if is_complete and goal_details:
-        goal = commit_goal(goal_details, state)
-        state["structured_data"]["goal"] = goal
-        state["stage"] = agent_utils.MILESTONE_FORMULATOR
-        state["current_context"] = []  # Transitioning to new agent
-        logger.info("Goal completion detected. Transitioning to Milestone Formulator.")
+        return goal_details
+    return None
+
+
+def on_goal_committed(state: PlanState, goal: Goal):
+    state["structured_data"]["goal_id"] = goal.goal_id
+    state["stage"] = agent_utils.MILESTONE_FORMULATOR
+    agent_utils.reset_context(state)  # Transitioning to new agent
+    logger.info("Goal completion detected. Transitioning to Milestone Formulator.")
+
 
+def update_state_on_response(
+    state: PlanState,
+    response: BaseMessage,
+    parsed: Optional[GoalFormulatorResponse],
+):
+    goal_details = apply_response(state, response, parsed)
+    if goal_details:
+        on_goal_committed(state, commit_goal(goal_details, state))
+    return state
+
+
+async def aupdate_state_on_response(
+    state: PlanState,
+    response: BaseMessage,
+    parsed: Optional[GoalFormulatorResponse],
+):
+    goal_details = apply_response(state, response, parsed)
+    if goal_details:
+        on_goal_committed(state, await acommit_goal(goal_details, state))
     return state
 
 
@@ -90,13 +135,41 @@ def run_goal_formulator(state: PlanState):
 
     # breakpoint()
 
+    state = agent_utils.compact_context(state, agent_utils.GOAL_FORMULATOR)
     context, updated_state = get_full_context(state)
     # logger.info(f"Context prepared for LLM: {[msg.content for msg in context]}")
-    response = low_reasoning_gpt5mini(context)
+    response, parsed = low_reasoning_gpt5mini_structured(
+        context,
+        GoalFormulatorResponse,
+        agent=agent_utils.GOAL_FORMULATOR,
+        # The chat carries the user's summary and goal details
+        cacheable=False,
+    )
+
+    if response == None:
+        return state
+
+    new_state = update_state_on_response(updated_state, response, parsed)
+    logger.info(f"Transitioning to stage: {new_state.get('stage')}")
+    return new_state
+
+
+async def arun_goal_formulator(state: PlanState):
+    logger.info(f"--- Node: Goal Formulator (async) | User: {state.get('user_id')} ---")
+
+    state = await agent_utils.acompact_context(state, agent_utils.GOAL_FORMULATOR)
+    context, updated_state = get_full_context(state)
+    response, parsed = await alow_reasoning_gpt5mini_structured(
+        context,
+        GoalFormulatorResponse,
+        agent=agent_utils.GOAL_FORMULATOR,
+        # The chat carries the user's summary and goal details
+        cacheable=False,
+    )
 
     if response == None:
         return state
 
-    new_state = update_state_on_response(updated_state, response)
+    new_state = await aupdate_state_on_response(updated_state, response, parsed)
     logger.info(f"Transitioning to stage: {new_state.get('stage')}")
     return new_state
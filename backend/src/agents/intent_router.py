@@ -0,0 +1,316 @@
+"""
+Local fast path for the orchestrator's intent classification.
+
+Most orchestrator turns only decide which agent should take the message next.
+Clear-cut messages ("I want to set a new goal", "I'm so unmotivated") are
+classified here with keyword rules, and optionally a small TF-IDF model loaded
+from disk, in microseconds and without an LLM call. Anything below the
+confidence thresholds returns None and goes to the orchestrator LLM as before.
+
+The rules are scored against tests/intent_fixtures.jsonl by
+tests/intent_router_report.py, which prints accuracy, coverage and latency.
+"""
+
+import json
+import logging
+import math
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Pattern, Tuple
+
+logger = logging.getLogger(__name__)
+
+GOAL_FORMATION = "GOAL_FORMATION"
+MILESTONE_FORMATION = "MILESTONE_FORMATION"
+MOTIVATION = "MOTIVATION"
+DAY_PLANNING = "DAY_PLANNING"
+PROGRESS_TRACKING = "PROGRESS_TRACKING"
+INTENTS = (
+    GOAL_FORMATION,
+    MILESTONE_FORMATION,
+    MOTIVATION,
+    DAY_PLANNING,
+    PROGRESS_TRACKING,
+)
+# Label for messages the router should leave to the LLM (training data only)
+NO_INTENT = "NONE"
+
+# Opt-in: set to "1" to let confident rules route turns without the LLM
+FAST_PATH_ENABLED = os.getenv("GOALPILOT_INTENT_FAST_PATH", "0") == "1"
+# Optional model written by TfidfIntentModel.save()
+INTENT_MODEL_PATH = os.getenv("GOALPILOT_INTENT_MODEL")
+
+# Rule scores: a route needs at least MIN_RULE_SCORE and must beat the
+# runner-up intent by MIN_RULE_MARGIN
+MIN_RULE_SCORE = 2.0
+MIN_RULE_MARGIN = 1.5
+# TF-IDF: cosine similarity to the best intent centroid, and its lead over the
+# runner-up (NO_INTENT included)
+MIN_MODEL_SIMILARITY = 0.35
+MIN_MODEL_MARGIN = 0.1
+
+# Messages longer than this usually carry several requests; leave them to the LLM
+MAX_FAST_PATH_WORDS = 40
+
+# (pattern, weight) per intent. Weight 2+ is enough on its own; weight 1 cues
+# only route together with another cue for the same intent.
+_RULES: Dict[str, List[Tuple[str, float]]] = {
+    GOAL_FORMATION: [
+        (r"\b(new|another|different|second) goal\b", 3.0),
+        (r"\b(set|create|add|make|start|define|form) (up )?(a |my |one )?goal\b", 3.0),
+        (r"\bmy (new )?goal (is|would be) to\b", 2.5),
+        (
+            r"\bi (want|would like|wanna|need) to (start|learn|become|get better at)\b",
+            2.0,
+        ),
+        (r"\bi('ve| have) (been thinking|decided) (about|to)\b", 1.0),
+        (
+            r"\b(by|before) (the end of )?(next |this )?(year|summer|month|20\d\d)\b",
+            1.0,
+        ),
+        (r"\bgoal\b", 1.0),
+    ],
+    MILESTONE_FORMATION: [
+        # "milestones" alone is also how users ask about their status ("how am
+        # I doing on my milestones?"); only a planning verb makes it a route
+        (
+            r"\b(set( up)?|create|add|make|build|plan|define|draft|suggest|come up with|need|want|into) (\w+ ){0,3}(milestones?|trackers?)\b",
+            3.0,
+        ),
+        (r"\bwhat milestones should i\b", 2.0),
+        (r"\bmilestones?\b", 1.0),
+        (r"\bbreak (it|this|that|my goal|the goal)( \w+)? (down|into)\b", 3.0),
+        (r"\b(roadmap|step[- ]by[- ]step plan)\b", 2.0),
+        (r"\b(steps|phases|stages) (to|for|towards?)\b", 2.0),
+        (r"\bwhat (are|should be) (the|my) (next )?steps\b", 2.0),
+    ],
+    MOTIVATION: [
+        (r"\b(un)?motivat(ed|ion|e me)\b", 3.0),
+        (
+            r"\b(stuck|procrastinat\w*|overwhelmed|burn(ed|t|ing)? ?out|discouraged)\b",
+            3.0,
+        ),
+        # Not bare "quit"/"give up": "I want to quit smoking" is a new goal
+        (
+            r"\b(give|giving) up on\b|\b(feel(ing)? like|thinking (about|of)) (giving up|quitting)\b",
+            2.5,
+        ),
+        (r"\b(exhausted|drained|demotivated|frustrated|hopeless)\b", 2.5),
+        (
+            r"\bfeel(ing)? (so |really |kind of |pretty )?(down|bad|tired|low|behind)\b",
+            2.5,
+        ),
+        (r"\b(struggl\w+|can'?t (seem to|bring myself)|falling behind)\b", 2.0),
+        (r"\breflect\w*\b|\bpep talk\b", 2.0),
+    ],
+    DAY_PLANNING: [
+        (
+            r"\bplan (out )?(my|the|for) (day|today|tomorrow|morning|afternoon|week)\b",
+            3.0,
+        ),
+        (r"\b(schedule|agenda|time[- ]?block\w*|to-?do list)\b", 2.5),
+        (
+            r"\bwhat should i (do|work on|focus on) (today|tomorrow|this (morning|afternoon|evening))\b",
+            3.0,
+        ),
+        (r"\b(today|tomorrow)'?s plan\b", 3.0),
+        (r"\b(today|tomorrow)\b", 1.0),
+    ],
+    PROGRESS_TRACKING: [
+        (r"\b(log|logged|logging|record|recorded)\b", 2.5),
+        (r"\b(check[- ]?in|update (my )?progress|track(ed)? (my|today))\b", 2.5),
+        (
+            r"\bi (ran|walked|read|wrote|did|completed|finished|swam|meditated|studied|practiced|lifted|cycled|biked) (\d|a |an |my |for )",
+            2.5,
+        ),
+        (
+            r"\b\d+(\.\d+)? ?(pages?|km|kms|miles?|minutes?|mins?|hours?|hrs?|reps?|sets?|sessions?|kg|lbs?|steps|words|calories)\b",
+            2.0,
+        ),
+        (r"\b(yesterday|this morning|last night)\b", 1.0),
+    ],
+}
+
+# Goal-setting phrasings that read like struggle ("I want to stop procrastinating
+# and finish my thesis", "quit smoking", "get fit"): MOTIVATION never routes
+# when one of these is present
+_MOTIVATION_VETOES = [
+    r"\bi('d| would)? (want|like|wanna|need|plan|hope) to\b",
+    r"\bquit(ting)? (my |the |a |an )?(?!(it|this|that|now|on|already)\b)[a-z]+",
+    r"\b(get|getting) (fit|healthy|in shape|stronger)\b",
+]
+
+_COMPILED_RULES: Dict[str, List[Tuple[Pattern, float]]] = {
+    intent: [(re.compile(pattern, re.IGNORECASE), weight) for pattern, weight in rules]
+    for intent, rules in _RULES.items()
+}
+
+_COMPILED_MOTIVATION_VETOES = [
+    re.compile(pattern, re.IGNORECASE) for pattern in _MOTIVATION_VETOES
+]
+
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+
+@dataclass
+class IntentDecision:
+    intent: str
+    confidence: float
+    # "rules" or "model"
+    source: str
+
+
+def rule_scores(text: str) -> Dict[str, float]:
+    """Sum of matched rule weights per intent; each pattern counts once."""
+    return {
+        intent: sum(weight for pattern, weight in rules if pattern.search(text))
+        for intent, rules in _COMPILED_RULES.items()
+    }
+
+
+def _top_two(scores: Dict[str, float]) -> Tuple[str, float, float]:
+    ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+    runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+    return ranked[0][0], ranked[0][1], runner_up
+
+
+def motivation_vetoed(text: str) -> bool:
+    return any(veto.search(text) for veto in _COMPILED_MOTIVATION_VETOES)
+
+
+def classify_by_rules(text: str) -> Optional[IntentDecision]:
+    intent, best, runner_up = _top_two(rule_scores(text))
+    if best < MIN_RULE_SCORE or best - runner_up < MIN_RULE_MARGIN:
+        return None
+    if intent == MOTIVATION and motivation_vetoed(text):
+        return None
+    return IntentDecision(intent=intent, confidence=best - runner_up, source="rules")
+
+
+def tokenize(text: str) -> List[str]:
+    words = _TOKEN_RE.findall(text.lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+class TfidfIntentModel:
+    """
+    Nearest-centroid TF-IDF classifier over unigrams and bigrams. Small enough
+    to train at startup or ship as a JSON file; no third-party dependencies.
+    """
+
+    def __init__(self, idf: Dict[str, float], centroids: Dict[str, Dict[str, float]]):
+        self.idf = idf
+        self.centroids = centroids
+
+    def _vector(self, text: str) -> Dict[str, float]:
+        counts = Counter(t for t in tokenize(text) if t in self.idf)
+        vector = {t: (1 + math.log(c)) * self.idf[t] for t, c in counts.items()}
+        norm = math.sqrt(sum(v * v for v in vector.values()))
+        return {t: v / norm for t, v in vector.items()} if norm else {}
+
+    @classmethod
+    def fit(cls, examples: Iterable[Tuple[str, str]]) -> "TfidfIntentModel":
+        """examples: (text, label) pairs; label is an intent or NO_INTENT."""
+        examples = list(examples)
+        doc_freq = Counter(t for text, _ in examples for t in set(tokenize(text)))
+        total = len(examples)
+        idf = {t: math.log((1 + total) / (1 + df)) + 1 for t, df in doc_freq.items()}
+
+        model = cls(idf, {})
+        sums: Dict[str, Counter] = {}
+        for text, label in examples:
+            sums.setdefault(label, Counter()).update(model._vector(text))
+        for label, summed in sums.items():
+            norm = math.sqrt(sum(v * v for v in summed.values()))
+            model.centroids[label] = {t: v / norm for t, v in summed.items()}
+        return model
+
+    def similarities(self, text: str) -> Dict[str, float]:
+        vector = self._vector(text)
+        return {
+            label: sum(w * centroid.get(t, 0.0) for t, w in vector.items())
+            for label, centroid in self.centroids.items()
+        }
+
+    def classify(self, text: str) -> Optional[IntentDecision]:
+        similarities = self.similarities(text)
+        if not similarities:
+            return None
+        label, best, runner_up = _top_two(similarities)
+        if (
+            label == NO_INTENT
+            or best < MIN_MODEL_SIMILARITY
+            or best - runner_up < MIN_MODEL_MARGIN
+        ):
+            return None
+        return IntentDecision(intent=label, confidence=best - runner_up, source="model")
+
+    def save(self, path: str):
+        with open(path, "w") as f:
+            json.dump({"idf": self.idf, "centroids": self.centroids}, f)
+
+    @classmethod
+    def load(cls, path: str) -> "TfidfIntentModel":
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data["idf"], data["centroids"])
+
+
+def _load_default_model() -> Optional[TfidfIntentModel]:
+    if not INTENT_MODEL_PATH:
+        return None
+    try:
+        return TfidfIntentModel.load(INTENT_MODEL_PATH)
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Intent model {INTENT_MODEL_PATH} not loaded: {e}")
+        return None
+
+
+intent_model: Optional[TfidfIntentModel] = _load_default_model()
+
+
+def classify_intent(
+    text: str, model: Optional[TfidfIntentModel] = None
+) -> Optional[IntentDecision]:
+    """
+    High-confidence intent for a user message, or None to defer to the LLM.
+    Rules are tried first; the model (default: the one at GOALPILOT_INTENT_MODEL)
+    only decides when the rules abstain.
+    """
+    text = text.strip()
+    if not text or len(text.split()) > MAX_FAST_PATH_WORDS:
+        return None
+    decision = classify_by_rules(text)
+    if decision is None:
+        model = model or intent_model
+        decision = model.classify(text) if model else None
+        if decision and decision.intent == MOTIVATION and motivation_vetoed(text):
+            return None
+    return decision
+
+
+def _content_words(text: str) -> set:
+    # Short words ("to", "my", "run") are too common to tell goals apart
+    return {w for w in _TOKEN_RE.findall(text.lower()) if len(w) > 3}
+
+
+def match_goal_id(text: str, user_goals: List[dict]) -> Optional[str]:
+    """
+    The goal a message refers to: the user's only goal, or the one goal whose
+    "what" shares the most words with the message. None if that is ambiguous.
+    """
+    if len(user_goals) == 1:
+        return user_goals[0]["id"]
+    words = _content_words(text)
+    overlaps = sorted(
+        ((len(words & _content_words(g.get("what") or "")), g) for g in user_goals),
+        key=lambda pair: pair[0],
+        reverse=True,
+    )
+    if not overlaps or overlaps[0][0] == 0:
+        return None
+    if len(overlaps) > 1 and overlaps[1][0] == overlaps[0][0]:
+        return None
+    return overlaps[0][1]["id"]
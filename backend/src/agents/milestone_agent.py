@@ -1,26 +1,31 @@
 import logging
-from typing import List
+from typing import List, Optional
 
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import SystemMessage, BaseMessage
 
 from prompts.prompts import MILESTONE_FORMULATOR_CONTEXT, MILESTONE_FORMULATOR_PROMPT
 from agents.agent_utils import (
-    extract_json,
     fill_prompt_template,
     PlanState,
     AgentMessage,
 )
 import agents.agent_utils as agent_utils
-from persistence.dynamodb_database import DynamoDBHandler
+from persistence.storage import get_storage
+from persistence.async_dynamodb_database import get_async_handler
 from schemas.core_v2 import (
+    Goal,
     Milestone,
     Tracker,
     TargetMetric,
     AchievementMetric,
     CumulativeMetric,
 )
-from llms.openai_api import low_reasoning_gpt5mini
+from schemas.comm import MilestoneFormulatorResponse
+from llms.openai_api import (
+    low_reasoning_gpt5mini_structured,
+    alow_reasoning_gpt5mini_structured,
+)
 
 # Setup logging
 logger = logging.getLogger(__name__)
@@ -39,8 +44,8 @@ def get_metric(metric_data: dict):
     raise ValueError(f"Unknown metric type: {m_type}")
 
 
-def commit_milestones(milestones: List, state: PlanState):
-    logger.info(f"Committing {len(milestones)} milestones for user {state['user_id']}")
+def build_milestones(milestones: List, state: PlanState):
+    """Turns the LLM's milestone DAG into Milestone/Tracker objects with real IDs."""
 
     milestones_objs = []
     trackers_objs = []
@@ -50,7 +55,7 @@ def commit_milestones(milestones: List, state: PlanState):
     for m in milestones:
         milestone_obj = Milestone(
             user_id=state["user_id"],
-            goal_id=state["structured_data"]["goal"].goal_id,
+            goal_id=state["structured_data"]["goal_id"],
             statement=m["statement"],
         )
 
@@ -74,14 +79,32 @@ def commit_milestones(milestones: List, state: PlanState):
             if dep_id in milestone_id_maps
         ]
 
-    # breakpoint()
+    return milestones_objs, trackers_objs
+
+
+def commit_milestones(milestones: List, state: PlanState):
+    logger.info(f"Committing {len(milestones)} milestones for user {state['user_id']}")
+    milestones_objs, trackers_objs = build_milestones(milestones, state)
+
+    repo = get_storage(region_name="us-east-1")
+
+    # One transaction for the whole DAG, so a failure never leaves half a plan
+    repo.create_milestone_plan(milestones_objs, trackers_objs, atomic=True)
+
+    logger.info(
+        f"Successfully persisted {len(milestones_objs)} milestones and {len(trackers_objs)} trackers."
+    )
+    return milestones_objs, trackers_objs
 
-    repo = DynamoDBHandler(region_name="us-east-1")
 
-    for m in milestones_objs:
-        repo.create_milestone(m)
-    for t in trackers_objs:
-        repo.create_tracker(t)
+async def acommit_milestones(milestones: List, state: PlanState):
+    logger.info(f"Committing {len(milestones)} milestones for user {state['user_id']}")
+    milestones_objs, trackers_objs = build_milestones(milestones, state)
+
+    repo = get_async_handler(region_name="us-east-1")
+
+    # One transaction for the whole DAG, so a failure never leaves half a plan
+    await repo.create_milestone_plan(milestones_objs, trackers_objs, atomic=True)
 
     logger.info(
         f"Successfully persisted {len(milestones_objs)} milestones and {len(trackers_objs)} trackers."
@@ -99,12 +122,28 @@ def get_next_agent_using_intent(intent: str):
     return next_agent
 
 
-def get_full_context(state: PlanState):
-    system_message = SystemMessage(
-        content=fill_prompt_template(MILESTONE_FORMULATOR_PROMPT, {})
-    )
+def load_goal(state: PlanState) -> Optional[Goal]:
+    goal_id = state["structured_data"].get("goal_id")
+    if not goal_id:
+        return None
+    repo = get_storage(region_name="us-east-1")
+    return repo.get_goal(state["user_id"], goal_id)
+
+
+async def aload_goal(state: PlanState) -> Optional[Goal]:
+    goal_id = state["structured_data"].get("goal_id")
+    if not goal_id:
+        return None
+    repo = get_async_handler(region_name="us-east-1")
+    return await repo.get_goal(state["user_id"], goal_id)
 
-    goal_info = state["structured_data"].get("goal", {})
+
+def get_full_context(state: PlanState, goal_info=None):
+    system_message = agent_utils.static_system_message(MILESTONE_FORMULATOR_PROMPT)
+
+    # The async node fetches the goal itself and passes it in
+    if goal_info is None:
+        goal_info = load_goal(state) or {}
     goal_context = SystemMessage(
         content=fill_prompt_template(
             MILESTONE_FORMULATOR_CONTEXT,
@@ -112,29 +151,38 @@ def get_full_context(state: PlanState):
         )
     )
 
-    context_till_now = state.get("current_context", [])
-    user_messages = [state["last_user_message"]] if state["last_user_message"] else []
+    user_messages = agent_utils.new_user_messages(state)
+
+    full_context = agent_utils.assemble_context(
+        system_message, [goal_context], state, user_messages
+    )
 
     # Persist the new user message into context
     state["current_context"].extend(user_messages)
-
-    full_context = [system_message, goal_context] + context_till_now + user_messages
     return full_context, state
 
 
-def update_state_on_response(state: PlanState, response: BaseMessage):
-    try:
-        response_json = extract_json(response.content)
-    except Exception as e:
-        logger.error(f"JSON extraction failed in Milestone Formulator: {e}")
-        response_json = {}
-
-    intent = response_json.get("intent")
-    is_complete = response_json.get("is_complete", False)
-    milestone_details = response_json.get("milestones")
-    to_user = response_json.get("to_user")
+def apply_response(
+    state: PlanState,
+    response: BaseMessage,
+    parsed: Optional[MilestoneFormulatorResponse],
+):
+    """
+    Applies an LLM response to the state, short of persisting anything.
+    Returns the milestone DAG to commit once it is final, else None.
+    """
+    if parsed is None:
+        agent_utils.report_parse_failure(state, agent_utils.MILESTONE_FORMULATOR)
+        return None
+
+    intent = parsed.intent
+    is_complete = parsed.is_complete
+    milestone_details = (
+        [m.model_dump() for m in parsed.milestones] if parsed.milestones else None
+    )
+    to_user = parsed.to_user
 
-    state["current_context"].append(response)
+    state["current_context"].append(agent_utils.slim_message(response))
 
     if to_user:
         state["to_user"].append(
@@ -145,28 +193,76 @@ def update_state_on_response(state: PlanState, response: BaseMessage):
         state["stage"] = get_next_agent_using_intent(intent)
 
     if is_complete and milestone_details:
-        m_objs, t_objs = commit_milestones(milestone_details, state)
-        state["structured_data"]["milestones"] = m_objs
-        state["structured_data"]["trackers"] = t_objs
-        state["stage"] = agent_utils.ORCHESTRATOR
-        state["current_context"] = []  # Clear context for the next phase
-        logger.info("Milestones finalized. Returning control to Orchestrator.")
+        return milestone_details
+    return None
+
+
+def on_milestones_committed(state: PlanState, m_objs, t_objs):
+    state["structured_data"]["milestone_ids"] = [m.milestone_id for m in m_objs]
+    state["structured_data"]["tracker_ids"] = [t.tracker_id for t in t_objs]
+    state["stage"] = agent_utils.ORCHESTRATOR
+    agent_utils.reset_context(state)  # Clear context for the next phase
+    logger.info("Milestones finalized. Returning control to Orchestrator.")
+
+
+def update_state_on_response(
+    state: PlanState,
+    response: BaseMessage,
+    parsed: Optional[MilestoneFormulatorResponse],
+):
+    milestone_details = apply_response(state, response, parsed)
+    if milestone_details:
+        on_milestones_committed(state, *commit_milestones(milestone_details, state))
+    return state
+
 
+async def aupdate_state_on_response(
+    state: PlanState,
+    response: BaseMessage,
+    parsed: Optional[MilestoneFormulatorResponse],
+):
+    milestone_details = apply_response(state, response, parsed)
+    if milestone_details:
+        m_objs, t_objs = await acommit_milestones(milestone_details, state)
+        on_milestones_committed(state, m_objs, t_objs)
     return state
 
 
 def run_milestone_formulator(state: PlanState):
     logger.info(f"--- Node: Milestone Formulator | User: {state.get('user_id')} ---")
 
+    state = agent_utils.compact_context(state, agent_utils.MILESTONE_FORMULATOR)
     context, updated_state = get_full_context(state)
     # logger.info(
     #     f"Context prepared for LLM: {"\n\n".join([msg.content for msg in context])}"
     # )
-    response = low_reasoning_gpt5mini(context)
+    response, parsed = low_reasoning_gpt5mini_structured(
+        context, MilestoneFormulatorResponse, agent=agent_utils.MILESTONE_FORMULATOR
+    )
+
+    if response == None:
+        return state
+
+    new_state = update_state_on_response(updated_state, response, parsed)
+    logger.info(f"Transitioning to stage: {new_state.get('stage')}")
+    return new_state
+
+
+async def arun_milestone_formulator(state: PlanState):
+    logger.info(
+        f"--- Node: Milestone Formulator (async) | User: {state.get('user_id')} ---"
+    )
+
+    state = await agent_utils.acompact_context(state, agent_utils.MILESTONE_FORMULATOR)
+    goal_info = await aload_goal(state) or {}
+    context, updated_state = get_full_context(state, goal_info=goal_info)
+    response, parsed = await alow_reasoning_gpt5mini_structured(
+        context, MilestoneFormulatorResponse, agent=agent_utils.MILESTONE_FORMULATOR
+    )
 
     if response == None:
         return state
 
-    new_state = update_state_on_response(updated_state, response)
+    new_state = await aupdate_state_on_response(updated_state, response, parsed)
     logger.info(f"Transitioning to stage: {new_state.get('stage')}")
     return new_state
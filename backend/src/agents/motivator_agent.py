@@ -1,23 +1,26 @@
 import logging
+from typing import Optional
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import SystemMessage, BaseMessage
 
 from prompts.prompts import RESILIENCE_COACH_PROMPT, RESILIENCE_COACH_CONTEXT
 from agents.agent_utils import (
-    extract_json,
     fill_prompt_template,
     PlanState,
     AgentMessage,
 )
 import agents.agent_utils as agent_utils
-from persistence.dynamodb_database import DynamoDBHandler
+from persistence.storage import get_storage
+from persistence.async_dynamodb_database import get_async_handler
+from schemas.comm import CoachResponse
+from llms.openai_api import get_llm, invoke_structured, ainvoke_structured
 
 # Setup logging
 logger = logging.getLogger(__name__)
 
 
 def get_goal_and_active_milestones(state: PlanState):
-    repo = DynamoDBHandler(region_name="us-east-1")
+    repo = get_storage(region_name="us-east-1")
     user_id = state["user_id"]
 
     # Extract goal_id from the structured intent data
@@ -26,23 +29,48 @@ def get_goal_and_active_milestones(state: PlanState):
     logger.info(f"Fetching goal {target_goal_id} and milestones for user {user_id}")
 
     try:
-        all_goals = repo.get_goals_for_user(user_id)
-        # Find the specific goal the user is talking about
-        goal = next((g for g in all_goals if g["id"] == target_goal_id), None)
+        # The specific goal the user is talking about
+        goal = target_goal_id and repo.get_goal(user_id, target_goal_id)
 
         if not goal:
             logger.warning(f"Goal {target_goal_id} not found for user {user_id}")
             return {"goal": {}, "active_milestones": []}
 
-        milestones = repo.get_milestones(user_id, goal["id"])
-        active_milestones = [m for m in milestones if m.get("status") == "ACTIVE"]
+        milestones = repo.get_milestones(user_id, goal.goal_id)
+        return format_goal_info(goal, milestones)
+    except Exception as e:
+        logger.error(f"Error retrieving goal context: {e}")
+        return {"goal": {}, "active_milestones": []}
+
+
+async def aget_goal_and_active_milestones(state: PlanState):
+    repo = get_async_handler(region_name="us-east-1")
+    user_id = state["user_id"]
+    target_goal_id = state["structured_data"].get("goal_id")
 
-        return {"goal": goal, "active_milestones": active_milestones}
+    logger.info(f"Fetching goal {target_goal_id} and milestones for user {user_id}")
+
+    try:
+        goal = target_goal_id and await repo.get_goal(user_id, target_goal_id)
+
+        if not goal:
+            logger.warning(f"Goal {target_goal_id} not found for user {user_id}")
+            return {"goal": {}, "active_milestones": []}
+
+        milestones = await repo.get_milestones(user_id, goal.goal_id)
+        return format_goal_info(goal, milestones)
     except Exception as e:
         logger.error(f"Error retrieving goal context: {e}")
         return {"goal": {}, "active_milestones": []}
 
 
+def format_goal_info(goal, milestones):
+    active_milestones = [
+        m.model_dump() for m in milestones if m.status.upper() == "ACTIVE"
+    ]
+    return {"goal": goal.model_dump(), "active_milestones": active_milestones}
+
+
 def get_next_agent_using_intent(intent: str):
     next_agent = (
         agent_utils.ORCHESTRATOR
@@ -53,12 +81,12 @@ def get_next_agent_using_intent(intent: str):
     return next_agent
 
 
-def get_full_context(state: PlanState):
-    system_message = SystemMessage(
-        content=fill_prompt_template(RESILIENCE_COACH_PROMPT, {})
-    )
+def get_full_context(state: PlanState, goal_info=None):
+    system_message = agent_utils.static_system_message(RESILIENCE_COACH_PROMPT)
 
-    goal_info = get_goal_and_active_milestones(state)
+    # The async node fetches the goal itself and passes it in
+    if goal_info is None:
+        goal_info = get_goal_and_active_milestones(state)
     goal_context = SystemMessage(
         content=fill_prompt_template(
             RESILIENCE_COACH_CONTEXT,
@@ -66,29 +94,29 @@ def get_full_context(state: PlanState):
         )
     )
 
-    context_till_now = state.get("current_context", [])
-    user_messages = [state["last_user_message"]] if state["last_user_message"] else []
+    user_messages = agent_utils.new_user_messages(state)
+
+    full_context = agent_utils.assemble_context(
+        system_message, [goal_context], state, user_messages
+    )
 
     # Maintain session context
     state["current_context"].extend(user_messages)
-
-    full_context = [system_message, goal_context] + context_till_now + user_messages
     return full_context, state
 
 
-def update_state_on_response(state: PlanState, response: BaseMessage):
-    try:
-        response_json = extract_json(response.content)
-    except Exception as e:
-        logger.error(f"JSON extraction failed in Resilience Coach: {e}")
-        response_json = {}
+def update_state_on_response(
+    state: PlanState, response: BaseMessage, parsed: Optional[CoachResponse]
+):
+    if parsed is None:
+        return agent_utils.report_parse_failure(state, agent_utils.RESILIENCE_COACH)
 
-    intent = response_json.get("intent")
-    is_complete = response_json.get("is_complete", False)
-    reflection = response_json.get("captured_reflection")
-    to_user = response_json.get("to_user")
+    intent = parsed.intent
+    is_complete = parsed.is_complete
+    reflection = parsed.captured_reflection
+    to_user = parsed.to_user
 
-    state["current_context"].append(response)
+    state["current_context"].append(agent_utils.slim_message(response))
 
     if to_user:
         state["to_user"].append(
@@ -102,7 +130,7 @@ def update_state_on_response(state: PlanState, response: BaseMessage):
         logger.info(f"Reflection finalized: {reflection[:50]}...")
         state["structured_data"]["reflection"] = reflection
         state["stage"] = agent_utils.ORCHESTRATOR
-        state["current_context"] = []  # Reset context for the Orchestrator
+        agent_utils.reset_context(state)  # Reset context for the Orchestrator
         logger.info("Transitioning back to Orchestrator.")
 
     return state
@@ -111,16 +139,42 @@ def update_state_on_response(state: PlanState, response: BaseMessage):
 def run_resilience_coach(state: PlanState):
     logger.info(f"--- Node: Resilience Coach | User: {state.get('user_id')} ---")
 
+    state = agent_utils.compact_context(state, agent_utils.RESILIENCE_COACH)
     context, updated_state = get_full_context(state)
     logger.info(
         f"Context prepared for LLM: {"\n\n".join([msg.content for msg in context])}"
     )
-    llm = ChatOpenAI(model="gpt-5-mini", temperature=0.1)
+    llm = get_llm(model="gpt-5-mini", temperature=0.1)
 
     try:
-        response = llm.invoke(context)
+        response, parsed = invoke_structured(
+            llm, context, CoachResponse, agent=agent_utils.RESILIENCE_COACH
+        )
+        logger.info(f"LLM Response: {response.content}")
+        new_state = update_state_on_response(updated_state, response, parsed)
+        logger.info(f"Coach node complete. Next stage: {new_state.get('stage')}")
+        return new_state
+    except Exception as e:
+        logger.error(f"LLM Invocation Error: {e}")
+        return state
+
+
+async def arun_resilience_coach(state: PlanState):
+    logger.info(
+        f"--- Node: Resilience Coach (async) | User: {state.get('user_id')} ---"
+    )
+
+    state = await agent_utils.acompact_context(state, agent_utils.RESILIENCE_COACH)
+    goal_info = await aget_goal_and_active_milestones(state)
+    context, updated_state = get_full_context(state, goal_info=goal_info)
+    llm = get_llm(model="gpt-5-mini", temperature=0.1)
+
+    try:
+        response, parsed = await ainvoke_structured(
+            llm, context, CoachResponse, agent=agent_utils.RESILIENCE_COACH
+        )
         logger.info(f"LLM Response: {response.content}")
-        new_state = update_state_on_response(updated_state, response)
+        new_state = update_state_on_response(updated_state, response, parsed)
         logger.info(f"Coach node complete. Next stage: {new_state.get('stage')}")
         return new_state
     except Exception as e:
@@ -10,15 +10,20 @@ from langgraph.graph import StateGraph, END
 
 from prompts.prompts import ORCHESTRATOR_PROMPT, ORCHESTRATOR_CONTEXT
 from agents.agent_utils import (
-    extract_json,
     fill_prompt_template,
     PlanState,
     AgentMessage,
 )
 import agents.agent_utils as agent_utils
-from persistence.tinydb_database import GoalRepository
-from persistence.dynamodb_database import DynamoDBHandler
-from llms.openai_api import low_reasoning_gpt5mini
+import agents.intent_router as intent_router
+from persistence.storage import get_storage
+from persistence.async_dynamodb_database import get_async_handler
+from persistence.user_goals_cache import user_goals_cache
+from schemas.comm import OrchestratorResponse
+from llms.openai_api import (
+    low_reasoning_gpt5mini_structured,
+    alow_reasoning_gpt5mini_structured,
+)
 
 # Configure logging for better visibility in the console
 logging.basicConfig(
@@ -27,24 +32,81 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def process_user_goals(user_goals_results, user_id: str):
+    user_goals_processed = [
+        dict(what=g.what, when=g.when, why=g.why, id=g.goal_id)
+        for g in user_goals_results
+    ]
+
+    logger.info(
+        f"Successfully retrieved {len(user_goals_processed)} goals for user: {user_id}"
+    )
+    return user_goals_processed
+
+
+def get_cached_user_goals(state: PlanState):
+    """
+    Goals from the process cache, if no goal was written since they were read.
+    Returns None when DynamoDB has to be queried.
+    """
+    user_id = state["user_id"]
+    # Threads checkpointed with the whole goals snapshot in PlanState
+    state["structured_data"].pop("user_goals", None)
+    snapshot = user_goals_cache.get(user_id)
+    if snapshot is None:
+        return None
+
+    logger.info(f"Using cached goals for user_id: {user_id}")
+    state["structured_data"]["user_goals_version"] = snapshot["version"]
+    return snapshot["goals"]
+
+
+def remember_user_goals(state: PlanState, user_goals, version: str):
+    # Only the version is checkpointed; the goals stay in the process cache
+    user_goals_cache.put(state["user_id"], user_goals, version)
+    state["structured_data"]["user_goals_version"] = version
+
+
 def get_user_goals(user_id: str):
     logger.info(f"Fetching goals for user_id: {user_id} from DynamoDB.")
     try:
-        repo = DynamoDBHandler(region_name="us-east-1")
-        user_goals_results = repo.get_goals_for_user(user_id)
+        repo = get_storage(region_name="us-east-1")
+        return process_user_goals(repo.get_goals_for_user(user_id), user_id)
+    except Exception as e:
+        logger.error(f"Failed to fetch goals for user {user_id}: {str(e)}")
+        return None
 
-        user_goals_processed = [
-            dict(what=g.what, when=g.when, why=g.why, id=g.goal_id)
-            for g in user_goals_results
-        ]
 
-        logger.info(
-            f"Successfully retrieved {len(user_goals_processed)} goals for user: {user_id}"
-        )
-        return user_goals_processed
+async def aget_user_goals(user_id: str):
+    logger.info(f"Fetching goals for user_id: {user_id} from DynamoDB (async).")
+    try:
+        repo = get_async_handler(region_name="us-east-1")
+        return process_user_goals(await repo.get_goals_for_user(user_id), user_id)
     except Exception as e:
         logger.error(f"Failed to fetch goals for user {user_id}: {str(e)}")
-        return []
+        return None
+
+
+def load_user_goals(state: PlanState):
+    user_goals = get_cached_user_goals(state)
+    if user_goals is None:
+        version = user_goals_cache.version(state["user_id"])
+        user_goals = get_user_goals(user_id=state["user_id"])
+        if user_goals is None:
+            return []
+        remember_user_goals(state, user_goals, version)
+    return user_goals
+
+
+async def aload_user_goals(state: PlanState):
+    user_goals = get_cached_user_goals(state)
+    if user_goals is None:
+        version = user_goals_cache.version(state["user_id"])
+        user_goals = await aget_user_goals(user_id=state["user_id"])
+        if user_goals is None:
+            return []
+        remember_user_goals(state, user_goals, version)
+    return user_goals
 
 
 def get_next_agent_using_intent(intent: str):
@@ -64,14 +126,58 @@ def get_next_agent_using_intent(intent: str):
     return next_agent
 
 
-def get_full_context(state: PlanState):
-    logger.info(f"Building full context for user: {state.get('user_id')}")
+# Intents the fast path may route without the LLM: the ones with a graph node
+FAST_PATH_INTENTS = {
+    intent_router.GOAL_FORMATION,
+    intent_router.MILESTONE_FORMATION,
+    intent_router.MOTIVATION,
+}
+
+
+def try_fast_route(state: PlanState, user_goals) -> bool:
+    """
+    Routes the turn from local rules when they are confident and everything the
+    next agent needs is already known. Returns False to fall back to the LLM.
+    """
+    if not intent_router.FAST_PATH_ENABLED:
+        return False
+    text = state["last_user_message"].content
+    decision = intent_router.classify_intent(text)
+    if decision is None or decision.intent not in FAST_PATH_INTENTS:
+        return False
 
-    system_message = SystemMessage(
-        content=fill_prompt_template(ORCHESTRATOR_PROMPT, dict())
+    goal_id = None
+    if decision.intent == intent_router.MILESTONE_FORMATION:
+        # The milestone formulator works on the goal already in focus
+        if not state["structured_data"].get("goal_id"):
+            return False
+    elif decision.intent == intent_router.MOTIVATION:
+        goal_id = intent_router.match_goal_id(text, user_goals or [])
+        goal_id = goal_id or state["structured_data"].get("goal_id")
+        if goal_id is None:
+            return False
+
+    # Recorded like the LLM path does, so the turn stays in the conversation
+    state["current_context"].extend(agent_utils.new_user_messages(state))
+    old_stage = state.get("stage", "None")
+    state["stage"] = get_next_agent_using_intent(decision.intent)
+    if goal_id:
+        state["structured_data"]["goal_id"] = goal_id
+    logger.info(
+        f"Fast-path transition: {old_stage} -> {state['stage']} "
+        f"({decision.source}, confidence {decision.confidence:.2f})"
     )
+    return True
+
+
+def get_full_context(state: PlanState, user_goals=None):
+    logger.info(f"Building full context for user: {state.get('user_id')}")
 
-    user_goals = get_user_goals(user_id=state["user_id"])
+    system_message = agent_utils.static_system_message(ORCHESTRATOR_PROMPT)
+
+    # The async node fetches goals itself and passes them in
+    if user_goals is None:
+        user_goals = load_user_goals(state)
     goals_context = SystemMessage(
         content=fill_prompt_template(
             ORCHESTRATOR_CONTEXT,
@@ -79,15 +185,14 @@ def get_full_context(state: PlanState):
         )
     )
 
-    context_till_now = state.get("current_context", [])
-    user_messages = (
-        [state["last_user_message"]] if state["last_user_message"].content else []
+    user_messages = agent_utils.new_user_messages(state)
+
+    full_context = agent_utils.assemble_context(
+        system_message, [goals_context], state, user_messages
     )
 
     state["current_context"].extend(user_messages)
 
-    full_context = [system_message, goals_context] + context_till_now + user_messages
-
     logger.debug(f"Total message count in context: {len(full_context)}")
     # Note: Keep the breakpoint for manual debugging if needed,
     # but logging often replaces the need for it.
@@ -96,21 +201,20 @@ def get_full_context(state: PlanState):
     return full_context, state
 
 
-def update_state_on_response(state: PlanState, response: BaseMessage):
+def update_state_on_response(
+    state: PlanState,
+    response: BaseMessage,
+    parsed: Optional[OrchestratorResponse],
+):
     logger.info("Processing LLM response to update state.")
 
-    try:
-        response_json = extract_json(response.content)
-        logger.debug(f"Extracted JSON from response: {response_json}")
-    except Exception as e:
-        logger.error(
-            f"Failed to extract JSON from LLM response: {response.content}. Error: {e}"
-        )
-        response_json = {}
+    if parsed is None:
+        return agent_utils.report_parse_failure(state, agent_utils.ORCHESTRATOR)
+    logger.debug(f"Parsed orchestrator response: {parsed}")
 
-    intent = response_json.get("intent")
-    goal_id = response_json.get("goal_id")
-    to_user = response_json.get("to_user")
+    intent = parsed.intent
+    goal_id = parsed.goal_id
+    to_user = parsed.to_user
 
     if to_user:
         logger.info(f"Adding message to user queue: {to_user[:50]}...")
@@ -135,14 +239,51 @@ def update_state_on_response(state: PlanState, response: BaseMessage):
 def run_orchestrator(state: PlanState):
     logger.info("--- Starting Orchestrator Node ---")
     # breakpoint()
-    context, updated_state = get_full_context(state)
+    user_goals = load_user_goals(state)
+    if try_fast_route(state, user_goals):
+        return state
+
+    state = agent_utils.compact_context(state, agent_utils.ORCHESTRATOR)
+    context, updated_state = get_full_context(state, user_goals=user_goals)
     # logger.info(f"Context prepared for LLM: {[msg.content for msg in context]}")
-    response = low_reasoning_gpt5mini(context)
+    response, parsed = low_reasoning_gpt5mini_structured(
+        context,
+        OrchestratorResponse,
+        agent=agent_utils.ORCHESTRATOR,
+        # Users with goals get them in the context, which must not be shared
+        cacheable=not user_goals,
+    )
 
     if response == None:
         return state
         # breakpoint()
-    new_state = update_state_on_response(updated_state, response)
+    new_state = update_state_on_response(updated_state, response, parsed)
+
+    logger.info(
+        f"--- Finished Orchestrator Node. Next stage: {new_state.get('stage')} ---"
+    )
+    return new_state
+
+
+async def arun_orchestrator(state: PlanState):
+    logger.info("--- Starting Orchestrator Node (async) ---")
+    user_goals = await aload_user_goals(state)
+    if try_fast_route(state, user_goals):
+        return state
+
+    state = await agent_utils.acompact_context(state, agent_utils.ORCHESTRATOR)
+    context, updated_state = get_full_context(state, user_goals=user_goals)
+    response, parsed = await alow_reasoning_gpt5mini_structured(
+        context,
+        OrchestratorResponse,
+        agent=agent_utils.ORCHESTRATOR,
+        # Users with goals get them in the context, which must not be shared
+        cacheable=not user_goals,
+    )
+
+    if response == None:
+        return state
+    new_state = update_state_on_response(updated_state, response, parsed)
 
     logger.info(
         f"--- Finished Orchestrator Node. Next stage: {new_state.get('stage')} ---"
@@ -13,6 +13,7 @@ from agents.agent_utils import (
 )
 import agents.agent_utils as agent_utils
 from persistence.dynamodb_database import DynamoDBHandler
+from llms.openai_api import get_llm
 from schemas.core_v2 import (
     Milestone,
     Tracker,
@@ -115,7 +116,7 @@ def run_planner_agent(state: PlanState):
 
     context, updated_state = get_full_context(state)
 
-    llm = ChatOpenAI(model="gpt-4.1-mini", temperature=0.1)
+    llm = get_llm(model="gpt-4.1-mini", temperature=0.1)
 
     try:
         response = llm.invoke(context)
@@ -68,6 +68,20 @@ def create_tables():
                 {"AttributeName": "sk", "AttributeType": "S"},
             ],
         },
+        {
+            "TableName": "Rollups",
+            "KeySchema": [
+                {"AttributeName": "user_id", "KeyType": "HASH"},
+                {
+                    "AttributeName": "sk",
+                    "KeyType": "RANGE",
+                },  # tracker_id#granularity#bucket_start
+            ],
+            "AttributeDefinitions": [
+                {"AttributeName": "user_id", "AttributeType": "S"},
+                {"AttributeName": "sk", "AttributeType": "S"},
+            ],
+        },
         {
             "TableName": "my_graph_checkpoints",
             "KeySchema": [
@@ -100,5 +114,5 @@ def create_tables():
 
 
 if __name__ == "__main__":
-    # delete_tables(["Goals", "Milestones", "Trackers", "Logs", "my_graph_checkpoints"])
+    # delete_tables(["Goals", "Milestones", "Trackers", "Logs", "Rollups", "my_graph_checkpoints"])
     create_tables()
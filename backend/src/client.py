@@ -43,18 +43,70 @@ def chat_with_agent(args):
 
         payload = {"message": user_input, "thread_id": thread_id}
         try:
-            response = requests.post(f"{SERVER_URL}/ai/chat", json=payload)
-            if response.status_code == 200:
-                data = response.json()
-                print(f"[AGENT]:")
-                for ar in data["response"]:
-                    print(f"{ar['agent']}\n{ar['message']}", end="\n\n")
+            if args.no_stream:
+                send_chat_message(payload)
             else:
-                print(f"[ERROR {response.status_code}]: {response.text}")
+                stream_chat_message(payload)
         except requests.exceptions.ConnectionError:
             print(f"[ERROR]: Could not connect to server at {SERVER_URL}.")
 
 
+def send_chat_message(payload):
+    response = requests.post(f"{SERVER_URL}/ai/chat", json=payload)
+    if response.status_code == 200:
+        data = response.json()
+        print(f"[AGENT]:")
+        for ar in data["response"]:
+            print(f"{ar['agent']}\n{ar['message']}", end="\n\n")
+    else:
+        print(f"[ERROR {response.status_code}]: {response.text}")
+
+
+def iter_sse(response):
+    """Yields (event, data) pairs from a text/event-stream response."""
+    event, data_lines = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if line is None:
+            continue
+        if line == "":
+            if data_lines:
+                yield event, json.loads("\n".join(data_lines))
+            event, data_lines = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:") :].strip()
+        elif line.startswith("data:"):
+            data_lines.append(line[len("data:") :].strip())
+
+
+def stream_chat_message(payload):
+    """Prints each agent message the moment the server emits it."""
+    with requests.post(
+        f"{SERVER_URL}/ai/chat/stream", json=payload, stream=True
+    ) as response:
+        if response.status_code != 200:
+            print(f"[ERROR {response.status_code}]: {response.text}")
+            return
+
+        print(f"[AGENT]:")
+        thinking = False
+        for event, data in iter_sse(response):
+            if event == "token":
+                # Raw model output is JSON; just show that the agent is working
+                if not thinking:
+                    print(f"({data['agent']} is thinking", end="", flush=True)
+                    thinking = True
+                print(".", end="", flush=True)
+            elif event == "message":
+                if thinking:
+                    print(")")
+                    thinking = False
+                print(f"{data['agent']}\n{data['message']}", end="\n\n", flush=True)
+            elif event == "error":
+                print(f"\n[ERROR]: {data['detail']}")
+        if thinking:
+            print(")")
+
+
 def track_progress(args):
     """
     Iterates through active milestones and logs tracker updates.
@@ -130,6 +182,12 @@ def main():
     chat_parser.add_argument(
         "--user-id", type=str, dest="user_id", help="The unique identifier for the user"
     )
+    chat_parser.add_argument(
+        "--no-stream",
+        action="store_true",
+        dest="no_stream",
+        help="Wait for the full reply instead of streaming it",
+    )
     chat_parser.set_defaults(func=chat_with_agent)
 
     # Command: 'track' (New)
@@ -30,23 +30,371 @@ class OpenAIProvider(LLMProvider):
             return f"Error calling OpenAI: {str(e)}"
 
 
+import asyncio
+import functools
+import threading
+import weakref
+from typing import Dict, Optional, Tuple, Type
+import httpx
+from langchain_core.messages import BaseMessage, HumanMessage
 from langchain_openai import ChatOpenAI
+from langgraph.constants import TAG_NOSTREAM
+from pydantic import BaseModel, ValidationError
 import logging
+from llms.response_cache import response_cache
+from llms.usage_metrics import prompt_cache_metrics, structured_output_metrics
 
 logger = logging.getLogger(__name__)
 
+# One connection pool for every LLM call in the process, so TLS sessions and
+# keep-alive connections to the API survive across agent turns.
+HTTP_POOL_LIMITS = httpx.Limits(
+    max_connections=100, max_keepalive_connections=20, keepalive_expiry=60
+)
+HTTP_TIMEOUT = httpx.Timeout(120.0, connect=10.0)
 
-def low_reasoning_gpt5mini(context):
+_http_client = httpx.Client(limits=HTTP_POOL_LIMITS, timeout=HTTP_TIMEOUT)
+# An AsyncClient's connections belong to the event loop that opened them, so
+# async pools (and the ChatOpenAI clients using them) are created lazily, one
+# per running loop. Close them with aclose_http_clients before the loop ends.
+_http_async_clients: (
+    "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]"
+) = weakref.WeakKeyDictionary()
+
+# Extra calls allowed per turn to fix a reply that fails its response model
+STRUCTURED_OUTPUT_REPAIR_ATTEMPTS = 1
+# Validation errors quoted back to the model are cut to this many characters
+REPAIR_ERROR_MAX_CHARS = 1500
+
+# Repair calls are kept out of graph streams ("nostream"): the user already
+# saw the first attempt's to_user stream, and the node's final message
+# replaces it
+REPAIR_CONFIG = {"tags": [TAG_NOSTREAM]}
+
+# Response model fields that make a reply exact-match-only in the response cache
+EXACT_MATCH_FIELDS = frozenset({"is_complete", "goal_details", "milestones"})
+
+REPAIR_PROMPT = """Your previous reply did not match the required JSON schema:
+{error}
+
+Reply again with only the corrected JSON object."""
+
+LLMKey = Tuple[str, Optional[float], Optional[str]]
+# Clients for sync callers (no running loop) ...
+_llm_clients: Dict[LLMKey, ChatOpenAI] = {}
+# ... and for each running event loop
+_loop_llm_clients: (
+    "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[LLMKey, ChatOpenAI]]"
+) = weakref.WeakKeyDictionary()
+_llm_clients_lock = threading.Lock()
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def get_llm(
+    model: str,
+    temperature: Optional[float] = None,
+    reasoning_effort: Optional[str] = None,
+) -> ChatOpenAI:
+    """
+    Returns the shared ChatOpenAI for (model, temperature, reasoning_effort).
+    Clients are built once and all share the pooled HTTP clients above; inside
+    a running event loop they use that loop's AsyncClient.
+    """
+    key = (model, temperature, reasoning_effort)
+    loop = _running_loop()
+    with _llm_clients_lock:
+        if loop is None:
+            clients, http_async_client = _llm_clients, None
+        else:
+            clients = _loop_llm_clients.setdefault(loop, {})
+            http_async_client = _http_async_clients.get(loop)
+            if http_async_client is None:
+                http_async_client = httpx.AsyncClient(
+                    limits=HTTP_POOL_LIMITS, timeout=HTTP_TIMEOUT
+                )
+                _http_async_clients[loop] = http_async_client
+        if key not in clients:
+            kwargs = {}
+            if temperature is not None:
+                kwargs["temperature"] = temperature
+            if reasoning_effort is not None:
+                kwargs["reasoning_effort"] = reasoning_effort
+            if http_async_client is not None:
+                kwargs["http_async_client"] = http_async_client
+            clients[key] = ChatOpenAI(model=model, http_client=_http_client, **kwargs)
+        return clients[key]
+
+
+async def aclose_http_clients():
+    """Closes the running loop's AsyncClient pool; call on application shutdown."""
+    loop = asyncio.get_running_loop()
+    with _llm_clients_lock:
+        _loop_llm_clients.pop(loop, None)
+        http_async_client = _http_async_clients.pop(loop, None)
+    if http_async_client is not None:
+        await http_async_client.aclose()
+
+
+def prompt_cache_kwargs(agent: Optional[str]) -> dict:
+    """
+    Invocation kwargs that route an agent's calls to the same cache shard, so
+    its shared prompt prefix is found more often.
+    """
+    return {"prompt_cache_key": f"goalpilot-{agent}"} if agent else {}
+
+
+def record_usage(agent: Optional[str], response):
+    prompt_cache_metrics.record(agent or "unknown", response.usage_metadata)
+
+
+@functools.lru_cache(maxsize=None)
+def structured_response_format(response_model: Type[BaseModel]) -> dict:
+    """
+    Strict json_schema response_format for a response model, so the API only
+    samples replies that match it. Passed as a dict rather than the class, so a
+    reply that still fails validation comes back as text for the repair path
+    instead of raising inside the client.
+    """
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": response_model.__name__,
+            "strict": True,
+            "schema": response_model.model_json_schema(),
+        },
+    }
+
+
+def parse_structured(
+    response: BaseMessage, response_model: Type[BaseModel]
+) -> Tuple[Optional[BaseModel], Optional[str]]:
+    """Validates a reply against its response model. Returns (parsed, error)."""
+    refusal = response.additional_kwargs.get("refusal")
+    if refusal:
+        return None, f"The model refused: {refusal}"
+    try:
+        return response_model.model_validate_json(response.content), None
+    except ValidationError as e:
+        error = "\n".join(
+            f"{'.'.join(map(str, err['loc'])) or '(root)'}: {err['msg']}"
+            for err in e.errors(include_url=False)
+        )
+        return None, error[:REPAIR_ERROR_MAX_CHARS]
+
+
+def repair_context(context, response: BaseMessage, error: str):
+    """The original context plus the failed reply and what was wrong with it."""
+    return [*context, response, HumanMessage(content=REPAIR_PROMPT.format(error=error))]
+
+
+def invoke_structured(
+    llm: ChatOpenAI,
+    context,
+    response_model: Type[BaseModel],
+    agent: Optional[str] = None,
+) -> Tuple[BaseMessage, Optional[BaseModel]]:
+    """
+    Invokes the LLM with a strict response_format and validates the reply.
+    A reply that still fails gets up to STRUCTURED_OUTPUT_REPAIR_ATTEMPTS
+    repair calls. Returns the last reply and its parsed model, or None if no
+    attempt validated.
+    """
+    kwargs = {
+        **prompt_cache_kwargs(agent),
+        "response_format": structured_response_format(response_model),
+    }
+    response = llm.invoke(context, **kwargs)
+    record_usage(agent, response)
+    parsed, error = parse_structured(response, response_model)
+    first_try_ok = parsed is not None
+
+    repairs = 0
+    while parsed is None and repairs < STRUCTURED_OUTPUT_REPAIR_ATTEMPTS:
+        repairs += 1
+        logger.warning(f"Repairing structured output ({agent}): {error}")
+        response = llm.invoke(
+            repair_context(context, response, error), REPAIR_CONFIG, **kwargs
+        )
+        record_usage(agent, response)
+        parsed, error = parse_structured(response, response_model)
+
+    structured_output_metrics.record(
+        agent or "unknown", first_try_ok, repairs, parsed is not None
+    )
+    return response, parsed
+
+
+async def ainvoke_structured(
+    llm: ChatOpenAI,
+    context,
+    response_model: Type[BaseModel],
+    agent: Optional[str] = None,
+) -> Tuple[BaseMessage, Optional[BaseModel]]:
+    """Async twin of invoke_structured."""
+    kwargs = {
+        **prompt_cache_kwargs(agent),
+        "response_format": structured_response_format(response_model),
+    }
+    response = await llm.ainvoke(context, **kwargs)
+    record_usage(agent, response)
+    parsed, error = parse_structured(response, response_model)
+    first_try_ok = parsed is not None
+
+    repairs = 0
+    while parsed is None and repairs < STRUCTURED_OUTPUT_REPAIR_ATTEMPTS:
+        repairs += 1
+        logger.warning(f"Repairing structured output ({agent}): {error}")
+        response = await llm.ainvoke(
+            repair_context(context, response, error), REPAIR_CONFIG, **kwargs
+        )
+        record_usage(agent, response)
+        parsed, error = parse_structured(response, response_model)
+
+    structured_output_metrics.record(
+        agent or "unknown", first_try_ok, repairs, parsed is not None
+    )
+    return response, parsed
+
+
+def allows_semantic_reuse(response_model: Type[BaseModel]) -> bool:
+    """
+    Whether replies of this model may be served to near-duplicate contexts.
+    Models that can complete a step or carry a payload to commit (goal details,
+    milestone plans) are only reused for the exact same context.
+    """
+    return not EXACT_MATCH_FIELDS.intersection(response_model.model_fields)
+
+
+def cached_structured(
+    context, response_model: Type[BaseModel], agent: Optional[str]
+) -> Optional[Tuple[BaseMessage, BaseModel]]:
+    """A cached reply that still validates against response_model, if any."""
+    cached = response_cache.get(
+        agent,
+        context,
+        variant=response_model.__name__,
+        semantic=allows_semantic_reuse(response_model),
+    )
+    if cached is None:
+        return None
+    parsed, _ = parse_structured(cached, response_model)
+    return (cached, parsed) if parsed is not None else None
+
+
+def low_reasoning_gpt5mini(context, agent: Optional[str] = None, cacheable=False):
+    """
+    cacheable: the context holds no user-specific data, so the reply may be
+    served from and stored in the response cache (when it is enabled).
+    """
+    cached = response_cache.get(agent, context) if cacheable else None
+    if cached is not None:
+        return cached
     logger.info("Invoking LLM (gpt-5-mini)...")
     try:
-        llm = ChatOpenAI(
-            model="gpt-5-mini", temperature=0.3, reasoning_effort="minimal"
+        llm = get_llm(model="gpt-5-mini", temperature=0.3, reasoning_effort="minimal")
+        response = llm.invoke(context, **prompt_cache_kwargs(agent))
+        logger.info(
+            f"LLM response received successfully.\n{response.content}\n{response.usage_metadata}"
         )
-        response = llm.invoke(context)
+        record_usage(agent, response)
+        if cacheable:
+            response_cache.put(agent, context, response)
+        return response
+    except Exception as e:
+        logger.error(f"LLM invocation failed: {str(e)}")
+        return None
+
+
+async def alow_reasoning_gpt5mini(
+    context, agent: Optional[str] = None, cacheable=False
+):
+    """Async twin of low_reasoning_gpt5mini; awaits the shared AsyncClient pool."""
+    cached = response_cache.get(agent, context) if cacheable else None
+    if cached is not None:
+        return cached
+    logger.info("Invoking LLM async (gpt-5-mini)...")
+    try:
+        llm = get_llm(model="gpt-5-mini", temperature=0.3, reasoning_effort="minimal")
+        response = await llm.ainvoke(context, **prompt_cache_kwargs(agent))
         logger.info(
             f"LLM response received successfully.\n{response.content}\n{response.usage_metadata}"
         )
+        record_usage(agent, response)
+        if cacheable:
+            response_cache.put(agent, context, response)
         return response
     except Exception as e:
         logger.error(f"LLM invocation failed: {str(e)}")
         return None
+
+
+def low_reasoning_gpt5mini_structured(
+    context,
+    response_model: Type[BaseModel],
+    agent: Optional[str] = None,
+    cacheable=False,
+) -> Tuple[Optional[BaseMessage], Optional[BaseModel]]:
+    """
+    low_reasoning_gpt5mini with the reply held to response_model.
+    Returns (None, None) if the call itself fails. Only replies that validated
+    are cached.
+    """
+    cached = cached_structured(context, response_model, agent) if cacheable else None
+    if cached is not None:
+        return cached
+    logger.info("Invoking LLM (gpt-5-mini, structured)...")
+    try:
+        llm = get_llm(model="gpt-5-mini", temperature=0.3, reasoning_effort="minimal")
+        response, parsed = invoke_structured(llm, context, response_model, agent)
+        logger.info(
+            f"LLM response received successfully.\n{response.content}\n{response.usage_metadata}"
+        )
+        if cacheable and parsed is not None:
+            response_cache.put(
+                agent,
+                context,
+                response,
+                variant=response_model.__name__,
+                semantic=allows_semantic_reuse(response_model),
+            )
+        return response, parsed
+    except Exception as e:
+        logger.error(f"LLM invocation failed: {str(e)}")
+        return None, None
+
+
+async def alow_reasoning_gpt5mini_structured(
+    context,
+    response_model: Type[BaseModel],
+    agent: Optional[str] = None,
+    cacheable=False,
+) -> Tuple[Optional[BaseMessage], Optional[BaseModel]]:
+    """Async twin of low_reasoning_gpt5mini_structured."""
+    cached = cached_structured(context, response_model, agent) if cacheable else None
+    if cached is not None:
+        return cached
+    logger.info("Invoking LLM async (gpt-5-mini, structured)...")
+    try:
+        llm = get_llm(model="gpt-5-mini", temperature=0.3, reasoning_effort="minimal")
+        response, parsed = await ainvoke_structured(llm, context, response_model, agent)
+        logger.info(
+            f"LLM response received successfully.\n{response.content}\n{response.usage_metadata}"
+        )
+        if cacheable and parsed is not None:
+            response_cache.put(
+                agent,
+                context,
+                response,
+                variant=response_model.__name__,
+                semantic=allows_semantic_reuse(response_model),
+            )
+        return response, parsed
+    except Exception as e:
+        logger.error(f"LLM invocation failed: {str(e)}")
+        return None, None
@@ -0,0 +1,250 @@
+"""
+Opt-in cache of LLM replies for repeated, non-personalized contexts.
+
+Many conversations open the same way ("I want to get fit"), and with no user
+data in the context the orchestrator answers them the same way. Replies are keyed on (agent, variant, normalized context hash) and kept
+for a TTL with LRU eviction.
+
+With semantic lookup on, a miss also compares the last user message against
+cached entries whose earlier context is identical, using a local embedding
+(hashed character n-grams by default), and reuses a reply above the
+similarity threshold.
+
+Callers decide what may be cached: contexts carrying a user's goals,
+milestones or other personal data must not be passed here (see the
+`cacheable` argument in llms.openai_api). Replies that commit something
+(a goal, a milestone plan) must only be reused for the exact same context:
+"run a 5k by March" and "run a 10k by March" are near-duplicates to the
+embedding, but not the same goal. Pass semantic=False for those.
+"""
+
+import hashlib
+import logging
+import math
+import os
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.messages import BaseMessage, HumanMessage
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_ENABLED = os.getenv("GOALPILOT_RESPONSE_CACHE", "0") == "1"
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("GOALPILOT_RESPONSE_CACHE_TTL", "3600"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("GOALPILOT_RESPONSE_CACHE_SIZE", "1000"))
+# Near-duplicate lookup on the last user message
+RESPONSE_CACHE_SEMANTIC = os.getenv("GOALPILOT_RESPONSE_CACHE_SEMANTIC", "0") == "1"
+# Cosine similarity a near-duplicate must reach to reuse a reply
+SIMILARITY_THRESHOLD = 0.85
+
+# Hashed n-gram embedding: n-gram size and number of buckets
+NGRAM_SIZE = 3
+EMBEDDING_BUCKETS = 4096
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_EDGE_PUNCTUATION = " \t\n.,!?;:'\"…"
+
+Embedding = Dict[int, float]
+
+
+def normalize_text(text: str) -> str:
+    """Case, runs of whitespace and surrounding punctuation don't change a key."""
+    return _WHITESPACE_RE.sub(" ", text.lower()).strip(_EDGE_PUNCTUATION)
+
+
+def ngram_embedding(text: str) -> Embedding:
+    """L2-normalized sparse vector of hashed character n-grams."""
+    padded = f" {normalize_text(text)} "
+    counts: Dict[int, float] = {}
+    for i in range(max(len(padded) - NGRAM_SIZE + 1, 1)):
+        bucket = zlib.crc32(padded[i : i + NGRAM_SIZE].encode()) % EMBEDDING_BUCKETS
+        counts[bucket] = counts.get(bucket, 0.0) + 1.0
+    norm = math.sqrt(sum(v * v for v in counts.values()))
+    return {k: v / norm for k, v in counts.items()}
+
+
+def cosine(a: Embedding, b: Embedding) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(k, 0.0) for k, v in a.items())
+
+
+def _hash_messages(messages: Sequence[BaseMessage]) -> str:
+    digest = hashlib.sha256()
+    for message in messages:
+        content = message.content if isinstance(message.content, str) else ""
+        digest.update(message.type.encode())
+        digest.update(b"\x00")
+        digest.update(normalize_text(content).encode())
+        digest.update(b"\x01")
+    return digest.hexdigest()
+
+
+@dataclass
+class _Entry:
+    response: BaseMessage
+    expires_at: float
+    prefix_key: Tuple[str, str, str]
+    embedding: Optional[Embedding]
+
+
+class ResponseCache:
+    """Thread-safe TTL + LRU cache of AIMessages, keyed on the full context."""
+
+    def __init__(
+        self,
+        max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS,
+        enabled: bool = RESPONSE_CACHE_ENABLED,
+        embed: Optional[Callable[[str], Embedding]] = (
+            ngram_embedding if RESPONSE_CACHE_SEMANTIC else None
+        ),
+        similarity_threshold: float = SIMILARITY_THRESHOLD,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.embed = embed
+        self.similarity_threshold = similarity_threshold
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, ...], _Entry]" = OrderedDict()
+        # (agent, variant, prefix hash) -> keys of entries sharing that prefix
+        self._by_prefix: Dict[Tuple[str, str, str], List[Tuple[str, ...]]] = {}
+        self._stats = {
+            "hits": 0,
+            "semantic_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+
+    @staticmethod
+    def _split(context: Sequence[BaseMessage]):
+        """(everything before the last user message, that message's text)."""
+        if context and isinstance(context[-1], HumanMessage):
+            last = context[-1].content
+            return context[:-1], last if isinstance(last, str) else ""
+        return context, ""
+
+    def _keys(self, agent: Optional[str], context, variant: str):
+        prefix, last = self._split(context)
+        prefix_key = (agent or "unknown", variant, _hash_messages(prefix))
+        return prefix_key + (normalize_text(last),), prefix_key, last
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        siblings = self._by_prefix.get(entry.prefix_key, [])
+        if key in siblings:
+            siblings.remove(key)
+        if not siblings:
+            self._by_prefix.pop(entry.prefix_key, None)
+
+    def _live(self, key, now: float) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= now:
+            self._drop(key)
+            self._stats["expirations"] += 1
+            return None
+        return entry
+
+    def _nearest(self, prefix_key, last: str, now: float) -> Optional[Tuple]:
+        if not self.embed or not last:
+            return None
+        query = self.embed(last)
+        best_key, best_score = None, self.similarity_threshold
+        for key in list(self._by_prefix.get(prefix_key, [])):
+            entry = self._live(key, now)
+            if entry is None or entry.embedding is None:
+                continue
+            score = cosine(query, entry.embedding)
+            if score >= best_score:
+                best_key, best_score = key, score
+        return best_key
+
+    def get(
+        self,
+        agent: Optional[str],
+        context: Sequence[BaseMessage],
+        variant: str = "",
+        semantic: bool = True,
+    ) -> Optional[BaseMessage]:
+        """
+        A cached reply for this context, or None. Always None when disabled.
+        semantic=False skips the near-duplicate lookup: exact context only.
+        """
+        if not self.enabled:
+            return None
+        key, prefix_key, last = self._keys(agent, context, variant)
+        now = self._clock()
+        with self._lock:
+            stat = "hits"
+            if self._live(key, now) is None:
+                if not semantic:
+                    self._stats["misses"] += 1
+                    return None
+                key, stat = self._nearest(prefix_key, last, now), "semantic_hits"
+            if key is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats[stat] += 1
+            response = self._entries[key].response
+        logger.info(f"Response cache {stat[:-1].replace('_', ' ')} for {agent}")
+        return response.model_copy()
+
+    def put(
+        self,
+        agent: Optional[str],
+        context: Sequence[BaseMessage],
+        response: BaseMessage,
+        variant: str = "",
+        semantic: bool = True,
+    ):
+        """semantic=False stores the reply for exact-context lookups only."""
+        if not self.enabled:
+            return
+        key, prefix_key, last = self._keys(agent, context, variant)
+        embedding = self.embed(last) if semantic and self.embed and last else None
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = _Entry(
+                response=response,
+                expires_at=self._clock() + self.ttl_seconds,
+                prefix_key=prefix_key,
+                embedding=embedding,
+            )
+            self._by_prefix.setdefault(prefix_key, []).append(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            lookups = sum(self._stats[k] for k in ("hits", "semantic_hits", "misses"))
+            hits = self._stats["hits"] + self._stats["semantic_hits"]
+            return {
+                "enabled": self.enabled,
+                "semantic": self.embed is not None,
+                "entries": len(self._entries),
+                **self._stats,
+                "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_prefix.clear()
+
+
+# Process-wide cache consulted by llms.openai_api
+response_cache = ResponseCache()
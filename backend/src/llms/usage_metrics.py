@@ -0,0 +1,133 @@
+"""
+Per-agent metrics for LLM calls: prompt-cache hits and structured-output parsing.
+
+OpenAI caches prompt prefixes of 1024+ tokens automatically; a hit shows up in
+the response's usage_metadata as input_token_details.cache_read. Agents keep
+their static system prompt first (see agent_utils.assemble_context) so that
+prefix stays byte-identical across turns; these counters show whether it works.
+
+Structured responses are validated against the agent's response model; a reply
+that fails gets one repair attempt (see llms.openai_api.invoke_structured).
+StructuredOutputMetrics counts how often that happens and how often it helps.
+"""
+
+import logging
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PromptCacheMetrics:
+    """Per-agent totals of input and cached input tokens, plus the latest turns."""
+
+    def __init__(self, recent_turns: int = 200):
+        self._lock = threading.Lock()
+        self._totals: Dict[str, Dict[str, int]] = {}
+        self._recent: Deque[Dict[str, Any]] = deque(maxlen=recent_turns)
+
+    @staticmethod
+    def _hit_ratio(cached: int, total: int) -> float:
+        return round(cached / total, 4) if total else 0.0
+
+    def record(
+        self, agent: str, usage: Optional[Dict[str, Any]]
+    ) -> Optional[Dict[str, Any]]:
+        """Records one call's usage_metadata. Returns the turn's record."""
+        if not usage:
+            return None
+        input_tokens = int(usage.get("input_tokens") or 0)
+        details = usage.get("input_token_details") or {}
+        cached_tokens = int(details.get("cache_read") or 0)
+        turn = {
+            "agent": agent,
+            "input_tokens": input_tokens,
+            "cached_tokens": cached_tokens,
+            "hit_ratio": self._hit_ratio(cached_tokens, input_tokens),
+        }
+        with self._lock:
+            totals = self._totals.setdefault(
+                agent, {"calls": 0, "input_tokens": 0, "cached_tokens": 0}
+            )
+            totals["calls"] += 1
+            totals["input_tokens"] += input_tokens
+            totals["cached_tokens"] += cached_tokens
+            self._recent.append(turn)
+        logger.info(
+            f"Prompt cache [{agent}]: {cached_tokens}/{input_tokens} input tokens cached"
+        )
+        return turn
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            agents = {
+                agent: {
+                    **totals,
+                    "hit_ratio": self._hit_ratio(
+                        totals["cached_tokens"], totals["input_tokens"]
+                    ),
+                }
+                for agent, totals in self._totals.items()
+            }
+            return {"agents": agents, "recent": list(self._recent)}
+
+    def reset(self):
+        with self._lock:
+            self._totals.clear()
+            self._recent.clear()
+
+
+class StructuredOutputMetrics:
+    """Per-agent counts of structured calls, parse failures and repairs."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals: Dict[str, Dict[str, int]] = {}
+
+    @staticmethod
+    def _rate(count: int, calls: int) -> float:
+        return round(count / calls, 4) if calls else 0.0
+
+    def record(self, agent: str, first_try_ok: bool, repairs: int, parsed: bool):
+        """Records one structured call, after any repair attempts."""
+        with self._lock:
+            totals = self._totals.setdefault(
+                agent,
+                {"calls": 0, "parse_failures": 0, "repair_attempts": 0, "repaired": 0},
+            )
+            totals["calls"] += 1
+            totals["repair_attempts"] += repairs
+            if not first_try_ok:
+                totals["parse_failures"] += 1
+                if parsed:
+                    totals["repaired"] += 1
+        if not first_try_ok:
+            logger.warning(
+                f"Structured output [{agent}]: parse failure, "
+                f"{'repaired' if parsed else 'not repaired'} after {repairs} attempt(s)"
+            )
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            agents = {}
+            for agent, totals in self._totals.items():
+                unrecovered = totals["parse_failures"] - totals["repaired"]
+                agents[agent] = {
+                    **totals,
+                    "unrecovered": unrecovered,
+                    "parse_failure_rate": self._rate(
+                        totals["parse_failures"], totals["calls"]
+                    ),
+                    "unrecovered_rate": self._rate(unrecovered, totals["calls"]),
+                }
+            return {"agents": agents}
+
+    def reset(self):
+        with self._lock:
+            self._totals.clear()
+
+
+# Process-wide metrics shared by every LLM call
+prompt_cache_metrics = PromptCacheMetrics()
+structured_output_metrics = StructuredOutputMetrics()
@@ -0,0 +1,218 @@
+import asyncio
+from datetime import date, datetime
+import functools
+from concurrent.futures import ThreadPoolExecutor
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from persistence.dynamodb_database import (
+    DynamoDBHandler,
+    DEFAULT_MAX_POOL_CONNECTIONS,
+    GOAL_ATTRIBUTES,
+    MILESTONE_ATTRIBUTES,
+    TRACKER_ATTRIBUTES,
+)
+from persistence.storage import STORAGE_BACKEND, StorageBackend, get_storage
+from schemas.core_v2 import Goal, Milestone, Tracker, LogEntry
+
+
+class AsyncDynamoDBHandler:
+    """
+    Async counterpart of DynamoDBHandler with the same method surface.
+
+    boto3 itself is blocking, so every call is handed to a dedicated thread pool
+    sized to the botocore connection pool. The event loop never blocks on network
+    I/O and the HTTP connections stay warm across requests. Build it once per
+    process (see get_async_handler) and share it.
+
+    Pass `sync` to wrap another StorageBackend (e.g. SQLiteHandler) instead.
+    """
+
+    def __init__(
+        self,
+        region_name="us-east-1",
+        max_pool_connections: int = DEFAULT_MAX_POOL_CONNECTIONS,
+        sync: Optional[StorageBackend] = None,
+    ):
+        self.sync = sync or DynamoDBHandler(
+            region_name=region_name, max_pool_connections=max_pool_connections
+        )
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_pool_connections, thread_name_prefix="storage"
+        )
+
+    async def _run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(fn, *args, **kwargs)
+        )
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        # A closed handler can't run calls; get_async_handler builds a new one
+        with _shared_handlers_lock:
+            for region_name, handler in list(_shared_handlers.items()):
+                if handler is self:
+                    del _shared_handlers[region_name]
+
+    # --- 1. The "Super Read" ---
+    async def get_full_user_state(self, user_id: str) -> Dict[str, Any]:
+        """Same tree as DynamoDBHandler.get_full_user_state, queried concurrently."""
+        if not isinstance(self.sync, DynamoDBHandler):
+            return await self._run(self.sync.get_full_user_state, user_id)
+
+        cache = self.sync.cache
+        if cache is None:
+            return await self._load_full_user_state(user_id)
+
+        cached = cache.get(user_id)
+        if cached is not None:
+            return cached
+
+        load_token = cache.begin_load(user_id)
+        tree = await self._load_full_user_state(user_id)
+        cache.put(user_id, tree, load_token)
+        return tree
+
+    def get_dashboard_version(self, user_id: str) -> Optional[str]:
+        """In-memory only, so it is safe to call straight from the event loop."""
+        return self.sync.get_dashboard_version(user_id)
+
+    async def get_dashboard_snapshot(
+        self, user_id: str, since: Optional[str] = None
+    ) -> Tuple[Optional[str], Dict[str, Any]]:
+        tree = await self.get_full_user_state(user_id)
+        cache = self.sync.cache
+        snapshot = cache.snapshot(user_id, since) if cache else None
+        if snapshot is None:
+            return None, tree if since is None else {"full": True, **tree}
+        return snapshot
+
+    async def _load_full_user_state(self, user_id: str) -> Dict[str, Any]:
+        sync = self.sync
+        goals_nested, milestones_by_goal, trackers_by_milestone = await asyncio.gather(
+            self._run(
+                sync._dump_goals,
+                sync._iter_by_user(
+                    sync.goals_table, user_id, projection=GOAL_ATTRIBUTES
+                ),
+            ),
+            self._run(
+                sync._index_milestones,
+                sync._iter_by_user(
+                    sync.milestones_table, user_id, projection=MILESTONE_ATTRIBUTES
+                ),
+            ),
+            self._run(
+                sync._index_trackers,
+                sync._iter_by_user(
+                    sync.trackers_table, user_id, projection=TRACKER_ATTRIBUTES
+                ),
+            ),
+        )
+        return sync._attach_user_tree(
+            goals_nested, milestones_by_goal, trackers_by_milestone
+        )
+
+    # --- 2. Create ---
+    async def create_goal(self, goal: Goal):
+        await self._run(self.sync.create_goal, goal)
+
+    async def create_milestone(self, milestone: Milestone):
+        await self._run(self.sync.create_milestone, milestone)
+
+    async def create_tracker(self, tracker: Tracker):
+        await self._run(self.sync.create_tracker, tracker)
+
+    async def create_milestones_bulk(self, milestones: List[Milestone], atomic=False):
+        await self._run(self.sync.create_milestones_bulk, milestones, atomic)
+
+    async def create_trackers_bulk(self, trackers: List[Tracker], atomic=False):
+        await self._run(self.sync.create_trackers_bulk, trackers, atomic)
+
+    async def create_milestone_plan(
+        self, milestones: List[Milestone], trackers: List[Tracker], atomic=False
+    ):
+        await self._run(self.sync.create_milestone_plan, milestones, trackers, atomic)
+
+    async def log_tracker_update(self, update: LogEntry, tracker: Tracker) -> Tracker:
+        return await self._run(self.sync.log_tracker_update, update, tracker)
+
+    async def log_tracker_updates_bulk(
+        self, updates: List[LogEntry]
+    ) -> Tuple[List[LogEntry], List[LogEntry]]:
+        return await self._run(self.sync.log_tracker_updates_bulk, updates)
+
+    # --- 3. Reads ---
+    async def get_history_logs(
+        self,
+        user_id: str,
+        tracker_id: str,
+        limit: int = 30,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        return await self._run(
+            self.sync.get_history_logs, user_id, tracker_id, limit, start, end, cursor
+        )
+
+    async def compact_logs(
+        self, user_id: str, tracker_id: str, before: Optional[date] = None
+    ) -> int:
+        return await self._run(self.sync.compact_logs, user_id, tracker_id, before)
+
+    async def get_goals_for_user(self, user_id: str) -> List[Goal]:
+        return await self._run(self.sync.get_goals_for_user, user_id)
+
+    async def get_goal(self, user_id: str, goal_id: str) -> Optional[Goal]:
+        return await self._run(self.sync.get_goal, user_id, goal_id)
+
+    async def get_milestones(self, user_id: str, goal_id: str = None):
+        return await self._run(self.sync.get_milestones, user_id, goal_id)
+
+    async def get_tracker(self, user_id: str, tracker_id: str) -> Optional[Tracker]:
+        return await self._run(self.sync.get_tracker, user_id, tracker_id)
+
+    async def get_trackers_batch(
+        self, keys: List[Tuple[str, str]]
+    ) -> Dict[Tuple[str, str], Tracker]:
+        return await self._run(self.sync.get_trackers_batch, keys)
+
+    async def get_rollups(
+        self,
+        tracker: Tracker,
+        granularity: str,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ) -> List[Dict[str, Any]]:
+        return await self._run(self.sync.get_rollups, tracker, granularity, start, end)
+
+    # --- 4. Updates ---
+    async def update_goal(self, goal: Goal):
+        await self._run(self.sync.update_goal, goal)
+
+    async def update_milestone(self, milestone: Milestone):
+        await self._run(self.sync.update_milestone, milestone)
+
+    async def update_tracker(self, tracker: Tracker):
+        await self._run(self.sync.update_tracker, tracker)
+
+
+_shared_handlers: Dict[str, AsyncDynamoDBHandler] = {}
+_shared_handlers_lock = threading.Lock()
+
+
+def get_async_handler(region_name: str = "us-east-1") -> AsyncDynamoDBHandler:
+    """
+    Process-wide async handler over the configured StorageBackend (see
+    persistence.storage); one connection pool shared by every request.
+    """
+    with _shared_handlers_lock:
+        if region_name not in _shared_handlers:
+            _shared_handlers[region_name] = AsyncDynamoDBHandler(
+                region_name=region_name,
+                # The DynamoDB handler gets a pool of its own, sized to the executor
+                sync=None if STORAGE_BACKEND == "dynamodb" else get_storage(),
+            )
+        return _shared_handlers[region_name]
@@ -0,0 +1,275 @@
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from schemas.core_v2 import Goal, Milestone, Tracker
+from persistence.write_versions import WriteVersions
+
+DEFAULT_MAX_USERS = 1024
+DEFAULT_TTL_SECONDS = 300
+
+
+class _UserDashboard:
+    """
+    One user's dashboard, kept flat so a write can replace a single node.
+    goals: goal_id -> goal json
+    milestones: goal_id -> {milestone_id -> milestone json}
+    trackers: milestone_id -> {tracker_id -> tracker json}
+    changed: (kind, id) -> version of the last write to that node since the load
+    """
+
+    def __init__(self, tree: Dict[str, Any], loaded_at: float, version: int):
+        self.loaded_at = loaded_at
+        # Deltas can only be answered for versions at or after the load
+        self.base_version = version
+        self.version = version
+        self.changed: Dict[Tuple[str, str], int] = {}
+        self.goals: Dict[str, Dict] = {}
+        self.milestones: Dict[str, Dict[str, Dict]] = {}
+        self.trackers: Dict[str, Dict[str, Dict]] = {}
+        self.milestone_goal: Dict[str, str] = {}
+        self.tracker_milestone: Dict[str, str] = {}
+        self.rendered: Optional[Dict[str, Any]] = None
+
+        for g in tree["goals"]:
+            g = dict(g)
+            for m in g.pop("milestones", []):
+                m = dict(m)
+                for t in m.pop("trackers", []):
+                    self.set_tracker(t)
+                self.set_milestone(m)
+            self.set_goal(g)
+        self.changed.clear()
+
+    def set_goal(self, g: Dict):
+        self.goals[g["goal_id"]] = g
+        self.changed[("goal", g["goal_id"])] = self.version
+
+    def set_milestone(self, m: Dict):
+        old_goal = self.milestone_goal.get(m["milestone_id"])
+        if old_goal and old_goal != m["goal_id"]:
+            self.milestones[old_goal].pop(m["milestone_id"], None)
+        self.milestones.setdefault(m["goal_id"], {})[m["milestone_id"]] = m
+        self.milestone_goal[m["milestone_id"]] = m["goal_id"]
+        self.changed[("milestone", m["milestone_id"])] = self.version
+
+    def set_tracker(self, t: Dict):
+        old_milestone = self.tracker_milestone.get(t["tracker_id"])
+        if old_milestone and old_milestone != t["milestone_id"]:
+            self.trackers[old_milestone].pop(t["tracker_id"], None)
+        self.trackers.setdefault(t["milestone_id"], {})[t["tracker_id"]] = t
+        self.tracker_milestone[t["tracker_id"]] = t["milestone_id"]
+        self.changed[("tracker", t["tracker_id"])] = self.version
+
+    def _render_milestone(self, m_id: str, milestone: Dict) -> Dict:
+        trackers = self.trackers.get(m_id, {})
+        return {**milestone, "trackers": [trackers[t_id] for t_id in sorted(trackers)]}
+
+    def render(self) -> Dict[str, Any]:
+        # Sorted by id to match the order a fresh DynamoDB query returns
+        if self.rendered is None:
+            goals_nested = []
+            for g_id in sorted(self.goals):
+                milestones = self.milestones.get(g_id, {})
+                goals_nested.append(
+                    {
+                        **self.goals[g_id],
+                        "milestones": [
+                            self._render_milestone(m_id, milestones[m_id])
+                            for m_id in sorted(milestones)
+                        ],
+                    }
+                )
+            self.rendered = {"goals": goals_nested}
+        return self.rendered
+
+    def render_delta(self, since: int) -> Dict[str, List[Dict]]:
+        """Flat lists of the goals, milestones and trackers written after `since`."""
+        delta = {"goals": [], "milestones": [], "trackers": []}
+        for (kind, node_id), version in sorted(self.changed.items()):
+            if version <= since:
+                continue
+            if kind == "goal":
+                delta["goals"].append(self.goals[node_id])
+            elif kind == "milestone":
+                g_id = self.milestone_goal[node_id]
+                delta["milestones"].append(self.milestones[g_id][node_id])
+            else:
+                m_id = self.tracker_milestone[node_id]
+                delta["trackers"].append(self.trackers[m_id][node_id])
+        return delta
+
+
+class DashboardCache:
+    """
+    Per-user cache of the /dashboard tree with TTL expiry and LRU eviction.
+
+    Writes patch only the node they touch (a goal, milestone or tracker).
+    Returned trees are shared between callers and must be treated as read-only.
+
+    Every write and every fresh load takes a new tick of a process-wide clock.
+    A user's version token is "<boot id>-<tick>", so tokens issued by another
+    process or before a restart never match (see version / snapshot).
+
+    The cache assumes a single worker process. With several workers each keeps
+    its own copy, and a write served by one worker reaches the others' cached
+    trees only when they expire (ttl_seconds). ETags stay safe, since another
+    worker's token never matches, but /dashboard is not read-your-writes there.
+    """
+
+    def __init__(
+        self,
+        max_users: int = DEFAULT_MAX_USERS,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+    ):
+        self.max_users = max_users
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, _UserDashboard]" = OrderedDict()
+        # Tick of the last write per user, cached or not. A load that started
+        # before a write must not be stored over it (see begin_load / put).
+        self._versions = WriteVersions(max_users)
+        self._boot_id = secrets.token_hex(4)
+        self._lock = threading.RLock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.patches = 0
+        self.invalidations = 0
+
+    # --- Reads ---
+    def _live_entry(self, user_id: str) -> Optional[_UserDashboard]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        if time.monotonic() - entry.loaded_at > self.ttl_seconds:
+            del self._entries[user_id]
+            return None
+        return entry
+
+    def _token(self, version: int) -> str:
+        return f"{self._boot_id}-{version}"
+
+    def _parse_token(self, token: str) -> Optional[int]:
+        boot_id, _, version = token.rpartition("-")
+        if boot_id != self._boot_id or not version.isdigit():
+            return None
+        return int(version)
+
+    def version(self, user_id: str) -> Optional[str]:
+        """Version token of the cached tree, or None if it would need a DB read."""
+        with self._lock:
+            entry = self._live_entry(user_id)
+            if entry is None:
+                return None
+            return self._token(entry.version)
+
+    def snapshot(
+        self, user_id: str, since: Optional[str] = None
+    ) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """
+        (version token, body) for a cached user. Without `since` the body is the
+        full tree. With `since` it is a delta of the nodes written after that
+        version, or the full tree flagged "full" if the cache can't tell.
+        """
+        with self._lock:
+            entry = self._live_entry(user_id)
+            if entry is None:
+                return None
+            token = self._token(entry.version)
+            if since is None:
+                return token, entry.render()
+
+            since_version = self._parse_token(since)
+            if since_version is None or since_version < entry.base_version:
+                return token, {"version": token, "full": True, **entry.render()}
+            return token, {
+                "version": token,
+                "full": False,
+                **entry.render_delta(since_version),
+            }
+
+    def get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._live_entry(user_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry.render()
+
+    # --- Fills ---
+    def _tick(self, user_id: str) -> int:
+        return self._versions.tick(user_id)
+
+    def begin_load(self, user_id: str) -> int:
+        with self._lock:
+            return self._versions.get(user_id)
+
+    def put(self, user_id: str, tree: Dict[str, Any], load_token: int):
+        with self._lock:
+            if self._versions.get(user_id) != load_token:
+                # A write landed while we were reading; the tree may predate it
+                return
+            # A fresh load may carry writes made by other processes, so it
+            # never reuses the previous version token
+            entry = _UserDashboard(tree, time.monotonic(), self._tick(user_id))
+            self._entries[user_id] = entry
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    # --- Write-through patches ---
+    def _patch(self, user_id: str, apply):
+        with self._lock:
+            version = self._tick(user_id)
+            entry = self._live_entry(user_id)
+            if entry is None:
+                return
+            entry.version = version
+            apply(entry)
+            entry.rendered = None
+            self.patches += 1
+
+    def patch_goal(self, goal: Goal):
+        goal_json = goal.model_dump(mode="json")
+        self._patch(goal.user_id, lambda e: e.set_goal(goal_json))
+
+    def patch_milestone(self, milestone: Milestone):
+        milestone_json = milestone.model_dump(mode="json")
+        self._patch(milestone.user_id, lambda e: e.set_milestone(milestone_json))
+
+    def patch_tracker(self, tracker: Tracker):
+        tracker_json = tracker.model_dump(mode="json")
+        self._patch(tracker.user_id, lambda e: e.set_tracker(tracker_json))
+
+    def invalidate(self, user_id: str):
+        with self._lock:
+            self._tick(user_id)
+            if self._entries.pop(user_id, None) is not None:
+                self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_users": self.max_users,
+                "tracked_writers": len(self._versions),
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "evictions": self.evictions,
+                "patches": self.patches,
+                "invalidations": self.invalidations,
+            }
+
+
+# Shared by every handler in the process, so agent writes patch the same cache
+# the dashboard route reads from.
+dashboard_cache = DashboardCache()
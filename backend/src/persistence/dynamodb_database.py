@@ -1,20 +1,105 @@
+from datetime import date, datetime
 from decimal import Decimal
+import random
+import threading
+import time
 import boto3
+from botocore.config import Config
 from boto3.dynamodb.conditions import Key, Attr
-from typing import List, Dict, Optional, Any
+from boto3.dynamodb.types import TypeSerializer
+from typing import Callable, Iterable, Iterator, List, Dict, Optional, Any, Tuple
 from concurrent.futures import ThreadPoolExecutor
-from schemas.core_v2 import Goal, Milestone, Tracker, LogEntry
+from itertools import groupby
+from schemas.core_v2 import Goal, Milestone, Tracker, LogEntry, WindowAggregate
+from persistence.dashboard_cache import DashboardCache, dashboard_cache
+from persistence.storage import decode_log_cursor, encode_log_cursor
+from persistence.log_packing import (
+    PACK_MAX_LOGS,
+    PACKED_SUFFIX,
+    is_packed,
+    month_key,
+    pack_logs,
+    packed_sk,
+    unpack_logs,
+)
+from persistence.tracker_aggregation import (
+    add_to_window,
+    apply_log,
+    as_utc,
+    rebuild_progress,
+    rollup_buckets,
+    utc_key,
+    window_value,
+)
+from persistence.user_goals_cache import user_goals_cache
+
+# Size of the botocore HTTP connection pool. Shared handlers are hit from many
+# threads at once, so this should be at least the number of concurrent workers.
+DEFAULT_MAX_POOL_CONNECTIONS = 50
+
+# DynamoDB's cap on the number of actions in one TransactWriteItems call
+TRANSACT_MAX_ITEMS = 100
+# DynamoDB's cap on the number of keys in one BatchGetItem call
+BATCH_GET_MAX_KEYS = 100
+# UnprocessedKeys mean the table is throttling: retry with exponential backoff
+# and full jitter, starting at BATCH_GET_BASE_DELAY seconds
+BATCH_GET_MAX_ATTEMPTS = 8
+BATCH_GET_BASE_DELAY = 0.05
+BATCH_GET_MAX_DELAY = 2.0
+
+# Optimistic-concurrency retries when another log lands on the same tracker
+PROGRESS_WRITE_ATTEMPTS = 5
+
+# Attributes read back by from_db_format; anything else on the item is skipped
+GOAL_ATTRIBUTES = ["user_id", "goal_id", "goal_json"]
+MILESTONE_ATTRIBUTES = ["user_id", "goal_id", "milestone_id", "milestone_json"]
+TRACKER_ATTRIBUTES = [
+    "user_id",
+    "milestone_id",
+    "tracker_id",
+    "current_value",
+    "last_log_date",
+    "tracker_json",
+    "progress",
+]
+
+# Attributes of a packed month of logs (see persistence.log_packing)
+PACKED_ATTRIBUTES = ["count", "start_us", "ts_deltas", "offsets", "values"]
+
+_serializer = TypeSerializer()
+
+
+def serialize_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Plain item -> the typed attribute format the low-level client expects."""
+    return {k: _serializer.serialize(v) for k, v in item.items()}
 
 
 class DynamoDBHandler:
-    def __init__(self, region_name="us-east-1"):
-        self.dynamodb = boto3.resource("dynamodb", region_name=region_name)
+    def __init__(
+        self,
+        region_name="us-east-1",
+        max_pool_connections: int = DEFAULT_MAX_POOL_CONNECTIONS,
+        page_size: Optional[int] = None,
+        cache: Optional[DashboardCache] = dashboard_cache,
+    ):
+        # Items per Query page; None lets DynamoDB fill each page up to 1 MB
+        self.page_size = page_size
+        # Write-through dashboard cache; pass cache=None to always hit DynamoDB
+        self.cache = cache
+        self.dynamodb = boto3.session.Session(region_name=region_name).resource(
+            "dynamodb",
+            config=Config(
+                max_pool_connections=max_pool_connections,
+                retries={"mode": "adaptive"},
+            ),
+        )
 
         # Define Table references
         self.goals_table = self.dynamodb.Table("Goals")
         self.milestones_table = self.dynamodb.Table("Milestones")
         self.trackers_table = self.dynamodb.Table("Trackers")
         self.logs_table = self.dynamodb.Table("Logs")
+        self.rollups_table = self.dynamodb.Table("Rollups")
 
     # --- 1. The "Super Read" (Optimized for Frontend) ---
     def get_full_user_state(self, user_id: str) -> Dict[str, Any]:
@@ -28,213 +113,831 @@ class DynamoDBHandler:
                 ]}
             ]
         }
+        Served from the dashboard cache when possible.
         """
+        if self.cache is None:
+            return self._load_full_user_state(user_id)
+
+        cached = self.cache.get(user_id)
+        if cached is not None:
+            return cached
+
+        load_token = self.cache.begin_load(user_id)
+        tree = self._load_full_user_state(user_id)
+        self.cache.put(user_id, tree, load_token)
+        return tree
+
+    def get_dashboard_version(self, user_id: str) -> Optional[str]:
+        """Version token of the cached dashboard. Never touches DynamoDB."""
+        return self.cache.version(user_id) if self.cache else None
+
+    def get_dashboard_snapshot(
+        self, user_id: str, since: Optional[str] = None
+    ) -> Tuple[Optional[str], Dict[str, Any]]:
+        """
+        (version token, body) for the dashboard. With `since`, the body holds only
+        the goals, milestones and trackers changed after that version when the
+        cache can answer it. The version is None if the tree couldn't be cached.
+        """
+        tree = self.get_full_user_state(user_id)
+        snapshot = self.cache.snapshot(user_id, since) if self.cache else None
+        if snapshot is None:
+            return None, tree if since is None else {"full": True, **tree}
+        return snapshot
+
+    def _load_full_user_state(self, user_id: str) -> Dict[str, Any]:
+        # Each partition is streamed page by page and indexed as it arrives,
+        # so only the JSON output is kept, never the full list of raw items.
         with ThreadPoolExecutor() as executor:
             future_goals = executor.submit(
-                self._query_all_by_user, self.goals_table, user_id
+                self._dump_goals,
+                self._iter_by_user(
+                    self.goals_table, user_id, projection=GOAL_ATTRIBUTES
+                ),
             )
             future_milestones = executor.submit(
-                self._query_all_by_user, self.milestones_table, user_id
+                self._index_milestones,
+                self._iter_by_user(
+                    self.milestones_table, user_id, projection=MILESTONE_ATTRIBUTES
+                ),
             )
             future_trackers = executor.submit(
-                self._query_all_by_user, self.trackers_table, user_id
+                self._index_trackers,
+                self._iter_by_user(
+                    self.trackers_table, user_id, projection=TRACKER_ATTRIBUTES
+                ),
             )
 
-            goals_data = future_goals.result()
-            milestones_data = future_milestones.result()
-            trackers_data = future_trackers.result()
+            goals_nested = future_goals.result()
+            milestones_by_goal = future_milestones.result()
+            trackers_by_milestone = future_trackers.result()
 
-        # Reconstruct the Tree (In-Memory Join)
-        # This saves $$$ by avoiding complex Joins or 50 DB calls
+        return self._attach_user_tree(
+            goals_nested, milestones_by_goal, trackers_by_milestone
+        )
 
-        # 1. Index Trackers by Milestone
+    # Reconstruct the Tree (In-Memory Join)
+    # This saves $$$ by avoiding complex Joins or 50 DB calls.
+    # Items were validated when written, so they go straight to JSON (json_from_db).
+    @staticmethod
+    def _index_trackers(trackers_data: Iterable[Dict]) -> Dict[str, List[Dict]]:
+        """1. Index Trackers by Milestone"""
         trackers_by_milestone = {}
-        # breakpoint()
         for t in trackers_data:
-            # Reconstruct Pydantic to ensure clean data, then dump back or keep as dict
-            # t_obj = Tracker.from_db_format(t)
             m_id = t["milestone_id"]
             if m_id not in trackers_by_milestone:
                 trackers_by_milestone[m_id] = []
-            trackers_by_milestone[m_id].append(
-                Tracker.from_db_format(t).model_dump(mode="json")
-            )
+            trackers_by_milestone[m_id].append(Tracker.json_from_db(t))
+        return trackers_by_milestone
 
-        # 2. Index Milestones by Goal
+    @staticmethod
+    def _index_milestones(milestones_data: Iterable[Dict]) -> Dict[str, List[Dict]]:
+        """2. Index Milestones by Goal"""
         milestones_by_goal = {}
         for m in milestones_data:
-            mtemp = Milestone.from_db_format(m).model_dump(mode="json")
-            mtemp["trackers"] = trackers_by_milestone.get(m["milestone_id"], [])
             g_id = m["goal_id"]
             if g_id not in milestones_by_goal:
                 milestones_by_goal[g_id] = []
-            milestones_by_goal[g_id].append(mtemp)
+            milestones_by_goal[g_id].append(Milestone.json_from_db(m))
+        return milestones_by_goal
 
-        goals_nested = []
-        # 3. Attach to Goals
-        for g in goals_data:
-            gtemp = Goal.from_db_format(g).model_dump(mode="json")
-            gtemp["milestones"] = milestones_by_goal.get(g["goal_id"], [])
-            goals_nested.append(gtemp)
+    @staticmethod
+    def _dump_goals(goals_data: Iterable[Dict]) -> List[Dict]:
+        return [Goal.json_from_db(g) for g in goals_data]
 
+    @staticmethod
+    def _attach_user_tree(
+        goals_nested: List[Dict],
+        milestones_by_goal: Dict[str, List[Dict]],
+        trackers_by_milestone: Dict[str, List[Dict]],
+    ) -> Dict[str, Any]:
+        """3. Attach Trackers to Milestones and Milestones to Goals"""
+        for milestones in milestones_by_goal.values():
+            for m in milestones:
+                m["trackers"] = trackers_by_milestone.get(m["milestone_id"], [])
+        for g in goals_nested:
+            g["milestones"] = milestones_by_goal.get(g["goal_id"], [])
         return {"goals": goals_nested}
 
     # --- 2. Standard CRUD (Create) ---
     def create_goal(self, goal: Goal):
         self.goals_table.put_item(Item=goal.to_db_format())
+        user_goals_cache.invalidate(goal.user_id)
+        if self.cache:
+            self.cache.patch_goal(goal)
 
     def create_milestone(self, milestone: Milestone):
         self.milestones_table.put_item(Item=milestone.to_db_format())
+        if self.cache:
+            self.cache.patch_milestone(milestone)
 
     def create_tracker(self, tracker: Tracker):
         self.trackers_table.put_item(Item=tracker.to_db_format())
+        if self.cache:
+            self.cache.patch_tracker(tracker)
+
+    # --- 2b. Bulk Create ---
+    def create_milestones_bulk(self, milestones: List[Milestone], atomic=False):
+        self._bulk_put([(self.milestones_table, m) for m in milestones], atomic)
+        if self.cache:
+            for m in milestones:
+                self.cache.patch_milestone(m)
+
+    def create_trackers_bulk(self, trackers: List[Tracker], atomic=False):
+        self._bulk_put([(self.trackers_table, t) for t in trackers], atomic)
+        if self.cache:
+            for t in trackers:
+                self.cache.patch_tracker(t)
 
-    def log_tracker_update(self, update: LogEntry, tracker: Tracker):
+    def create_milestone_plan(
+        self, milestones: List[Milestone], trackers: List[Tracker], atomic=False
+    ):
         """
-        Atomically writes the log and updates the tracker aggregation.
+        Persists a whole milestone DAG with its trackers in as few round trips as
+        possible. With atomic=True milestones and trackers share the transactions.
         """
-        # TransactWriteItems requires the low-level client
+        if not atomic:
+            self.create_milestones_bulk(milestones)
+            self.create_trackers_bulk(trackers)
+            return
+
+        self._bulk_put(
+            [(self.milestones_table, m) for m in milestones]
+            + [(self.trackers_table, t) for t in trackers],
+            atomic=True,
+        )
+        if self.cache:
+            for m in milestones:
+                self.cache.patch_milestone(m)
+            for t in trackers:
+                self.cache.patch_tracker(t)
+
+    def _bulk_put(self, puts: List[Tuple[Any, Any]], atomic: bool):
+        """
+        Writes (table, model) pairs with model.to_db_format().
+        Non-atomic: BatchWriteItem via batch_writer, which sends 25-item batches
+        and re-queues UnprocessedItems until they are written.
+        Atomic: TransactWriteItems in chunks of TRANSACT_MAX_ITEMS. Each chunk is
+        all-or-nothing; only plans that fit one chunk are atomic as a whole.
+        """
+        if not atomic:
+            by_table = {}
+            for table, model in puts:
+                by_table.setdefault(table.name, (table, []))[1].append(model)
+            for table, models in by_table.values():
+                with table.batch_writer() as batch:
+                    for model in models:
+                        batch.put_item(Item=model.to_db_format())
+            return
+
         client = self.dynamodb.meta.client
+        for start in range(0, len(puts), TRANSACT_MAX_ITEMS):
+            chunk = puts[start : start + TRANSACT_MAX_ITEMS]
+            client.transact_write_items(
+                TransactItems=[
+                    {
+                        "Put": {
+                            "TableName": table.name,
+                            "Item": serialize_item(model.to_db_format()),
+                        }
+                    }
+                    for table, model in chunk
+                ]
+            )
 
-        timestamp_str = update.timestamp.isoformat()
-        log_value_str = str(update.value)  # Boto3 client requires numbers as strings
-        # breakpoint()
-
-        # 1. Prepare the Put operation for the Logs table
-        # Based on your get_history_logs, PK is 'user_id' and SK is 'sk'
-        log_put = {
-            "Put": {
-                "TableName": self.logs_table.name,
-                "Item": {
-                    "user_id": update.user_id,
-                    "sk": f"{update.tracker_id}#{timestamp_str}",
-                    "timestamp": timestamp_str,
-                    "value": log_value_str,
-                    "tracker_id": update.tracker_id,
-                },
-            }
+    def _log_item(self, update: LogEntry) -> Dict[str, Any]:
+        # Based on get_history_logs, PK is 'user_id' and SK is 'sk'
+        timestamp_str = utc_key(update.timestamp)
+        return {
+            "user_id": update.user_id,
+            "sk": f"{update.tracker_id}#{timestamp_str}",
+            "timestamp": timestamp_str,
+            "value": Decimal(str(update.value)),  # DynamoDB expects Decimal
+            "tracker_id": update.tracker_id,
+        }
+
+    def _rollup_sk(self, tracker_id: str, granularity: str, bucket_start: date):
+        return f"{tracker_id}#{granularity}#{bucket_start.isoformat()}"
+
+    def _fold_logs(
+        self, tracker: Tracker, updates: List[LogEntry]
+    ) -> Tuple[Tracker, List[Dict[str, Any]]]:
+        """
+        Returns the tracker with `updates` folded into its progress, and the
+        rollup items (day / week / window buckets) they touch, updated likewise.
+        """
+        updated = tracker.model_copy(deep=True)
+        by_bucket: Dict[Tuple[str, date], List[LogEntry]] = {}
+        in_place = True
+        for update in updates:
+            in_place &= apply_log(updated, update.value, update.timestamp)
+            for bucket in rollup_buckets(tracker, update.timestamp):
+                by_bucket.setdefault(bucket, []).append(update)
+        updated.progress.version += 1
+
+        # Strongly consistent, so the buckets are at least as new as the tracker
+        # version this write is conditioned on
+        stored = {
+            item["sk"]: item
+            for item in self._batch_get(
+                self.rollups_table,
+                [
+                    {
+                        "user_id": tracker.user_id,
+                        "sk": self._rollup_sk(tracker.tracker_id, *bucket),
+                    }
+                    for bucket in by_bucket
+                ],
+                consistent=True,
+            )
         }
+        rollups = []
+        for (granularity, bucket_start), entries in by_bucket.items():
+            sk = self._rollup_sk(tracker.tracker_id, granularity, bucket_start)
+            window = WindowAggregate(**stored.get(sk, {}))
+            for entry in entries:
+                add_to_window(window, Decimal(str(entry.value)), tracker.target_range)
+            rollups.append(
+                {
+                    "user_id": tracker.user_id,
+                    "sk": sk,
+                    "tracker_id": tracker.tracker_id,
+                    "granularity": granularity,
+                    "bucket_start": bucket_start.isoformat(),
+                    **window.model_dump(),
+                }
+            )
+        if not in_place:
+            self._rebuild_progress(updated, rollups)
+        return updated, rollups
 
-        # 2. Prepare the Update operation for the Trackers table
-        tracker_key = {
-            "user_id": tracker.user_id,
-            "tracker_id": tracker.tracker_id,
+    def _rebuild_progress(self, tracker: Tracker, rollups: List[Dict[str, Any]]):
+        """
+        Recomputes progress from every "window" rollup bucket, with `rollups`
+        (about to be written) taking the place of the stored ones. Only needed
+        when a log lands in a window progress no longer keeps.
+        """
+        prefix = f"{tracker.tracker_id}#window#"
+        buckets = {
+            item["sk"]: item
+            for item in self._iter_by_user(
+                self.rollups_table,
+                tracker.user_id,
+                sort_key_condition=Key("sk").begins_with(prefix),
+                consistent=True,
+            )
         }
+        buckets.update((r["sk"], r) for r in rollups if r["sk"].startswith(prefix))
+        rebuild_progress(
+            tracker,
+            (
+                (date.fromisoformat(item["bucket_start"]), WindowAggregate(**item))
+                for item in buckets.values()
+            ),
+        )
+
+    def _progress_update_params(
+        self, tracker: Tracker, expected_version: int
+    ) -> Dict[str, Any]:
+        """
+        UpdateItem parameters that store the tracker's recomputed progress, only
+        if nobody else has written it since it was read at expected_version.
+        """
+        item = tracker.to_db_format()
+        return {
+            "Key": {"user_id": tracker.user_id, "tracker_id": tracker.tracker_id},
+            "UpdateExpression": "SET #p = :progress, current_value = :val, last_log_date = :ts",
+            "ConditionExpression": "attribute_exists(tracker_id) AND (attribute_not_exists(#p) OR #p.#v = :expected)",
+            "ExpressionAttributeNames": {"#p": "progress", "#v": "version"},
+            "ExpressionAttributeValues": {
+                ":progress": item["progress"],
+                ":val": item["current_value"],
+                ":ts": item["last_log_date"],
+                ":expected": expected_version,
+            },
+        }
+
+    def _stored_log_keys(self, tracker: Tracker, updates: List[LogEntry]) -> set:
+        """
+        Sort keys of the `updates` that are already in the Logs table, either as
+        raw items or inside their month's packed item. Strongly consistent.
+        """
+        sks = {self._log_item(u)["sk"] for u in updates}
+        prefix = f"{tracker.tracker_id}#"
+        months = {month_key(sk[len(prefix) :]) for sk in sks}
+        keys = [{"user_id": tracker.user_id, "sk": sk} for sk in sks] + [
+            {"user_id": tracker.user_id, "sk": packed_sk(tracker.tracker_id, month)}
+            for month in months
+        ]
+        stored = set()
+        for item in self._batch_get(self.logs_table, keys, consistent=True):
+            if is_packed(item):
+                stored.update(prefix + log["timestamp"] for log in unpack_logs(item))
+            else:
+                stored.add(item["sk"])
+        return stored & sks
 
-        update_action = {}
+    def _write_progress(self, tracker: Tracker, updates: List[LogEntry]) -> Tracker:
+        """
+        Writes the `updates` that aren't stored yet and folds them into the
+        tracker and its rollups, all in one transaction.
 
-        if tracker.metric_type == "SUM":
-            # Atomic addition (safe for concurrent requests)
+        Idempotent: a log whose key (tracker, timestamp) is already stored is
+        skipped, so a resubmitted log is never counted twice. The log puts are
+        conditional on the key not existing, and the tracker update is
+        version-checked. All rollup writes for a tracker go through here, so
+        that check also serializes them. On a conflict the tracker is re-read,
+        the stored logs are checked again and the rest are folded into the
+        fresh state.
+        """
+        # TransactWriteItems requires the low-level client, which only takes
+        # typed attribute values
+        client = self.dynamodb.meta.client
+        for _ in range(PROGRESS_WRITE_ATTEMPTS):
+            stored = self._stored_log_keys(tracker, updates)
+            new_logs = [u for u in updates if self._log_item(u)["sk"] not in stored]
+            if not new_logs:
+                return tracker
+
+            updated, rollups = self._fold_logs(tracker, new_logs)
+            params = self._progress_update_params(updated, tracker.progress.version)
             update_action = {
                 "Update": {
+                    **params,
                     "TableName": self.trackers_table.name,
-                    "Key": tracker_key,
-                    "UpdateExpression": "SET current_value = current_value + :val, last_log_date = :ts",
-                    "ExpressionAttributeValues": {
-                        ":val": Decimal(
-                            log_value_str
-                        ),  # DynamoDB expects Decimal for numbers
-                        ":ts": timestamp_str,
-                    },
+                    "Key": serialize_item(params["Key"]),
+                    "ExpressionAttributeValues": serialize_item(
+                        params["ExpressionAttributeValues"]
+                    ),
                 }
             }
-        elif tracker.metric_type in ["LATEST", "BOOLEAN"]:
-            # Conditional update: Only overwrite if this log is newer
-            update_action = {
-                "Update": {
-                    "TableName": self.trackers_table.name,
-                    "Key": tracker_key,
-                    "UpdateExpression": "SET current_value = :val, last_log_date = :ts",
-                    "ConditionExpression": "attribute_not_exists(last_log_date) OR last_log_date < :ts",
-                    "ExpressionAttributeValues": {
-                        ":val": Decimal(log_value_str),
-                        ":ts": timestamp_str,
-                    },
+            log_puts = [
+                {
+                    "Put": {
+                        "TableName": self.logs_table.name,
+                        "Item": serialize_item(self._log_item(update)),
+                        "ConditionExpression": "attribute_not_exists(sk)",
+                    }
                 }
-            }
-
-        # 3. Execute the Transaction
-        try:
-            client.transact_write_items(
-                TransactItems=[log_put, update_action]
-            )  # update_action (DEBUG: DOESN"T WORK WITH THIS)
-        except client.exceptions.TransactionCanceledException as e:
-            # Check if the transaction was canceled because of our ConditionExpression
-            # This happens if a delayed log arrives for a LATEST/BOOLEAN tracker.
-            if "ConditionalCheckFailed" in str(e):
-                # We still want to save the historical log, we just don't want it
-                # to overwrite the newer 'current_value' on the tracker.
-                # Use the high-level resource here for a simple put.
-                self.logs_table.put_item(
-                    Item={
-                        "user_id": update.user_id,
-                        "sk": f"{update.tracker_id}#{timestamp_str}",
-                        "timestamp": timestamp_str,
-                        "value": Decimal(log_value_str),  # Resource requires Decimal
-                        "tracker_id": update.tracker_id,
+                for update in new_logs
+            ]
+            rollup_puts = [
+                {
+                    "Put": {
+                        "TableName": self.rollups_table.name,
+                        "Item": serialize_item(rollup),
                     }
+                }
+                for rollup in rollups
+            ]
+            try:
+                client.transact_write_items(
+                    TransactItems=[*log_puts, update_action, *rollup_puts]
                 )
-            else:
+                if self.cache:
+                    self.cache.patch_tracker(updated)
+                return updated
+            except client.exceptions.TransactionCanceledException as e:
                 # Re-raise if it failed for any other reason (capacity, permissions, etc.)
-                breakpoint()
-                raise e
+                if "ConditionalCheckFailed" not in str(e):
+                    raise
+
+            # Strongly consistent, or the retry could fold into the same stale
+            # version and lose the race again
+            tracker_id = tracker.tracker_id
+            tracker = self.get_tracker(tracker.user_id, tracker_id, consistent=True)
+            if tracker is None:
+                raise ValueError(f"Tracker {tracker_id} no longer exists")
+        raise RuntimeError(
+            f"Tracker {tracker.tracker_id} kept changing, gave up after "
+            f"{PROGRESS_WRITE_ATTEMPTS} attempts"
+        )
+
+    def log_tracker_update(self, update: LogEntry, tracker: Tracker) -> Tracker:
+        """
+        Atomically writes the log and updates the tracker aggregation and rollups.
+        Resubmitting a log that is already stored changes nothing.
+        Returns the tracker with its updated progress.
+        """
+        return self._write_progress(tracker, [update])
+
+    def _transaction_chunks(
+        self, tracker: Tracker, updates: List[LogEntry]
+    ) -> Iterator[List[LogEntry]]:
+        """
+        Splits logs (oldest first) so that each chunk's log puts and rollup
+        buckets fit in one transaction next to the tracker update.
+        """
+        chunk, buckets = [], set()
+        for update in sorted(updates, key=lambda u: as_utc(u.timestamp)):
+            update_buckets = set(rollup_buckets(tracker, update.timestamp))
+            actions = len(chunk) + 1 + len(buckets | update_buckets) + 1
+            if chunk and actions > TRANSACT_MAX_ITEMS:
+                yield chunk
+                chunk, buckets = [], set()
+            chunk.append(update)
+            buckets |= update_buckets
+        if chunk:
+            yield chunk
+
+    def log_tracker_updates_bulk(
+        self, updates: List[LogEntry]
+    ) -> Tuple[List[LogEntry], List[LogEntry]]:
+        """
+        Ingests many logs (e.g. an offline sync) in a handful of round trips:
+        one BatchGetItem for every tracker involved, then one transaction per
+        tracker writing its logs, its rollups and its progress together (more
+        only if they don't fit in one).
+        Returns (logged, rejected); entries whose tracker doesn't exist are rejected.
+
+        Safe to retry after a partial failure: logs that are already stored
+        are skipped rather than folded in again.
+        """
+        by_tracker: Dict[Tuple[str, str], Dict[str, LogEntry]] = {}
+        for update in updates:
+            # Same timestamp means same log item; the last one wins
+            by_tracker.setdefault((update.user_id, update.tracker_id), {})[
+                utc_key(update.timestamp)
+            ] = update
+        trackers = self.get_trackers_batch(by_tracker.keys())
+
+        logged, rejected = [], []
+        for key, entries in by_tracker.items():
+            tracker = trackers.get(key)
+            if tracker is None:
+                rejected.extend(entries.values())
+                continue
+            for chunk in self._transaction_chunks(tracker, list(entries.values())):
+                tracker = self._write_progress(tracker, chunk)
+            logged.extend(entries.values())
+
+        return logged, rejected
 
     # --- 3. Optimized Reads ---
-    def _query_all_by_user(self, table, user_id: str) -> List[Dict]:
+    def _iter_by_user(
+        self,
+        table,
+        user_id: str,
+        page_size: Optional[int] = None,
+        projection: Optional[List[str]] = None,
+        filter_expression=None,
+        sort_key_condition=None,
+        consistent: bool = False,
+    ) -> Iterator[Dict]:
+        """
+        Lazily yields every item in a user's partition (or the part of it that
+        matches sort_key_condition).
+        Follows LastEvaluatedKey, so results are never cut off at DynamoDB's 1 MB
+        page limit, and only one page is held in memory at a time.
+        """
+        key_condition = Key("user_id").eq(user_id)
+        if sort_key_condition is not None:
+            key_condition = key_condition & sort_key_condition
+        query_kwargs = {
+            "KeyConditionExpression": key_condition,
+        }
+        page_size = page_size or self.page_size
+        if page_size:
+            query_kwargs["Limit"] = page_size
+        if projection:
+            # Placeholders keep reserved words (e.g. "timestamp") out of the expression
+            names = {f"#p{i}": attr for i, attr in enumerate(projection)}
+            query_kwargs["ProjectionExpression"] = ", ".join(names)
+            query_kwargs["ExpressionAttributeNames"] = names
+        if filter_expression is not None:
+            query_kwargs["FilterExpression"] = filter_expression
+        if consistent:
+            query_kwargs["ConsistentRead"] = True
+
+        while True:
+            response = table.query(**query_kwargs)
+            yield from response.get("Items", [])
+
+            last_key = response.get("LastEvaluatedKey")
+            if not last_key:
+                return
+            query_kwargs["ExclusiveStartKey"] = last_key
+
+    def _query_all_by_user(self, table, user_id: str, **kwargs) -> List[Dict]:
         """Helper to fetch all items for a partition key."""
-        response = table.query(KeyConditionExpression=Key("user_id").eq(user_id))
-        return response.get("Items", [])
+        return list(self._iter_by_user(table, user_id, **kwargs))
+
+    def _iter_logs_desc(
+        self,
+        user_id: str,
+        tracker_id: str,
+        lower: str,
+        upper: str,
+        page_size: int,
+        projection: Optional[List[str]] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Yields a tracker's logs newest first, unpacking packed months on the way.
+        lower/upper bound the sort key (tracker prefix excluded). A month's packed
+        item sorts right before its raw logs, so each month is merged and
+        de-duplicated (a raw log may outlive its packing) before it is yielded.
+        """
+        prefix = f"{tracker_id}#"
+        query_kwargs = {
+            "KeyConditionExpression": Key("user_id").eq(user_id)
+            & Key("sk").between(prefix + lower, prefix + upper),
+            "ScanIndexForward": False,  # Newest first
+            "Limit": page_size,
+        }
+        if projection:
+            names = {f"#p{i}": attr for i, attr in enumerate(projection)}
+            query_kwargs["ProjectionExpression"] = ", ".join(names)
+            query_kwargs["ExpressionAttributeNames"] = names
+
+        def flush(items):
+            logs = {}
+            for item in items:
+                for log in unpack_logs(item) if is_packed(item) else [item]:
+                    logs[log["timestamp"]] = {
+                        "timestamp": log["timestamp"],
+                        "value": log["value"],
+                        "tracker_id": log["tracker_id"],
+                    }
+            return [logs[ts] for ts in sorted(logs, reverse=True)]
+
+        month, group = None, []
+        while True:
+            response = self.logs_table.query(**query_kwargs)
+            for item in response.get("Items", []):
+                item_month = month_key(item["sk"][len(prefix) :])
+                if item_month != month:
+                    yield from flush(group)
+                    month, group = item_month, []
+                group.append(item)
+
+            last_key = response.get("LastEvaluatedKey")
+            if not last_key:
+                break
+            query_kwargs["ExclusiveStartKey"] = last_key
+        yield from flush(group)
+
+    def get_history_logs(
+        self,
+        user_id: str,
+        tracker_id: str,
+        limit: int = 30,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Fetches one page of logs for ONE tracker, newest first, from raw and
+        packed (see compact_logs) items alike.
+        Uses the Composite Key trick: SK is "tracker_id#timestamp", so a time range
+        is a BETWEEN on the sort key. Returns {"items", "next_cursor"}; pass
+        next_cursor back to get the next (older) page. It is None on the last page.
+        """
+        prefix = f"{tracker_id}#"
+        lower = utc_key(start) if start else ""
+        upper = utc_key(end) if end else None
+        before = decode_log_cursor(cursor, prefix)[len(prefix) :] if cursor else None
+        if before and (upper is None or before <= upper):
+            upper, inclusive = before, False
+        else:
+            inclusive = True
+
+        logs = self._iter_logs_desc(
+            user_id,
+            tracker_id,
+            lower,
+            # Widened to the end of the month, so its packed item is included;
+            # "~" sorts after every character of an ISO timestamp
+            month_key(upper) + PACKED_SUFFIX if upper else PACKED_SUFFIX,
+            page_size=limit + 1,
+            # The keys are known to the caller; only ship what the history needs
+            projection=["sk", "timestamp", "value", "tracker_id", *PACKED_ATTRIBUTES],
+        )
+        items = []
+        for log in logs:
+            if log["timestamp"] < lower:
+                break
+            if upper and (
+                log["timestamp"] > upper
+                or (log["timestamp"] == upper and not inclusive)
+            ):
+                continue
+            items.append(log)
+            if len(items) > limit:
+                break
+
+        has_more = len(items) > limit
+        items = items[:limit]
+        return {
+            "items": items,
+            "next_cursor": (
+                encode_log_cursor(prefix + items[-1]["timestamp"]) if has_more else None
+            ),
+        }
 
-    def get_history_logs(self, user_id: str, tracker_id: str, limit: int = 30):
+    def compact_logs(
+        self, user_id: str, tracker_id: str, before: Optional[date] = None
+    ) -> int:
         """
-        Fetches logs specifically for ONE tracker.
-        Uses the Composite Key trick: SK starts with "tracker_id#"
+        Packs the raw logs of every closed month (before `before`, by default
+        the current month) into one item per month. Months that were already
+        packed are re-packed with any logs that arrived since. Returns the
+        number of months written.
         """
-        response = self.logs_table.query(
-            KeyConditionExpression=Key("user_id").eq(user_id)
-            & Key("sk").begins_with(f"{tracker_id}#"),
-            ScanIndexForward=False,  # Newest first
-            Limit=limit,
+        before = before or date.today().replace(day=1)
+        prefix = f"{tracker_id}#"
+        items = self._iter_by_user(
+            self.logs_table,
+            user_id,
+            sort_key_condition=Key("sk").between(
+                prefix, prefix + before.strftime("%Y-%m")
+            ),
         )
-        # Clean up the 'sk' leakage before returning if desired
-        items = response.get("Items", [])
-        return items
+
+        packed_months = 0
+        for month, month_items in groupby(
+            items, key=lambda item: month_key(item["sk"][len(prefix) :])
+        ):
+            month_items = list(month_items)
+            raw_items = [item for item in month_items if not is_packed(item)]
+            if not raw_items:
+                continue
+            logs = {}
+            for item in month_items:
+                for log in unpack_logs(item) if is_packed(item) else [item]:
+                    logs[log["timestamp"]] = log
+            if len(logs) > PACK_MAX_LOGS:
+                continue
+
+            # The packed item is written before the raw logs are deleted, so a
+            # failure in between only leaves duplicates, which readers merge
+            self.logs_table.put_item(
+                Item=pack_logs(user_id, tracker_id, month, list(logs.values()))
+            )
+            with self.logs_table.batch_writer() as batch:
+                for item in raw_items:
+                    batch.delete_item(Key={"user_id": user_id, "sk": item["sk"]})
+            packed_months += 1
+        return packed_months
 
     def get_goals_for_user(self, user_id: str) -> List[Goal]:
         """Fetches all goals for a user and parses them into Goal Pydantic models."""
-        items = self._query_all_by_user(self.goals_table, user_id)
+        items = self._iter_by_user(
+            self.goals_table, user_id, projection=GOAL_ATTRIBUTES
+        )
         return [Goal.from_db_format(item) for item in items]
 
-    def get_milestones(self, user_id: str, goal_id: str = None) -> Dict[str, Any]:
+    def get_goal(self, user_id: str, goal_id: str) -> Optional[Goal]:
+        """
+        Fetches a single goal by user_id and goal_id. Strongly consistent, since
+        the milestone formulator reads the goal right after it is created.
+        """
+        response = self.goals_table.get_item(
+            Key={"user_id": user_id, "goal_id": goal_id}, ConsistentRead=True
+        )
+        item = response.get("Item")
+        if item:
+            return Goal.from_db_format(item)
+        return None
+
+    def get_milestones(self, user_id: str, goal_id: str = None) -> List[Milestone]:
         """Fetches milestones for a user and given goal. If no goal is given, fetch all"""
-        milestones = self._query_all_by_user(self.milestones_table, user_id)
+        # Filter server-side so other goals' milestones never cross the wire
+        milestones = self._iter_by_user(
+            self.milestones_table,
+            user_id,
+            projection=MILESTONE_ATTRIBUTES,
+            filter_expression=Attr("goal_id").eq(goal_id) if goal_id else None,
+        )
 
-        milestones = [
-            Milestone.from_db_format(m)
-            for m in milestones
-            if not goal_id or m["goal_id"] == goal_id
-        ]
+        milestones = [Milestone.from_db_format(m) for m in milestones]
 
         return milestones
 
-    def get_tracker(self, user_id: str, tracker_id: str) -> Optional[Tracker]:
+    def get_tracker(
+        self, user_id: str, tracker_id: str, consistent: bool = False
+    ) -> Optional[Tracker]:
         """Fetches a single tracker by user_id and tracker_id."""
         response = self.trackers_table.get_item(
-            Key={"user_id": user_id, "tracker_id": tracker_id}
+            Key={"user_id": user_id, "tracker_id": tracker_id},
+            ConsistentRead=consistent,
         )
         item = response.get("Item")
         if item:
             return Tracker.from_db_format(item)
         return None
 
+    def _batch_get(
+        self, table, keys: List[Dict[str, Any]], consistent: bool = False
+    ) -> Iterator[Dict]:
+        """
+        BatchGetItem for any number of keys: 100 per call, retrying
+        UnprocessedKeys with backoff. Keys that don't exist are skipped.
+        """
+        for start in range(0, len(keys), BATCH_GET_MAX_KEYS):
+            request = {
+                table.name: {
+                    "Keys": keys[start : start + BATCH_GET_MAX_KEYS],
+                    "ConsistentRead": consistent,
+                }
+            }
+            for attempt in range(BATCH_GET_MAX_ATTEMPTS):
+                if attempt:
+                    delay = min(BATCH_GET_MAX_DELAY, BATCH_GET_BASE_DELAY * 2**attempt)
+                    time.sleep(random.uniform(0, delay))
+                response = self.dynamodb.batch_get_item(RequestItems=request)
+                yield from response["Responses"].get(table.name, [])
+                request = response.get("UnprocessedKeys")
+                if not request:
+                    break
+            else:
+                raise RuntimeError(
+                    f"BatchGetItem on {table.name} still had unprocessed keys "
+                    f"after {BATCH_GET_MAX_ATTEMPTS} attempts"
+                )
+
+    def get_trackers_batch(
+        self, keys: Iterable[Tuple[str, str]]
+    ) -> Dict[Tuple[str, str], Tracker]:
+        """Fetches many trackers by (user_id, tracker_id) with BatchGetItem."""
+        items = self._batch_get(
+            self.trackers_table,
+            [
+                {"user_id": user_id, "tracker_id": tracker_id}
+                for user_id, tracker_id in dict.fromkeys(keys)
+            ],
+        )
+        trackers = {}
+        for item in items:
+            tracker = Tracker.from_db_format(item)
+            trackers[(tracker.user_id, tracker.tracker_id)] = tracker
+        return trackers
+
+    def get_rollups(
+        self,
+        tracker: Tracker,
+        granularity: str,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Time series of the tracker's rollup buckets ("day", "week" or "window"),
+        oldest first, optionally limited to buckets starting within [start, end].
+        Reads one item per bucket, however many logs it holds.
+        """
+        prefix = f"{tracker.tracker_id}#{granularity}#"
+        if start or end:
+            # "~" sorts after every character of an ISO date
+            sort_key_condition = Key("sk").between(
+                prefix + (start.isoformat() if start else ""),
+                prefix + (end.isoformat() if end else "~"),
+            )
+        else:
+            sort_key_condition = Key("sk").begins_with(prefix)
+
+        points = []
+        for item in self._iter_by_user(
+            self.rollups_table, tracker.user_id, sort_key_condition=sort_key_condition
+        ):
+            window = WindowAggregate(**item)
+            points.append(
+                {
+                    "start": item["bucket_start"],
+                    "value": window_value(tracker.aggregation_strategy, window),
+                    "count": window.count,
+                    "sum": window.sum,
+                    "min": window.min,
+                    "max": window.max,
+                }
+            )
+        return points
+
     # --- 4. Updates (Overwrite Strategy) ---
     # In DynamoDB + Pydantic, it's often safer to PUT (overwrite) the whole item
     # than to try and PATCH specific fields, unless you have massive documents.
     def update_goal(self, goal: Goal):
         self.goals_table.put_item(Item=goal.to_db_format())
+        user_goals_cache.invalidate(goal.user_id)
+        if self.cache:
+            self.cache.patch_goal(goal)
 
     def update_milestone(self, milestone: Milestone):
         self.milestones_table.put_item(Item=milestone.to_db_format())
+        if self.cache:
+            self.cache.patch_milestone(milestone)
 
     def update_tracker(self, tracker: Tracker):
         self.trackers_table.put_item(Item=tracker.to_db_format())
+        if self.cache:
+            self.cache.patch_tracker(tracker)
+
+
+_shared_handlers: Dict[str, DynamoDBHandler] = {}
+_shared_handlers_lock = threading.Lock()
+
+
+def get_shared_handler(region_name: str = "us-east-1") -> DynamoDBHandler:
+    """Process-wide handler, so the boto3 resource and its pool are built once."""
+    with _shared_handlers_lock:
+        if region_name not in _shared_handlers:
+            _shared_handlers[region_name] = DynamoDBHandler(region_name=region_name)
+        return _shared_handlers[region_name]
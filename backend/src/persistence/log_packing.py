@@ -0,0 +1,103 @@
+"""
+Compact storage for closed months of tracker logs.
+
+One packed item replaces every raw log of a tracker for a calendar month:
+    sk          "<tracker_id>#<YYYY-MM>~", which sorts right after the month's raw
+                "<tracker_id>#<timestamp>" keys, so packed and raw logs stay in
+                time order within the Logs table
+    start_us    epoch microseconds of the first log
+    ts_deltas   little-endian int64 gaps (microseconds) between consecutive logs
+    offsets     little-endian int16 UTC offsets in minutes (NAIVE for naive times)
+    values      little-endian float64 values
+
+Timestamps (including their offset) round-trip exactly. Values come back as the
+shortest Decimal for their float64, which is exact up to 15 significant digits.
+"""
+
+import struct
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Dict, List
+
+PACKED_SUFFIX = "~"
+# Offset stored for timestamps that were logged without a timezone
+NAIVE = -(2**15)
+# Keeps a packed item well under DynamoDB's 400 KB item limit
+PACK_MAX_LOGS = 20000
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def month_key(timestamp_str: str) -> str:
+    return timestamp_str[:7]
+
+
+def packed_sk(tracker_id: str, month: str) -> str:
+    return f"{tracker_id}#{month}{PACKED_SUFFIX}"
+
+
+def is_packed(item: Dict[str, Any]) -> bool:
+    return item["sk"].endswith(PACKED_SUFFIX)
+
+
+def _to_micros(timestamp: datetime) -> int:
+    aware = timestamp if timestamp.tzinfo else timestamp.replace(tzinfo=timezone.utc)
+    return (aware - _EPOCH) // _MICROSECOND
+
+
+def _offset_minutes(timestamp: datetime) -> int:
+    if timestamp.tzinfo is None:
+        return NAIVE
+    return timestamp.utcoffset() // timedelta(minutes=1)
+
+
+def _from_micros(micros: int, offset: int) -> datetime:
+    timestamp = _EPOCH + micros * _MICROSECOND
+    if offset == NAIVE:
+        return timestamp.replace(tzinfo=None)
+    return timestamp.astimezone(timezone(timedelta(minutes=offset)))
+
+
+def pack_logs(
+    user_id: str, tracker_id: str, month: str, logs: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Packs raw log dicts ({"timestamp", "value"}) of one month into one item."""
+    logs = sorted(logs, key=lambda log: log["timestamp"])
+    timestamps = [datetime.fromisoformat(log["timestamp"]) for log in logs]
+    micros = [_to_micros(ts) for ts in timestamps]
+    deltas = [b - a for a, b in zip(micros, micros[1:])]
+    count = len(logs)
+    return {
+        "user_id": user_id,
+        "sk": packed_sk(tracker_id, month),
+        "tracker_id": tracker_id,
+        "count": count,
+        "start_us": micros[0],
+        "ts_deltas": struct.pack(f"<{count - 1}q", *deltas),
+        "offsets": struct.pack(f"<{count}h", *map(_offset_minutes, timestamps)),
+        "values": struct.pack(f"<{count}d", *(float(log["value"]) for log in logs)),
+    }
+
+
+def unpack_logs(item: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Raw log dicts ({"timestamp", "value", "tracker_id"}), oldest first."""
+    count = int(item["count"])
+    # boto3 hands binary attributes back wrapped in Binary
+    deltas = struct.unpack(f"<{count - 1}q", bytes(item["ts_deltas"]))
+    offsets = struct.unpack(f"<{count}h", bytes(item["offsets"]))
+    values = struct.unpack(f"<{count}d", bytes(item["values"]))
+
+    micros = int(item["start_us"])
+    logs = []
+    for i in range(count):
+        if i:
+            micros += deltas[i - 1]
+        logs.append(
+            {
+                "timestamp": _from_micros(micros, offsets[i]).isoformat(),
+                "value": Decimal(repr(values[i])),
+                "tracker_id": item["tracker_id"],
+            }
+        )
+    return logs
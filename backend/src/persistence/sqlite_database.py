@@ -1,132 +1,658 @@
-# database.py
-import sqlite3
-from schemas import Goal, Milestone, MilestoneTracking, TrackerUpdate
 import json
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from schemas.core_v2 import Goal, Milestone, Tracker, LogEntry, WindowAggregate
+from persistence.dashboard_cache import DashboardCache, dashboard_cache
+from persistence.storage import decode_log_cursor, encode_log_cursor
+from persistence.tracker_aggregation import (
+    add_to_window,
+    apply_log,
+    as_utc,
+    rebuild_progress,
+    rollup_buckets,
+    utc_key,
+    window_value,
+)
+from persistence.user_goals_cache import user_goals_cache
 
 DB_NAME = "goal_app_state.db"
 
+# Connections kept open per database. SQLite allows one writer at a time, but
+# under WAL every pooled connection can read while a write is in progress.
+DEFAULT_POOL_SIZE = 8
+
+# WITHOUT ROWID tables are clustered on their primary key, so each key doubles
+# as the index for the user's partition: (user_id, tracker_id, timestamp) for
+# logs, just like the Logs table's "tracker_id#timestamp" sort key.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS goals (
+    user_id TEXT NOT NULL,
+    goal_id TEXT NOT NULL,
+    goal_json TEXT NOT NULL,
+    PRIMARY KEY (user_id, goal_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS milestones (
+    user_id TEXT NOT NULL,
+    milestone_id TEXT NOT NULL,
+    goal_id TEXT NOT NULL,
+    milestone_json TEXT NOT NULL,
+    PRIMARY KEY (user_id, milestone_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS milestones_by_goal ON milestones (user_id, goal_id);
+
+CREATE TABLE IF NOT EXISTS trackers (
+    user_id TEXT NOT NULL,
+    tracker_id TEXT NOT NULL,
+    milestone_id TEXT NOT NULL,
+    current_value TEXT NOT NULL,
+    last_log_date TEXT,
+    progress TEXT NOT NULL,
+    tracker_json TEXT NOT NULL,
+    PRIMARY KEY (user_id, tracker_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS trackers_by_milestone ON trackers (user_id, milestone_id);
+
+CREATE TABLE IF NOT EXISTS logs (
+    user_id TEXT NOT NULL,
+    tracker_id TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (user_id, tracker_id, timestamp)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS rollups (
+    user_id TEXT NOT NULL,
+    tracker_id TEXT NOT NULL,
+    granularity TEXT NOT NULL,
+    bucket_start TEXT NOT NULL,
+    aggregate TEXT NOT NULL,
+    PRIMARY KEY (user_id, tracker_id, granularity, bucket_start)
+) WITHOUT ROWID;
+"""
+
+# Statements are fixed strings so each connection's statement cache prepares
+# them once and reuses them afterwards.
+PUT_GOAL = "INSERT OR REPLACE INTO goals VALUES (?, ?, ?)"
+PUT_MILESTONE = "INSERT OR REPLACE INTO milestones VALUES (?, ?, ?, ?)"
+PUT_TRACKER = "INSERT OR REPLACE INTO trackers VALUES (?, ?, ?, ?, ?, ?, ?)"
+# A log that is already stored is kept as is and not folded in again
+PUT_LOG = "INSERT OR IGNORE INTO logs VALUES (?, ?, ?, ?)"
+PUT_ROLLUP = "INSERT OR REPLACE INTO rollups VALUES (?, ?, ?, ?, ?)"
+UPDATE_PROGRESS = """
+UPDATE trackers SET progress = ?, current_value = ?, last_log_date = ?
+WHERE user_id = ? AND tracker_id = ?
+"""
+
+SELECT_GOALS = "SELECT user_id, goal_id, goal_json FROM goals WHERE user_id = ?"
+SELECT_GOAL = """
+SELECT user_id, goal_id, goal_json FROM goals WHERE user_id = ? AND goal_id = ?
+"""
+SELECT_MILESTONES = """
+SELECT user_id, goal_id, milestone_id, milestone_json FROM milestones
+WHERE user_id = ?
+"""
+SELECT_GOAL_MILESTONES = """
+SELECT user_id, goal_id, milestone_id, milestone_json FROM milestones
+WHERE user_id = ? AND goal_id = ?
+"""
+SELECT_TRACKERS = """
+SELECT user_id, milestone_id, tracker_id, current_value, last_log_date, progress,
+       tracker_json
+FROM trackers WHERE user_id = ?
+"""
+SELECT_TRACKER = """
+SELECT user_id, milestone_id, tracker_id, current_value, last_log_date, progress,
+       tracker_json
+FROM trackers WHERE user_id = ? AND tracker_id = ?
+"""
+# The cursor bound is exclusive; "~" sorts after every ISO timestamp
+SELECT_LOGS_DESC = """
+SELECT timestamp, value, tracker_id FROM logs
+WHERE user_id = ? AND tracker_id = ?
+  AND timestamp >= ? AND timestamp <= ? AND timestamp < ?
+ORDER BY timestamp DESC
+LIMIT ?
+"""
+SELECT_ROLLUP = """
+SELECT aggregate FROM rollups
+WHERE user_id = ? AND tracker_id = ? AND granularity = ? AND bucket_start = ?
+"""
+SELECT_ROLLUPS = """
+SELECT bucket_start, aggregate FROM rollups
+WHERE user_id = ? AND tracker_id = ? AND granularity = ?
+  AND bucket_start >= ? AND bucket_start <= ?
+ORDER BY bucket_start
+"""
 
-class GoalRepository:
-    def __init__(self, db_path=DB_NAME):
+
+def _dumps(value: Any) -> str:
+    # Decimals are kept as strings so they round-trip exactly
+    return json.dumps(value, default=str, separators=(",", ":"))
+
+
+class SQLiteHandler:
+    """
+    StorageBackend on a single SQLite file, for local and edge deployments.
+
+    Same method surface and models as DynamoDBHandler. Rows keep the DynamoDB
+    item layout (indexing columns plus *_json blobs), so the read paths share
+    from_db_format / json_from_db with it. Every write that touches several rows
+    runs in one BEGIN IMMEDIATE transaction, which also serializes log writes
+    per database, so tracker progress needs no version checks here.
+    """
+
+    def __init__(
+        self,
+        db_path: str = DB_NAME,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        cache: Optional[DashboardCache] = dashboard_cache,
+    ):
         self.db_path = db_path
-        self._init_tables()
-
-    def _get_conn(self):
-        # Helper to get a connection (ensures valid context)
-        return sqlite3.connect(self.db_path)
-
-    def _init_tables(self):
-        """Creates the tables if they don't exist."""
-        with self._get_conn() as conn:
-            conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS goals (
-                    id TEXT PRIMARY KEY, user_id TEXT, title TEXT, 
-                    due_date TEXT, reason TEXT
-                )
-            """
-            )
-            conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS milestones (
-                    id TEXT PRIMARY KEY, goal_id TEXT, statement TEXT, 
-                    status TEXT, metadata TEXT
-                )
-            """
-            )
-            conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS milestone_updates (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    milestone_id TEXT, new_status TEXT, 
-                    note TEXT, timestamp TEXT
-                )
-            """
-            )
+        # An in-memory database only lives as long as its one connection
+        self.pool_size = 1 if db_path == ":memory:" else pool_size
+        # Write-through dashboard cache; pass cache=None to always hit SQLite
+        self.cache = cache
+        self._pool: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._opened = 0
+        self._pool_lock = threading.Lock()
 
-            # NEW: Table for the trackers
-            conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS milestone_trackers (
-                    id TEXT PRIMARY KEY,
-                    milestone_id TEXT,
-                    name TEXT,
-                    type TEXT,
-                    prompt TEXT,
-                    satisfaction_criteria TEXT, -- JSON Storage
-                    history TEXT                -- JSON Storage
-                )
-            """
-            )
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+
+    # --- Connection pool ---
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=30,
+            # Autocommit; transactions are opened explicitly (see _transaction)
+            isolation_level=None,
+            # Pooled connections move between threads, one user at a time
+            check_same_thread=False,
+            cached_statements=256,
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        # Under WAL this can't corrupt the file; a power loss may drop the last
+        # commits, never half of one
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrows a pooled connection, opening one if the pool isn't full yet."""
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            with self._pool_lock:
+                can_open = self._opened < self.pool_size
+                if can_open:
+                    self._opened += 1
+            conn = self._connect() if can_open else self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Write transaction; takes the write lock up front instead of on upgrade."""
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def close(self):
+        with self._pool_lock:
+            while self._opened:
+                self._pool.get().close()
+                self._opened -= 1
+
+    # --- Row <-> item (the dicts to_db_format produces) ---
+    @staticmethod
+    def _goal_row(goal: Goal) -> Tuple:
+        item = goal.to_db_format()
+        return (item["user_id"], item["goal_id"], _dumps(item["goal_json"]))
+
+    @staticmethod
+    def _milestone_row(milestone: Milestone) -> Tuple:
+        item = milestone.to_db_format()
+        return (
+            item["user_id"],
+            item["milestone_id"],
+            item["goal_id"],
+            _dumps(item["milestone_json"]),
+        )
+
+    @staticmethod
+    def _tracker_row(tracker: Tracker) -> Tuple:
+        item = tracker.to_db_format()
+        return (
+            item["user_id"],
+            item["tracker_id"],
+            item["milestone_id"],
+            str(item["current_value"]),
+            item["last_log_date"],
+            _dumps(item["progress"]),
+            _dumps(item["tracker_json"]),
+        )
+
+    @staticmethod
+    def _goal_item(row: Tuple) -> Dict[str, Any]:
+        return {"user_id": row[0], "goal_id": row[1], "goal_json": json.loads(row[2])}
+
+    @staticmethod
+    def _milestone_item(row: Tuple) -> Dict[str, Any]:
+        return {
+            "user_id": row[0],
+            "goal_id": row[1],
+            "milestone_id": row[2],
+            "milestone_json": json.loads(row[3]),
+        }
+
+    @staticmethod
+    def _tracker_item(row: Tuple) -> Dict[str, Any]:
+        return {
+            "user_id": row[0],
+            "milestone_id": row[1],
+            "tracker_id": row[2],
+            "current_value": row[3],
+            "last_log_date": row[4],
+            "progress": json.loads(row[5]),
+            "tracker_json": json.loads(row[6]),
+        }
+
+    # --- 1. The "Super Read" (Optimized for Frontend) ---
+    def get_full_user_state(self, user_id: str) -> Dict[str, Any]:
+        """
+        Same {"goals": [... "milestones": [... "trackers": [...]]]} tree as
+        DynamoDBHandler.get_full_user_state, served from the dashboard cache
+        when possible.
+        """
+        if self.cache is None:
+            return self._load_full_user_state(user_id)
+
+        cached = self.cache.get(user_id)
+        if cached is not None:
+            return cached
+
+        load_token = self.cache.begin_load(user_id)
+        tree = self._load_full_user_state(user_id)
+        self.cache.put(user_id, tree, load_token)
+        return tree
+
+    def get_dashboard_version(self, user_id: str) -> Optional[str]:
+        """Version token of the cached dashboard. Never touches SQLite."""
+        return self.cache.version(user_id) if self.cache else None
+
+    def get_dashboard_snapshot(
+        self, user_id: str, since: Optional[str] = None
+    ) -> Tuple[Optional[str], Dict[str, Any]]:
+        """See DynamoDBHandler.get_dashboard_snapshot."""
+        tree = self.get_full_user_state(user_id)
+        snapshot = self.cache.snapshot(user_id, since) if self.cache else None
+        if snapshot is None:
+            return None, tree if since is None else {"full": True, **tree}
+        return snapshot
+
+    def _load_full_user_state(self, user_id: str) -> Dict[str, Any]:
+        # One read transaction, so the three tables come from the same snapshot
+        with self._connection() as conn:
+            conn.execute("BEGIN")
+            try:
+                goal_rows = conn.execute(SELECT_GOALS, (user_id,))
+                goals = [Goal.json_from_db(self._goal_item(r)) for r in goal_rows]
+                milestones_by_goal: Dict[str, List[Dict]] = {}
+                for row in conn.execute(SELECT_MILESTONES, (user_id,)):
+                    milestones_by_goal.setdefault(row[1], []).append(
+                        Milestone.json_from_db(self._milestone_item(row))
+                    )
+                trackers_by_milestone: Dict[str, List[Dict]] = {}
+                for row in conn.execute(SELECT_TRACKERS, (user_id,)):
+                    trackers_by_milestone.setdefault(row[1], []).append(
+                        Tracker.json_from_db(self._tracker_item(row))
+                    )
+            finally:
+                conn.execute("COMMIT")
 
-    # --- CORE METHODS ---
+        for milestones in milestones_by_goal.values():
+            for m in milestones:
+                m["trackers"] = trackers_by_milestone.get(m["milestone_id"], [])
+        for g in goals:
+            g["milestones"] = milestones_by_goal.get(g["goal_id"], [])
+        return {"goals": goals}
 
+    # --- 2. Standard CRUD (Create) ---
     def create_goal(self, goal: Goal):
-        with self._get_conn() as conn:
-            conn.execute(
-                "INSERT INTO goals (id, user_id, title, due_date, reason) VALUES (?, ?, ?, ?, ?)",
-                (goal.id, goal.user_id, goal.what, goal.when, goal.why),
+        with self._connection() as conn:
+            conn.execute(PUT_GOAL, self._goal_row(goal))
+        user_goals_cache.invalidate(goal.user_id)
+        if self.cache:
+            self.cache.patch_goal(goal)
+
+    def create_milestone(self, milestone: Milestone):
+        with self._connection() as conn:
+            conn.execute(PUT_MILESTONE, self._milestone_row(milestone))
+        if self.cache:
+            self.cache.patch_milestone(milestone)
+
+    def create_tracker(self, tracker: Tracker):
+        with self._connection() as conn:
+            conn.execute(PUT_TRACKER, self._tracker_row(tracker))
+        if self.cache:
+            self.cache.patch_tracker(tracker)
+
+    # --- 2b. Bulk Create ---
+    # One transaction is both atomic and the fastest way to insert many rows,
+    # so `atomic` is accepted for parity with DynamoDBHandler only.
+    def create_milestones_bulk(self, milestones: List[Milestone], atomic=False):
+        self.create_milestone_plan(milestones, [], atomic)
+
+    def create_trackers_bulk(self, trackers: List[Tracker], atomic=False):
+        self.create_milestone_plan([], trackers, atomic)
+
+    def create_milestone_plan(
+        self, milestones: List[Milestone], trackers: List[Tracker], atomic=False
+    ):
+        """Persists a whole milestone DAG with its trackers in one transaction."""
+        with self._transaction() as conn:
+            conn.executemany(PUT_MILESTONE, map(self._milestone_row, milestones))
+            conn.executemany(PUT_TRACKER, map(self._tracker_row, trackers))
+        if self.cache:
+            for m in milestones:
+                self.cache.patch_milestone(m)
+            for t in trackers:
+                self.cache.patch_tracker(t)
+
+    def _fold_logs(
+        self, conn: sqlite3.Connection, tracker: Tracker, updates: List[LogEntry]
+    ) -> Tracker:
+        """
+        Writes the `updates` that aren't stored yet with the tracker progress
+        and rollups they change; resubmitted logs are skipped. Must run inside
+        a write transaction. Returns the updated tracker.
+        """
+        updates = [
+            u
+            for u in updates
+            if conn.execute(
+                PUT_LOG,
+                (u.user_id, u.tracker_id, utc_key(u.timestamp), str(u.value)),
+            ).rowcount
+        ]
+        if not updates:
+            return tracker
+
+        updated = tracker.model_copy(deep=True)
+        by_bucket: Dict[Tuple[str, date], List[LogEntry]] = {}
+        in_place = True
+        for update in updates:
+            in_place &= apply_log(updated, update.value, update.timestamp)
+            for bucket in rollup_buckets(tracker, update.timestamp):
+                by_bucket.setdefault(bucket, []).append(update)
+        updated.progress.version += 1
+
+        for (granularity, bucket_start), entries in by_bucket.items():
+            key = (
+                tracker.user_id,
+                tracker.tracker_id,
+                granularity,
+                bucket_start.isoformat(),
             )
-            # Recursively save any milestones attached to this goal
-            for m in goal.milestones:
-                self.create_milestone(m)
-        return goal.id
-
-    def create_milestone(self, m: Milestone):
-        with self._get_conn() as conn:
-            # 1. Save the Milestone itself
-            conn.execute(
-                "INSERT INTO milestones (id, goal_id, statement, status) VALUES (?, ?, ?, ?)",
-                (m.id, m.goal_id, m.statement, m.status),
+            row = conn.execute(SELECT_ROLLUP, key).fetchone()
+            window = (
+                WindowAggregate.model_validate_json(row[0])
+                if row
+                else WindowAggregate()
             )
-
-            # 2. Save the attached Trackers
-            for t in m.trackers:
-                # Ensure the link is set
-                t.milestone_id = m.id
-                conn.execute(
-                    """INSERT INTO milestone_trackers 
-                       (id, milestone_id, name, type, prompt, satisfaction_criteria, history) 
-                       VALUES (?, ?, ?, ?, ?, ?, ?)""",
+            for entry in entries:
+                add_to_window(window, Decimal(str(entry.value)), tracker.target_range)
+            conn.execute(PUT_ROLLUP, (*key, window.model_dump_json()))
+        if not in_place:
+            # A log landed in a window progress no longer keeps; the window
+            # rollups written above hold the whole history
+            rows = conn.execute(
+                SELECT_ROLLUPS,
+                (tracker.user_id, tracker.tracker_id, "window", "", "~"),
+            ).fetchall()
+            rebuild_progress(
+                updated,
+                (
                     (
-                        t.id,
-                        t.milestone_id,
-                        t.name,
-                        t.type,
-                        t.prompt,
-                        json.dumps(t.satisfaction_criteria),  # Serialize Dict -> String
-                        json.dumps(t.history),  # Serialize Dict -> String
-                    ),
-                )
-        return m.id
-
-    # --- NEW: The Method for "AddMilestoneUpdate" ---
-    def update_tracker_history(self, update: TrackerUpdate):
+                        date.fromisoformat(bucket_start),
+                        WindowAggregate.model_validate_json(aggregate),
+                    )
+                    for bucket_start, aggregate in rows
+                ),
+            )
+
+        item = updated.to_db_format()
+        conn.execute(
+            UPDATE_PROGRESS,
+            (
+                _dumps(item["progress"]),
+                str(item["current_value"]),
+                item["last_log_date"],
+                updated.user_id,
+                updated.tracker_id,
+            ),
+        )
+        return updated
+
+    def log_tracker_update(self, update: LogEntry, tracker: Tracker) -> Tracker:
         """
-        Updates the history dictionary of a specific tracker.
-        This is a 'Read-Modify-Write' operation in SQLite.
+        Atomically writes the log and updates the tracker aggregation and rollups.
+        The tracker is re-read under the write lock, so `tracker` only needs to
+        identify it. Returns the tracker with its updated progress.
         """
-        with self._get_conn() as conn:
-            cursor = conn.cursor()
+        with self._transaction() as conn:
+            current = self._get_tracker(conn, tracker.user_id, tracker.tracker_id)
+            if current is None:
+                raise ValueError(f"Tracker {tracker.tracker_id} no longer exists")
+            updated = self._fold_logs(conn, current, [update])
+        if self.cache:
+            self.cache.patch_tracker(updated)
+        return updated
 
-            # 1. Fetch current history (JSON string)
-            cursor.execute(
-                "SELECT history FROM milestone_trackers WHERE id = ?",
-                (update.tracker_id,),
-            )
-            row = cursor.fetchone()
+    def log_tracker_updates_bulk(
+        self, updates: List[LogEntry]
+    ) -> Tuple[List[LogEntry], List[LogEntry]]:
+        """
+        Ingests many logs (e.g. an offline sync) in one transaction, folding
+        each tracker's new logs into it once. Returns (logged, rejected); entries
+        whose tracker doesn't exist are rejected. Logs already stored count as
+        logged but are not folded in again.
+        """
+        by_tracker: Dict[Tuple[str, str], Dict[str, LogEntry]] = {}
+        for update in updates:
+            # Same timestamp means same log row; the last one wins
+            by_tracker.setdefault((update.user_id, update.tracker_id), {})[
+                utc_key(update.timestamp)
+            ] = update
+
+        logged, rejected, updated_trackers = [], [], []
+        with self._transaction() as conn:
+            for (user_id, tracker_id), entries in by_tracker.items():
+                tracker = self._get_tracker(conn, user_id, tracker_id)
+                if tracker is None:
+                    rejected.extend(entries.values())
+                    continue
+                entries = sorted(entries.values(), key=lambda u: as_utc(u.timestamp))
+                updated_trackers.append(self._fold_logs(conn, tracker, entries))
+                logged.extend(entries)
+        if self.cache:
+            for tracker in updated_trackers:
+                self.cache.patch_tracker(tracker)
+        return logged, rejected
 
-            if not row:
-                raise ValueError(f"Tracker {update.tracker_id} not found")
+    # --- 3. Optimized Reads ---
+    def get_history_logs(
+        self,
+        user_id: str,
+        tracker_id: str,
+        limit: int = 30,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        One page of logs for ONE tracker, newest first; a range scan of the
+        logs primary key. Cursors have the same format as DynamoDBHandler's.
+        """
+        prefix = f"{tracker_id}#"
+        before = decode_log_cursor(cursor, prefix)[len(prefix) :] if cursor else "~"
+        with self._connection() as conn:
+            rows = conn.execute(
+                SELECT_LOGS_DESC,
+                (
+                    user_id,
+                    tracker_id,
+                    utc_key(start) if start else "",
+                    utc_key(end) if end else "~",
+                    before,
+                    limit + 1,
+                ),
+            ).fetchall()
+
+        items = [
+            {"timestamp": ts, "value": Decimal(value), "tracker_id": tid}
+            for ts, value, tid in rows[:limit]
+        ]
+        return {
+            "items": items,
+            "next_cursor": (
+                encode_log_cursor(prefix + items[-1]["timestamp"])
+                if len(rows) > limit
+                else None
+            ),
+        }
+
+    def compact_logs(
+        self, user_id: str, tracker_id: str, before: Optional[date] = None
+    ) -> int:
+        """
+        No-op: log rows are already a clustered (tracker, timestamp) index with
+        no per-item overhead to pack away. Returns 0 months written.
+        """
+        return 0
+
+    def get_goals_for_user(self, user_id: str) -> List[Goal]:
+        """Fetches all goals for a user and parses them into Goal Pydantic models."""
+        with self._connection() as conn:
+            rows = conn.execute(SELECT_GOALS, (user_id,)).fetchall()
+        return [Goal.from_db_format(self._goal_item(row)) for row in rows]
+
+    def get_goal(self, user_id: str, goal_id: str) -> Optional[Goal]:
+        """Fetches a single goal by user_id and goal_id."""
+        with self._connection() as conn:
+            row = conn.execute(SELECT_GOAL, (user_id, goal_id)).fetchone()
+        return Goal.from_db_format(self._goal_item(row)) if row else None
+
+    def get_milestones(self, user_id: str, goal_id: str = None) -> List[Milestone]:
+        """Fetches milestones for a user and given goal. If no goal is given, fetch all"""
+        with self._connection() as conn:
+            if goal_id:
+                rows = conn.execute(SELECT_GOAL_MILESTONES, (user_id, goal_id))
+            else:
+                rows = conn.execute(SELECT_MILESTONES, (user_id,))
+            rows = rows.fetchall()
+        return [Milestone.from_db_format(self._milestone_item(row)) for row in rows]
 
-            # 2. Deserialize: JSON String -> Python Dict
-            current_history = json.loads(row[0])
+    def _get_tracker(
+        self, conn: sqlite3.Connection, user_id: str, tracker_id: str
+    ) -> Optional[Tracker]:
+        row = conn.execute(SELECT_TRACKER, (user_id, tracker_id)).fetchone()
+        return Tracker.from_db_format(self._tracker_item(row)) if row else None
 
-            # 3. Modify: Add the new entry
-            current_history[update.date] = update.value
+    def get_tracker(self, user_id: str, tracker_id: str) -> Optional[Tracker]:
+        """Fetches a single tracker by user_id and tracker_id."""
+        with self._connection() as conn:
+            return self._get_tracker(conn, user_id, tracker_id)
 
-            # 4. Serialize & Save: Python Dict -> JSON String
-            cursor.execute(
-                "UPDATE milestone_trackers SET history = ? WHERE id = ?",
-                (json.dumps(current_history), update.tracker_id),
+    def get_trackers_batch(
+        self, keys: Iterable[Tuple[str, str]]
+    ) -> Dict[Tuple[str, str], Tracker]:
+        """Fetches many trackers by (user_id, tracker_id); missing ones are skipped."""
+        trackers = {}
+        with self._connection() as conn:
+            for user_id, tracker_id in dict.fromkeys(keys):
+                tracker = self._get_tracker(conn, user_id, tracker_id)
+                if tracker is not None:
+                    trackers[(user_id, tracker_id)] = tracker
+        return trackers
+
+    def get_rollups(
+        self,
+        tracker: Tracker,
+        granularity: str,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ) -> List[Dict[str, Any]]:
+        """See DynamoDBHandler.get_rollups."""
+        with self._connection() as conn:
+            rows = conn.execute(
+                SELECT_ROLLUPS,
+                (
+                    tracker.user_id,
+                    tracker.tracker_id,
+                    granularity,
+                    start.isoformat() if start else "",
+                    end.isoformat() if end else "~",
+                ),
+            ).fetchall()
+
+        points = []
+        for bucket_start, aggregate in rows:
+            window = WindowAggregate.model_validate_json(aggregate)
+            points.append(
+                {
+                    "start": bucket_start,
+                    "value": window_value(tracker.aggregation_strategy, window),
+                    "count": window.count,
+                    "sum": window.sum,
+                    "min": window.min,
+                    "max": window.max,
+                }
             )
+        return points
+
+    # --- 4. Updates (Overwrite Strategy) ---
+    def update_goal(self, goal: Goal):
+        with self._connection() as conn:
+            conn.execute(PUT_GOAL, self._goal_row(goal))
+        user_goals_cache.invalidate(goal.user_id)
+        if self.cache:
+            self.cache.patch_goal(goal)
+
+    def update_milestone(self, milestone: Milestone):
+        with self._connection() as conn:
+            conn.execute(PUT_MILESTONE, self._milestone_row(milestone))
+        if self.cache:
+            self.cache.patch_milestone(milestone)
+
+    def update_tracker(self, tracker: Tracker):
+        with self._connection() as conn:
+            conn.execute(PUT_TRACKER, self._tracker_row(tracker))
+        if self.cache:
+            self.cache.patch_tracker(tracker)
+
+
+_shared_handlers: Dict[str, SQLiteHandler] = {}
+_shared_handlers_lock = threading.Lock()
+
+
+def get_shared_sqlite_handler(db_path: str = DB_NAME) -> SQLiteHandler:
+    """Process-wide handler per database file, so its connection pool is shared."""
+    with _shared_handlers_lock:
+        if db_path not in _shared_handlers:
+            _shared_handlers[db_path] = SQLiteHandler(db_path=db_path)
+        return _shared_handlers[db_path]
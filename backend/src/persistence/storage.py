@@ -0,0 +1,119 @@
+import base64
+import os
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Protocol, Tuple
+
+from schemas.core_v2 import Goal, LogEntry, Milestone, Tracker
+
+# Which StorageBackend get_storage() builds: "dynamodb" or "sqlite"
+STORAGE_BACKEND = os.getenv("GOALPILOT_STORAGE", "dynamodb")
+# Database file for the "sqlite" backend
+SQLITE_PATH = os.getenv("GOALPILOT_SQLITE_PATH", "goal_app_state.db")
+
+
+class StorageBackend(Protocol):
+    """
+    Everything the API and the agents need from persistence, over core_v2 models.
+    Implemented by DynamoDBHandler and SQLiteHandler; AsyncDynamoDBHandler wraps
+    either one for async callers.
+    """
+
+    # --- 1. The "Super Read" ---
+    def get_full_user_state(self, user_id: str) -> Dict[str, Any]: ...
+
+    def get_dashboard_version(self, user_id: str) -> Optional[str]: ...
+
+    def get_dashboard_snapshot(
+        self, user_id: str, since: Optional[str] = None
+    ) -> Tuple[Optional[str], Dict[str, Any]]: ...
+
+    # --- 2. Create ---
+    def create_goal(self, goal: Goal): ...
+
+    def create_milestone(self, milestone: Milestone): ...
+
+    def create_tracker(self, tracker: Tracker): ...
+
+    def create_milestones_bulk(self, milestones: List[Milestone], atomic=False): ...
+
+    def create_trackers_bulk(self, trackers: List[Tracker], atomic=False): ...
+
+    def create_milestone_plan(
+        self, milestones: List[Milestone], trackers: List[Tracker], atomic=False
+    ): ...
+
+    def log_tracker_update(self, update: LogEntry, tracker: Tracker) -> Tracker: ...
+
+    def log_tracker_updates_bulk(
+        self, updates: List[LogEntry]
+    ) -> Tuple[List[LogEntry], List[LogEntry]]: ...
+
+    # --- 3. Reads ---
+    def get_history_logs(
+        self,
+        user_id: str,
+        tracker_id: str,
+        limit: int = 30,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+    ) -> Dict[str, Any]: ...
+
+    def compact_logs(
+        self, user_id: str, tracker_id: str, before: Optional[date] = None
+    ) -> int: ...
+
+    def get_goals_for_user(self, user_id: str) -> List[Goal]: ...
+
+    def get_goal(self, user_id: str, goal_id: str) -> Optional[Goal]: ...
+
+    def get_milestones(self, user_id: str, goal_id: str = None) -> List[Milestone]: ...
+
+    def get_tracker(self, user_id: str, tracker_id: str) -> Optional[Tracker]: ...
+
+    def get_trackers_batch(
+        self, keys: Iterable[Tuple[str, str]]
+    ) -> Dict[Tuple[str, str], Tracker]: ...
+
+    def get_rollups(
+        self,
+        tracker: Tracker,
+        granularity: str,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ) -> List[Dict[str, Any]]: ...
+
+    # --- 4. Updates ---
+    def update_goal(self, goal: Goal): ...
+
+    def update_milestone(self, milestone: Milestone): ...
+
+    def update_tracker(self, tracker: Tracker): ...
+
+
+def encode_log_cursor(sk: str) -> str:
+    return base64.urlsafe_b64encode(sk.encode()).decode()
+
+
+def decode_log_cursor(cursor: str, prefix: str) -> str:
+    """The sort key a cursor resumes after; it must belong to the same tracker."""
+    try:
+        sk = base64.urlsafe_b64decode(cursor.encode()).decode()
+    except ValueError:
+        raise ValueError("Invalid cursor")
+    if not sk.startswith(prefix):
+        raise ValueError("Cursor belongs to a different tracker")
+    return sk
+
+
+def get_storage(region_name: str = "us-east-1") -> StorageBackend:
+    """Process-wide backend selected by GOALPILOT_STORAGE."""
+    if STORAGE_BACKEND == "dynamodb":
+        from persistence.dynamodb_database import get_shared_handler
+
+        return get_shared_handler(region_name=region_name)
+    if STORAGE_BACKEND == "sqlite":
+        from persistence.sqlite_database import get_shared_sqlite_handler
+
+        return get_shared_sqlite_handler(SQLITE_PATH)
+    raise ValueError(f"Unknown storage backend: {STORAGE_BACKEND}")
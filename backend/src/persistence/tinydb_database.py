@@ -1,187 +1,213 @@
 from tinydb import TinyDB, Query
+from tinydb.middlewares import CachingMiddleware
+from tinydb.storages import JSONStorage
 from schemas.core import Goal, Milestone, TrackerUpdate
 import json
-from typing import Annotated, TypedDict, Optional, List
+from typing import Annotated, Dict, TypedDict, Optional, List, Tuple
 
 DB_PATH = "goal_app_db.json"
 
+# Writes held in memory before CachingMiddleware rewrites the JSON file
+DEFAULT_WRITE_CACHE_SIZE = 100
+
 
 class GoalRepository:
-    def __init__(self, db_path=DB_PATH):
-        self.db = TinyDB(db_path, indent=4, separators=(",", ": "))
+    """
+    Goals are stored as whole documents (Goal -> [Milestones] -> [Trackers]).
+
+    Lookups go through in-memory indexes instead of table scans:
+        goal_id      -> doc_id
+        milestone_id -> goal_id (its parent document)
+        tracker_id   -> (goal_id, milestone index, tracker index)
+        user_id      -> [goal_id]
+    They are built from the file once and kept in sync by every write, so this
+    repository must be the file's only writer.
+
+    TinyDB rewrites the whole file on every write. With cache_writes=True the
+    file is only rewritten every `write_cache_size` writes, on flush() and on
+    close(); anything newer is lost if the process dies first.
+    """
+
+    def __init__(
+        self,
+        db_path=DB_PATH,
+        cache_writes: bool = False,
+        write_cache_size: int = DEFAULT_WRITE_CACHE_SIZE,
+    ):
+        if cache_writes:
+            storage = CachingMiddleware(JSONStorage)
+            storage.WRITE_CACHE_SIZE = write_cache_size
+        else:
+            storage = JSONStorage
+        self.db = TinyDB(db_path, storage=storage, indent=4, separators=(",", ": "))
         self.goals_table = self.db.table("goals")
 
+        self._goal_docs: Dict[str, int] = {}
+        self._milestone_goals: Dict[str, str] = {}
+        self._tracker_paths: Dict[str, Tuple[str, int, int]] = {}
+        self._user_goals: Dict[str, List[str]] = {}
+        for goal_doc in self.goals_table.all():
+            self._index_goal(goal_doc)
+
+    def flush(self):
+        """Writes cached changes to disk. No-op unless cache_writes is on."""
+        if isinstance(self.db.storage, CachingMiddleware):
+            self.db.storage.flush()
+
+    def close(self):
+        # CachingMiddleware flushes on close
+        self.db.close()
+
+    # --- Index maintenance ---
+    def _index_milestone(self, goal_id: str, index: int, ms_data: dict):
+        self._milestone_goals[ms_data["id"]] = goal_id
+        for t_index, t in enumerate(ms_data.get("tracking", [])):
+            self._tracker_paths[t["id"]] = (goal_id, index, t_index)
+
+    def _unindex_milestone(self, ms_data: dict):
+        self._milestone_goals.pop(ms_data["id"], None)
+        for t in ms_data.get("tracking", []):
+            self._tracker_paths.pop(t["id"], None)
+
+    def _index_goal(self, goal_doc: dict):
+        goal_id = goal_doc["id"]
+        self._goal_docs[goal_id] = goal_doc.doc_id
+        self._user_goals.setdefault(goal_doc["user_id"], []).append(goal_id)
+        for index, ms in enumerate(goal_doc.get("milestones", [])):
+            self._index_milestone(goal_id, index, ms)
+
+    def _unindex_goal(self, goal_doc: dict):
+        goal_id = goal_doc["id"]
+        self._goal_docs.pop(goal_id, None)
+        user_goals = self._user_goals.get(goal_doc["user_id"], [])
+        if goal_id in user_goals:
+            user_goals.remove(goal_id)
+        for ms in goal_doc.get("milestones", []):
+            self._unindex_milestone(ms)
+
+    def _get_goal_doc(self, goal_id: str):
+        doc_id = self._goal_docs.get(goal_id)
+        return self.goals_table.get(doc_id=doc_id) if doc_id is not None else None
+
+    # --- Writes ---
     def create_goal(self, goal: Goal):
         # Dump the entire object (Goal -> [Milestones] -> [Trackers])
         # mode='json' converts UUIDs and Dates to strings automatically
         goal_data = goal.model_dump(mode="json")
 
-        self.goals_table.insert(goal_data)
+        doc_id = self.goals_table.insert(goal_data)
+        self._index_goal(self.goals_table.get(doc_id=doc_id))
         return goal.id
 
     def create_milestones(self, milestones: List[Milestone], goal_id: str = None):
         """
         Appends a list of milestones to an EXISTING goal's list.
         """
-        GoalQuery = Query()
-
-        # 1. Search for the parent goal
-        #    (We assume goal_id is set correctly)
-        results = self.goals_table.search(GoalQuery.id == goal_id)
-        if not results:
+        doc_id = self._goal_docs.get(goal_id)
+        if doc_id is None:
             raise ValueError(f"Goal {goal_id} not found")
 
-        goal_doc = results[0]
-
-        # 2. Prepare the new milestones data
         ms_data_list = [m.model_dump(mode="json") for m in milestones]
-
-        # 3. Append to the local list
-        #    (Handle case where list might not exist yet, though schema usually ensures it)
-        current_milestones = goal_doc.get("milestones", [])
-        current_milestones.extend(ms_data_list)
-
-        # 4. Save the updated list back to the Goal document
-        self.goals_table.update(
-            {"milestones": current_milestones}, doc_ids=[goal_doc.doc_id]
-        )
+        first_index = None
+
+        def append(goal_doc):
+            nonlocal first_index
+            # (Handle case where list might not exist yet, though schema usually ensures it)
+            current_milestones = goal_doc.setdefault("milestones", [])
+            first_index = len(current_milestones)
+            current_milestones.extend(ms_data_list)
+
+        self.goals_table.update(append, doc_ids=[doc_id])
+        for offset, ms_data in enumerate(ms_data_list):
+            self._index_milestone(goal_id, first_index + offset, ms_data)
         return [m.id for m in milestones]
 
     def create_milestone(self, m: Milestone, goal_id: str = None):
         """
         Appends a new milestone to an EXISTING goal's list.
         """
-        GoalQuery = Query()
-
-        # 1. Search for the parent goal
-        #    (We assume m.goal_id is set correctly)
-        results = self.goals_table.search(GoalQuery.id == goal_id)
-        if not results:
-            raise ValueError(f"Goal {goal_id} not found")
-
-        goal_doc = results[0]
-
-        # 2. Prepare the new milestone data
-        ms_data = m.model_dump(mode="json")
-
-        # 3. Append to the local list
-        #    (Handle case where list might not exist yet, though schema usually ensures it)
-        current_milestones = goal_doc.get("milestones", [])
-        current_milestones.append(ms_data)
-
-        # 4. Save the updated list back to the Goal document
-        self.goals_table.update(
-            {"milestones": current_milestones}, doc_ids=[goal_doc.doc_id]
-        )
-        return m.id
+        return self.create_milestones([m], goal_id)[0]
 
     def update_tracking_history(self, update: TrackerUpdate, goal_id: str):
         """
-        Optimized Update:
-        We go directly to the known Goal ID, then dig down to the tracker.
+        Writes one data point straight to the tracker's indexed position, without
+        searching or rebuilding the goal's milestones.
         """
-        GoalQuery = Query()
-
-        # 1. FAST LOOKUP: Fetch the specific goal directly
-        results = self.goals_table.search(GoalQuery.id == goal_id)
-
-        if not results:
+        if goal_id not in self._goal_docs:
             raise ValueError(f"Goal {goal_id} not found")
 
-        goal_doc = results[0]
-
-        # 2. MODIFY IN MEMORY (Digging down the tree)
-        milestones = goal_doc["milestones"]
-        found = False
-
-        for m in milestones:
-            # Safety check: ensure 'trackers' list exists
-            trackers = m.get("tracking", [])
-            for t in trackers:
-                if t["id"] == update.tracker_id:
-                    # Update the history!
-                    # Ensure history dict exists
-                    if "history" not in t:
-                        t["history"] = {}
-
-                    t["history"][update.date] = update.value
-                    found = True
-                    break
-            if found:
-                break
-
-        if not found:
+        path = self._tracker_paths.get(update.tracker_id)
+        if path is None or path[0] != goal_id:
             raise ValueError(f"Tracker {update.tracker_id} not found in Goal {goal_id}")
+        _, ms_index, t_index = path
 
-        # 3. SAVE THE GOAL
-        #    We write the entire modified milestones list back.
-        self.goals_table.update({"milestones": milestones}, doc_ids=[goal_doc.doc_id])
+        def set_point(goal_doc):
+            tracker = goal_doc["milestones"][ms_index]["tracking"][t_index]
+            tracker.setdefault("history", {})[update.date] = update.value
 
+        self.goals_table.update(set_point, doc_ids=[self._goal_docs[goal_id]])
         return True
 
     # --- Helper to see the full tree ---
     def get_goal_tree(self, goal_id: str):
-        GoalQuery = Query()
-        results = self.goals_table.search(GoalQuery.id == goal_id)
-        return results[0] if results else None
+        return self._get_goal_doc(goal_id)
 
     def get_goals_list(self):
         return self.goals_table.all()
 
+    def _user_goal_docs(self, user_id: str):
+        doc_ids = [self._goal_docs[g] for g in self._user_goals.get(user_id, [])]
+        return self.goals_table.get(doc_ids=doc_ids) if doc_ids else []
+
     def get_goals_for_user(self, user_id: str):
-        GoalQuery = Query()
-        results = self.goals_table.search(GoalQuery.user_id == user_id)
-        return results
+        return self._user_goal_docs(user_id)
 
     def get_goal_info_for_user(self, user_id: str, goal_id: str):
-        GoalQuery = Query()
-        results = self.goals_table.search(
-            (GoalQuery.user_id == user_id) & (GoalQuery.id == goal_id)
-        )
-        return results[0] if results else None
+        goal_doc = self._get_goal_doc(goal_id)
+        return goal_doc if goal_doc and goal_doc["user_id"] == user_id else None
 
     def get_goals_by_user(self, user_id: str) -> List[Goal]:
         """
         Retrieves all goals for a user and parses them back into Goal Pydantic models.
         """
-        GoalQuery = Query()
-        results = self.goals_table.search(GoalQuery.user_id == user_id)
-        return [Goal.model_validate(res) for res in results]
+        return [Goal.model_validate(res) for res in self._user_goal_docs(user_id)]
 
     def update_goal(self, goal_id: str, goal_update: Goal) -> bool:
         """
         Updates an existing goal document by replacing its content with the new model data.
         """
-        GoalQuery = Query()
-        goal_data = goal_update.model_dump(mode="json")
+        goal_doc = self._get_goal_doc(goal_id)
+        if goal_doc is None:
+            return False
 
-        # Ensure we don't accidentally change the ID if it's not in the update
-        updated_count = self.goals_table.update(goal_data, GoalQuery.id == goal_id)
-        return len(updated_count) > 0
+        self.goals_table.update(
+            goal_update.model_dump(mode="json"), doc_ids=[goal_doc.doc_id]
+        )
+        # The update may replace the id, owner and milestones, so re-index it whole
+        self._unindex_goal(goal_doc)
+        self._index_goal(self.goals_table.get(doc_id=goal_doc.doc_id))
+        return True
 
     def update_milestone(self, milestone_id: str, milestone_update: Milestone) -> bool:
         """
         Finds a milestone by its ID within any goal and updates its specific data.
         """
-        GoalQuery = Query()
-        # We have to iterate through goals because milestones are nested in TinyDB
-        all_goals = self.goals_table.all()
+        goal_id = self._milestone_goals.get(milestone_id)
+        if goal_id is None:
+            return False
 
-        for goal_doc in all_goals:
-            milestones = goal_doc.get("milestones", [])
-            updated = False
+        ms_data = milestone_update.model_dump(mode="json")
+        replaced = {}
 
+        def replace(goal_doc):
+            milestones = goal_doc["milestones"]
             for i, ms in enumerate(milestones):
                 if ms["id"] == milestone_id:
-                    # Update the specific milestone in the list
-                    milestones[i] = milestone_update.model_dump(mode="json")
-                    updated = True
-                    break
-
-            if updated:
-                self.goals_table.update(
-                    {"milestones": milestones}, doc_ids=[goal_doc.doc_id]
-                )
-                return True
-
-        return False
+                    replaced["index"], replaced["old"] = i, ms
+                    milestones[i] = ms_data
+                    return
+
+        self.goals_table.update(replace, doc_ids=[self._goal_docs[goal_id]])
+        self._unindex_milestone(replaced["old"])
+        self._index_milestone(goal_id, replaced["index"], ms_data)
+        return True
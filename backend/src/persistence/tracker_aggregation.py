@@ -0,0 +1,230 @@
+"""
+Incremental aggregation for every Tracker.aggregation_strategy.
+
+Each log is folded into the running aggregate of its window in O(1), and the
+tracker's progress (current_value, current_streak, best_streak) is derived from
+those stored aggregates, never from the raw Logs table.
+
+Progress keeps only the latest window and the one before it, so a log that
+arrives up to one window late is still folded in place. Older windows are
+folded into a closed streak and dropped; their history lives in the Rollups
+"window" buckets, and a log for one of them means a rebuild from those
+(rebuild_progress). Timestamps are compared and bucketed in UTC; naive
+timestamps are taken to be UTC.
+
+Windows are window_num_days long and aligned to a fixed calendar epoch (weekly
+windows start on Mondays), so a log's window never depends on the order logs
+arrive in. Trackers without window_num_days aggregate over one window (index 0).
+A window succeeds when its aggregate falls in target_range; ALL needs every log
+in range and ONE-TIME needs any. The tracker completes after
+num_windows_to_completion consecutive successful windows (1 if unset).
+
+The same per-window aggregates back the Rollups table, which buckets every log
+by day, by week and by tracker window for history charts.
+"""
+
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Iterable, List, Optional, Tuple
+
+from schemas.core_v2 import Tracker, TrackerProgress, WindowAggregate
+
+
+def in_target_range(
+    target_range: Tuple[Optional[Decimal], Optional[Decimal]],
+    value: Optional[Decimal],
+) -> bool:
+    low, high = target_range
+    return (
+        value is not None
+        and (low is None or value >= low)
+        and (high is None or value <= high)
+    )
+
+
+def window_index(tracker: Tracker, day: date) -> int:
+    if not tracker.window_num_days:
+        return 0
+    # date.toordinal() is 1 on Monday 0001-01-01
+    return (day.toordinal() - 1) // tracker.window_num_days
+
+
+def window_start(tracker: Tracker, index: int) -> date:
+    if not tracker.window_num_days:
+        raise ValueError(f"Tracker {tracker.tracker_id} is not windowed")
+    return date.fromordinal(index * tracker.window_num_days + 1)
+
+
+def rollup_buckets(tracker: Tracker, timestamp: datetime) -> List[Tuple[str, date]]:
+    """(granularity, bucket start) of every rollup bucket a log counts towards."""
+    day = as_utc(timestamp).date()
+    buckets = [("day", day), ("week", day - timedelta(days=day.weekday()))]
+    if tracker.window_num_days:
+        buckets.append(("window", window_start(tracker, window_index(tracker, day))))
+    return buckets
+
+
+def add_to_window(
+    window: WindowAggregate,
+    value: Decimal,
+    target_range: Tuple[Optional[Decimal], Optional[Decimal]],
+):
+    window.sum += value
+    window.count += 1
+    window.min = value if window.min is None else min(window.min, value)
+    window.max = value if window.max is None else max(window.max, value)
+    hit = in_target_range(target_range, value)
+    window.all_in_range = window.all_in_range and hit
+    window.any_in_range = window.any_in_range or hit
+
+
+def window_value(strategy: str, window: WindowAggregate) -> Optional[Decimal]:
+    """The window's aggregate as shown to the user, or None if nothing was logged."""
+    if window.count == 0:
+        return None
+    if strategy == "SUM":
+        return window.sum
+    if strategy == "MEAN":
+        return window.sum / window.count
+    if strategy == "MIN":
+        return window.min
+    if strategy == "MAX":
+        return window.max
+    if strategy == "ALL":
+        return Decimal(int(window.all_in_range))
+    if strategy == "ONE-TIME":
+        return Decimal(int(window.any_in_range))
+    raise ValueError(f"Unknown aggregation strategy: {strategy}")
+
+
+def window_succeeded(tracker: Tracker, window: Optional[WindowAggregate]) -> bool:
+    if window is None or window.count == 0:
+        return False
+    if tracker.aggregation_strategy == "ALL":
+        return window.all_in_range
+    if tracker.aggregation_strategy == "ONE-TIME":
+        return window.any_in_range
+    return in_target_range(
+        tracker.target_range, window_value(tracker.aggregation_strategy, window)
+    )
+
+
+def as_utc(timestamp: datetime) -> datetime:
+    """Aware UTC copy of a timestamp; naive timestamps are taken to be UTC."""
+    if timestamp.tzinfo is None:
+        return timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.astimezone(timezone.utc)
+
+
+def utc_key(timestamp: datetime) -> str:
+    """
+    ISO form of a timestamp in UTC, used for log sort keys and range bounds.
+    Mixing naive and aware (or differently offset) strings would not compare
+    in time order.
+    """
+    return as_utc(timestamp).isoformat()
+
+
+def _close_windows(
+    tracker: Tracker, progress: TrackerProgress, before: int, previous: Optional[int]
+):
+    """
+    Folds the stored windows older than `before` into the closed streak and
+    drops them. `previous` is the last window already folded in, if any.
+    """
+    for index in sorted(i for i in progress.windows if i < before):
+        if previous is None or index != previous + 1:
+            # The windows in between had no logs
+            progress.closed_streak = 0
+        if window_succeeded(tracker, progress.windows.pop(index)):
+            progress.closed_streak += 1
+        else:
+            progress.closed_streak = 0
+        progress.closed_best_streak = max(
+            progress.closed_best_streak, progress.closed_streak
+        )
+        previous = index
+    if previous is None or previous < before - 1:
+        progress.closed_streak = 0
+
+
+def _refresh_streaks(tracker: Tracker):
+    """Derives the streaks and current_value from the two stored windows."""
+    progress = tracker.progress
+    latest = progress.latest_window
+    run_previous = (
+        progress.closed_streak + 1
+        if window_succeeded(tracker, progress.windows.get(latest - 1))
+        else 0
+    )
+    run_latest = (
+        run_previous + 1
+        if window_succeeded(tracker, progress.windows.get(latest))
+        else 0
+    )
+    # While the latest window is still open, the run up to the previous one
+    # is not broken yet
+    progress.current_streak = run_latest or run_previous
+    progress.best_streak = max(progress.closed_best_streak, run_previous, run_latest)
+    tracker.current_value = window_value(
+        tracker.aggregation_strategy, progress.windows[latest]
+    )
+
+
+def apply_log(tracker: Tracker, value: Decimal, timestamp: datetime) -> bool:
+    """
+    Folds one logged value into the tracker's progress, in place.
+
+    Returns False, leaving progress untouched, if the log belongs to a window
+    that is already closed (older than the previous one). Rebuild progress
+    from the rollup "window" buckets with rebuild_progress in that case.
+    """
+    progress = tracker.progress
+    value = Decimal(str(value))
+    timestamp = as_utc(timestamp)
+    index = window_index(tracker, timestamp.date())
+
+    latest = progress.latest_window
+    if latest is None or index > latest:
+        progress.latest_window = index
+    # Also bounds progress written before only two windows were kept
+    _close_windows(
+        tracker,
+        progress,
+        progress.latest_window - 1,
+        None if latest is None else latest - 2,
+    )
+    if index < progress.latest_window - 1:
+        return False
+
+    window = progress.windows.setdefault(index, WindowAggregate())
+    add_to_window(window, value, tracker.target_range)
+    _refresh_streaks(tracker)
+    if tracker.last_log_date is None or timestamp > as_utc(tracker.last_log_date):
+        tracker.last_log_date = timestamp
+    return True
+
+
+def rebuild_progress(tracker: Tracker, windows: Iterable[Tuple[date, WindowAggregate]]):
+    """
+    Recomputes the tracker's progress, in place, from its whole window history:
+    (window start, aggregate) pairs, i.e. its rollup "window" buckets.
+    """
+    progress = tracker.progress
+    progress.windows = {
+        window_index(tracker, start): window.model_copy() for start, window in windows
+    }
+    if not progress.windows:
+        return
+    progress.latest_window = max(progress.windows)
+    progress.closed_streak = progress.closed_best_streak = 0
+    _close_windows(tracker, progress, progress.latest_window - 1, None)
+    _refresh_streaks(tracker)
+
+
+def windows_to_completion(tracker: Tracker) -> int:
+    return tracker.num_windows_to_completion or 1
+
+
+def is_complete(tracker: Tracker) -> bool:
+    return tracker.progress.best_streak >= windows_to_completion(tracker)
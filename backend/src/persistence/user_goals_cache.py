@@ -0,0 +1,80 @@
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from persistence.write_versions import WriteVersions
+
+DEFAULT_MAX_USERS = 4096
+DEFAULT_TTL_SECONDS = 600
+
+
+class UserGoalsCache:
+    """
+    Per-user goal lists used to build agent prompts (e.g. the orchestrator's
+    ORCHESTRATOR_CONTEXT), so a chat turn doesn't re-query DynamoDB for them.
+
+    Entries are snapshots {"version", "fetched_at", "goals"}. The version is bumped
+    by every goal write (see DynamoDBHandler.create_goal/update_goal), which makes
+    older snapshots stale. PlanState keeps only the version, so goal lists are
+    never checkpointed.
+
+    The cache assumes a single worker process. Versions are per process ("<boot
+    id>-<tick>"), so a snapshot from another worker never counts as current, but
+    goal writes handled by another worker are only picked up once the TTL runs out.
+    """
+
+    def __init__(
+        self,
+        max_users: int = DEFAULT_MAX_USERS,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+    ):
+        self.max_users = max_users
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._versions = WriteVersions(max_users)
+        self._boot_id = secrets.token_hex(4)
+        self._lock = threading.Lock()
+
+    def version(self, user_id: str) -> str:
+        with self._lock:
+            return f"{self._boot_id}-{self._versions.get(user_id)}"
+
+    def is_current(self, user_id: str, snapshot: Optional[Dict[str, Any]]) -> bool:
+        return bool(
+            snapshot
+            and snapshot.get("version") == self.version(user_id)
+            and time.time() - snapshot.get("fetched_at", 0) <= self.ttl_seconds
+        )
+
+    def get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            snapshot = self._entries.get(user_id)
+            if snapshot is None:
+                return None
+            self._entries.move_to_end(user_id)
+        return snapshot if self.is_current(user_id, snapshot) else None
+
+    def put(self, user_id: str, goals: List[Dict], version: str) -> Dict[str, Any]:
+        """
+        Stores goals read at `version` (taken before the read) and returns the
+        snapshot. A write that landed during the read leaves it uncached.
+        """
+        snapshot = {"version": version, "fetched_at": time.time(), "goals": goals}
+        if version != self.version(user_id):
+            return snapshot
+        with self._lock:
+            self._entries[user_id] = snapshot
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+        return snapshot
+
+    def invalidate(self, user_id: str):
+        with self._lock:
+            self._versions.tick(user_id)
+            self._entries.pop(user_id, None)
+
+
+user_goals_cache = UserGoalsCache()
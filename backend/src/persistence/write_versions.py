@@ -0,0 +1,37 @@
+from collections import OrderedDict
+
+
+class WriteVersions:
+    """
+    Tick of each user's last write, from one process-wide clock, for caches
+    that must not store data read before a write (see DashboardCache and
+    UserGoalsCache).
+
+    Only the max_users most recently written users are kept. A user whose tick
+    was dropped reads as `floor`, the highest tick dropped so far, which is at
+    least their real last write. That can make a snapshot look stale (one extra
+    read), never a stale snapshot look current.
+
+    Not thread-safe: callers hold their own lock.
+    """
+
+    def __init__(self, max_users: int):
+        self.max_users = max_users
+        self.clock = 0
+        self.floor = 0
+        self._ticks: "OrderedDict[str, int]" = OrderedDict()
+
+    def get(self, user_id: str) -> int:
+        return self._ticks.get(user_id, self.floor)
+
+    def tick(self, user_id: str) -> int:
+        self.clock += 1
+        self._ticks[user_id] = self.clock
+        self._ticks.move_to_end(user_id)
+        while len(self._ticks) > self.max_users:
+            _, dropped = self._ticks.popitem(last=False)
+            self.floor = max(self.floor, dropped)
+        return self.clock
+
+    def __len__(self) -> int:
+        return len(self._ticks)
@@ -435,3 +435,15 @@ PLANNER_CONTEXT = """
 # PREVIOUS PLAN & PERFORMANCE
 {{previous_plan_context}}
 """
+
+
+CONTEXT_SUMMARY_PROMPT = """
+# ROLE
+You maintain the running memory of a coaching conversation between a user and an assistant.
+
+# TASK
+Merge the PREVIOUS SUMMARY and the NEW TURNS into one updated summary. Keep every decision, commitment, preference, number, date and open question the assistant will need later. Drop greetings, repetition and wording details.
+
+# OUTPUT
+Plain text, at most 200 words, written in the third person ("The user wants..."). No JSON, no markdown headings.
+"""
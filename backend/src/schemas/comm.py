@@ -0,0 +1,85 @@
+# comm.py
+"""
+Response models for the agents' LLM turns.
+
+Each model mirrors the "# RESPONSE SCHEMA" block of its agent's prompt and is
+sent to the API as a strict json_schema response_format
+(see llms.openai_api.structured_response_format). Strict mode requires every
+field to be listed as required and forbids extra keys, so optional values are
+nullable fields without defaults rather than fields that may be left out.
+"""
+
+from typing import List, Literal, Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class AgentResponse(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+
+# --- Goal Formulator ---
+class GoalDetails(AgentResponse):
+    what: Optional[str]
+    why: Optional[str]
+    when: Optional[str]
+
+
+class GoalFormulatorResponse(AgentResponse):
+    intent: Literal["GOAL_FORMATION", "ORCHESTRATOR"]
+    is_complete: bool
+    goal_details: Optional[GoalDetails]
+    to_user: Optional[str]
+
+
+# --- Milestone Formulator (the milestone DAG) ---
+class TrackerSpec(AgentResponse):
+    log_prompt: str
+    unit: str
+    aggregation_strategy: Literal["SUM", "ALL", "MIN", "MAX", "MEAN", "ONE-TIME"]
+    # [low, high]; either bound may be open
+    target_range: List[Optional[float]] = Field(min_length=2, max_length=2)
+    window_num_days: Optional[int]
+    num_windows_to_completion: Optional[int]
+
+
+class MilestoneSpec(AgentResponse):
+    # Temporary id, only used to wire up depends_on within one response
+    id: str
+    depends_on: List[str]
+    statement: str
+    trackers: List[TrackerSpec]
+
+
+class MilestoneFormulatorResponse(AgentResponse):
+    intent: Literal["MILESTONE_FORMULATION", "ORCHESTRATOR"]
+    reroute_reason: Optional[str]
+    is_complete: bool
+    milestones: Optional[List[MilestoneSpec]]
+    to_user: Optional[str]
+
+
+# --- Orchestrator ---
+class OrchestratorResponse(AgentResponse):
+    # null while the orchestrator still needs more information from the user
+    intent: Optional[
+        Literal[
+            "GOAL_FORMATION",
+            "MILESTONE_FORMATION",
+            "MOTIVATION",
+            "DAY_PLANNING",
+            "PROGRESS_TRACKING",
+        ]
+    ]
+    goal_id: Optional[str]
+    summary: Optional[str]
+    to_user: Optional[str]
+
+
+# --- Resilience Coach ---
+class CoachResponse(AgentResponse):
+    intent: Literal["RESILIENCE_COACH", "ORCHESTRATOR"]
+    is_complete: bool
+    reroute_reason: Optional[str]
+    captured_reflection: Optional[str]
+    to_user: Optional[str]
@@ -3,7 +3,7 @@ from typing import List, Dict, Any, Optional, Literal, Union, Tuple
 from pydantic import BaseModel, Field
 from typing_extensions import Annotated
 import uuid
-from datetime import datetime
+from datetime import datetime, timezone
 import secrets
 import string
 from decimal import Decimal
@@ -19,6 +19,25 @@ def generate_id(length=4):
     return "".join(secrets.choice(alphabet) for _ in range(length))
 
 
+# --- JSON fast path ---
+# json_from_db builds the same dict as from_db_format(item).model_dump(mode="json")
+# without validating, for read-only views of items that were validated when
+# written (through to_db_format).
+def _json_decimal(value) -> Optional[str]:
+    return None if value is None else str(value)
+
+
+def _json_int(value) -> Optional[int]:
+    return None if value is None else int(value)
+
+
+def _json_datetime(value: Optional[str]) -> Optional[str]:
+    # Stored values come from isoformat(); Pydantic writes UTC as "Z"
+    if not value:
+        return None
+    return value[:-6] + "Z" if value.endswith("+00:00") else value
+
+
 # --- 1. Polymorphic Tracker Configs (The "kwargs" solution) ---
 class AchievementMetric(BaseModel):
     type: Literal["ACHIEVEMENT"]
@@ -100,6 +119,38 @@ class SuccessLogic(BaseModel):
 #           "num_windows_to_completion": number | null,
 
 
+class WindowAggregate(BaseModel):
+    """Running aggregate of the logs that fall in one tracker window."""
+
+    sum: Decimal = Decimal(0)
+    count: int = 0
+    min: Optional[Decimal] = None
+    max: Optional[Decimal] = None
+    all_in_range: bool = True
+    any_in_range: bool = False
+
+
+class TrackerProgress(BaseModel):
+    """
+    Aggregation state kept on the tracker item (see persistence.tracker_aggregation).
+    Windowed trackers key windows by index; the others only use window 0.
+    """
+
+    # Only the latest window and the one before it. Stored with the tracker
+    # (to_db_format) but left out of API and dashboard JSON.
+    windows: Dict[int, WindowAggregate] = Field(default_factory=dict, exclude=True)
+    latest_window: Optional[int] = None
+    # Run of consecutive successful windows up to the latest one
+    current_streak: int = 0
+    # Longest run of consecutive successful windows
+    best_streak: int = 0
+    # The same two for the windows before the previous one, which are dropped
+    closed_streak: int = 0
+    closed_best_streak: int = 0
+    # Bumped on every write, so concurrent log writes can't overwrite each other
+    version: int = 0
+
+
 class Tracker(BaseModel):
     # --- Indexing & Linkage ---
     user_id: str
@@ -119,18 +170,25 @@ class Tracker(BaseModel):
     # --- Tracking State ---
     current_value: Decimal = 0
     last_log_date: Optional[datetime] = None
+    progress: TrackerProgress = Field(default_factory=TrackerProgress)
 
     def to_db_format(self) -> Dict[str, Any]:
         """Prepares the tracker for encrypted/JSON storage."""
         # We dump the entire model but keep indexing fields separate
         full_dump = self.model_dump()
         last_log_date = full_dump.pop("last_log_date", None)
+        progress = full_dump.pop("progress")
+        # DynamoDB map keys must be strings
+        progress["windows"] = {
+            str(k): v.model_dump() for k, v in self.progress.windows.items()
+        }
         return {
             "user_id": full_dump.pop("user_id"),
             "milestone_id": full_dump.pop("milestone_id"),
             "tracker_id": full_dump.pop("tracker_id"),
             "current_value": full_dump.pop("current_value"),
             "last_log_date": (last_log_date.isoformat() if last_log_date else None),
+            "progress": progress,
             # The remaining fields (including nested success_logic) go here
             "tracker_json": full_dump,
         }
@@ -150,15 +208,46 @@ class Tracker(BaseModel):
                 if data.get("last_log_date")
                 else None
             ),
+            progress=data.get("progress") or {},
         )
         data_dict.update(data.get("tracker_json", {}))
         return cls(**data_dict)
 
+    @staticmethod
+    def json_from_db(data: Dict[str, Any]) -> Dict[str, Any]:
+        """from_db_format(data).model_dump(mode="json"), without validation."""
+        config = data.get("tracker_json", {})
+        progress = data.get("progress") or {}
+        low, high = config["target_range"]
+        return {
+            "user_id": data["user_id"],
+            "milestone_id": data["milestone_id"],
+            "tracker_id": data["tracker_id"],
+            "log_prompt": config["log_prompt"],
+            "unit": config["unit"],
+            "aggregation_strategy": config["aggregation_strategy"],
+            "target_range": [_json_decimal(low), _json_decimal(high)],
+            "window_num_days": _json_int(config.get("window_num_days")),
+            "num_windows_to_completion": _json_int(
+                config.get("num_windows_to_completion")
+            ),
+            "current_value": str(data.get("current_value", 0)),
+            "last_log_date": _json_datetime(data.get("last_log_date")),
+            "progress": {
+                "latest_window": _json_int(progress.get("latest_window")),
+                "current_streak": int(progress.get("current_streak", 0)),
+                "best_streak": int(progress.get("best_streak", 0)),
+                "closed_streak": int(progress.get("closed_streak", 0)),
+                "closed_best_streak": int(progress.get("closed_best_streak", 0)),
+                "version": int(progress.get("version", 0)),
+            },
+        }
+
 
 class LogEntry(BaseModel):
     user_id: str
     tracker_id: str
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
+    timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     value: Decimal
 
     def to_db_format(self) -> Dict[str, Any]:
@@ -221,6 +310,19 @@ class Milestone(BaseModel):
             depends_on=details.get("depends_on", []),
         )
 
+    @staticmethod
+    def json_from_db(data: Dict[str, Any]) -> Dict[str, Any]:
+        """from_db_format(data).model_dump(mode="json"), without validation."""
+        details = data.get("milestone_json", {})
+        return {
+            "user_id": data["user_id"],
+            "goal_id": data["goal_id"],
+            "milestone_id": data["milestone_id"],
+            "statement": details["statement"],
+            "status": details.get("status", "pending"),
+            "depends_on": list(details.get("depends_on", [])),
+        }
+
 
 class Goal(BaseModel):
     user_id: str
@@ -252,16 +354,32 @@ class Goal(BaseModel):
             why=details.get("why"),
         )
 
+    @staticmethod
+    def json_from_db(data: Dict[str, Any]) -> Dict[str, Any]:
+        """from_db_format(data).model_dump(mode="json"), without validation."""
+        details = data.get("goal_json", {})
+        return {
+            "user_id": data["user_id"],
+            "goal_id": data["goal_id"],
+            "what": details["what"],
+            "when": details["when"],
+            "why": details["why"],
+        }
+
 
 # --- 3. Interaction Models ---
 
 
 class TrackerUpdate(BaseModel):
     tracker_id: str
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
+    timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     value: Any
 
 
+class LogBatch(BaseModel):
+    entries: List[LogEntry]
+
+
 class UserRequest(BaseModel):
     message: str
     thread_id: str = "user_1"
@@ -1,5 +1,7 @@
 # server.py
+import os
 import sqlite3
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Depends
 from langchain_core.messages import HumanMessage
 from langgraph.checkpoint.sqlite import SqliteSaver
@@ -16,9 +18,17 @@ from schemas.core import (  # The Data Models
 
 # from agents.test_agent import build_goal_app
 from agents.agent_graph import build_goal_app  # The Agent Graph Factory
-from agents.agent_utils import initialize_state
+from agents.agent_utils import initialize_state, migrate_state
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Persists writes still cached in memory when cache_writes is on
+    repo.close()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # --- 1. Setup Global State ---
 
@@ -29,7 +39,11 @@ agent_graph = build_goal_app(checkpointer)
 
 # B. Business Data Persistence (The Repository)
 # We initialize this once. It handles its own connections.
-repo = GoalRepository()
+# Each write rewrites the file by default. GOALPILOT_TINYDB_CACHE_WRITES=1 batches
+# writes in memory instead (every 100 writes and on shutdown), at the cost of losing
+# up to 99 of them if the process is killed.
+TINYDB_CACHE_WRITES = os.getenv("GOALPILOT_TINYDB_CACHE_WRITES", "0") == "1"
+repo = GoalRepository(cache_writes=TINYDB_CACHE_WRITES)
 
 # --- 2. API Endpoints: Chat & Graph State ---
 
@@ -68,15 +82,20 @@ def chat_endpoint(req: UserRequest):
     config = {"configurable": {"thread_id": req.thread_id}}
     current_state = agent_graph.get_state(config)
 
+    state_updates = {}
     if not current_state.values:
         # Initialize state for this thread if it doesn't exist
         initial_state = initialize_state()
         agent_graph.update_state(config, initial_state)
+    else:
+        # Threads checkpointed by an older release are migrated with this turn
+        state_updates = migrate_state(current_state.values) or {}
 
     try:
         # Run the agent
         result = agent_graph.invoke(
             {
+                **state_updates,
                 "last_user_message": HumanMessage(content=req.message),
                 "user_id": req.thread_id,
             },
@@ -1,30 +1,53 @@
 # server.py
 import boto3
 import uvicorn
-from fastapi import FastAPI, HTTPException, Depends, APIRouter, Query
+from fastapi import FastAPI, HTTPException, Depends, APIRouter, Query, Header, Response
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Optional
-from agents.agent_graph import build_goal_app
-from agents.agent_utils import initialize_state
+from datetime import date, datetime
+from typing import Any, Dict, List, Literal, Optional
+from agents.agent_graph import build_async_goal_app
+from agents.agent_utils import (
+    StreamingJSONExtractor,
+    initialize_state,
+    migrate_state,
+)
 from langgraph_checkpoint_aws import DynamoDBSaver
 from langgraph.graph import StateGraph
 from langchain_core.messages import HumanMessage
 import logging
+from contextlib import asynccontextmanager
 
 # --- Imports ---
 # Assumes you have the updated DynamoDBHandler and Pydantic models in these files
-from persistence.dynamodb_database import DynamoDBHandler
+from persistence.async_dynamodb_database import AsyncDynamoDBHandler, get_async_handler
+from persistence.dashboard_cache import dashboard_cache
+from json_responses import FastJSONResponse, dumps
+from llms.openai_api import aclose_http_clients
+from llms.response_cache import response_cache
+from llms.usage_metrics import prompt_cache_metrics, structured_output_metrics
 from schemas.core_v2 import (
     Goal,
     Milestone,
     Tracker,
     LogEntry,
+    LogBatch,
     TrackerUpdate,
     UserRequest,
 )
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm the shared handler so the first request doesn't pay for client setup
+    get_async_handler()
+    yield
+    get_async_handler().close()
+    await aclose_http_clients()
+
+
 # Initialize App
-app = FastAPI(title="Goal Tracker API", version="2.0")
+app = FastAPI(title="Goal Tracker API", version="2.0", lifespan=lifespan)
 
 # Define the origins that are allowed to talk to your API
 # Adjust the ports depending on what your frontend uses (e.g., React is usually 3000, Vite is 5173)
@@ -55,7 +78,8 @@ checkpointer = DynamoDBSaver(
     enable_checkpoint_compression=True,
     session=my_session,
 )
-agent_graph = build_goal_app(checkpointer)
+agent_graph = build_async_goal_app(checkpointer)
+logger = logging.getLogger(__name__)
 logging.getLogger(
     "langgraph_checkpoint_aws.checkpoint.dynamodb.unified_repository"
 ).setLevel(logging.WARNING)
@@ -63,55 +87,84 @@ logging.getLogger(
 
 # --- Dependency Injection ---
 # This allows you to swap DynamoDB for TinyDB or MockDB easily in tests
-def get_db_handler():
-    # In production, you might cache this connection
-    return DynamoDBHandler(region_name="us-east-1")
+def get_db_handler() -> AsyncDynamoDBHandler:
+    # Built once per process; every request shares its connection pool
+    return get_async_handler(region_name="us-east-1")
 
 
 # --- 1. The Dashboard / Aggregate Router (Optimized for Frontend) ---
 dashboard_router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
 
 
+@dashboard_router.get("/cache/stats")
+async def get_dashboard_cache_stats():
+    """Hit/miss counters for the in-process dashboard cache."""
+    return dashboard_cache.stats()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
 @dashboard_router.get("/{user_id}")
-def get_user_dashboard(user_id: str, db: DynamoDBHandler = Depends(get_db_handler)):
+async def get_user_dashboard(
+    user_id: str,
+    since: Optional[str] = None,
+    if_none_match: Optional[str] = Header(default=None),
+    db: AsyncDynamoDBHandler = Depends(get_db_handler),
+):
     """
     The 'One-Shot' endpoint. Fetches Goals, Milestones, and Trackers
     and stitches them into a hierarchy for the mobile app home screen.
+
+    Responses carry an ETag; sending it back in If-None-Match returns 304 straight
+    from the cache. ?since=<version> returns only the goals, milestones and
+    trackers changed after that version ("full": true if it can't be answered).
     """
+    version = db.get_dashboard_version(user_id)
+    if version and if_none_match and etag_matches(if_none_match, f'"{version}"'):
+        return Response(status_code=304, headers={"ETag": f'"{version}"'})
+
     try:
-        return db.get_full_user_state(user_id)
+        version, body = await db.get_dashboard_snapshot(user_id, since)
     except Exception as e:
-        breakpoint()
+        logger.exception(f"Dashboard read failed for {user_id}")
         raise HTTPException(status_code=500, detail=str(e))
 
+    headers = {"ETag": f'"{version}"'} if version else {}
+    return FastJSONResponse(content=body, headers=headers)
+
 
 # --- 2. Goals Router ---
 goals_router = APIRouter(prefix="/goals", tags=["Goals"])
 
 
 @goals_router.post("/", response_model=Goal)
-def create_goal(goal: Goal, db: DynamoDBHandler = Depends(get_db_handler)):
+async def create_goal(goal: Goal, db: AsyncDynamoDBHandler = Depends(get_db_handler)):
     try:
-        db.create_goal(goal)
+        await db.create_goal(goal)
         return goal
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@goals_router.get("/{user_id}", response_model=List[Goal])
-def list_goals(user_id: str, db: DynamoDBHandler = Depends(get_db_handler)):
+@goals_router.get(
+    "/{user_id}", response_model=List[Goal], response_class=FastJSONResponse
+)
+async def list_goals(user_id: str, db: AsyncDynamoDBHandler = Depends(get_db_handler)):
     # Note: If you use the dashboard endpoint, you rarely need this alone
-    return db.get_goals_by_user(user_id)
+    return await db.get_goals_for_user(user_id)
 
 
 @goals_router.put("/{goal_id}")
-def update_goal(
-    goal_id: str, goal: Goal, db: DynamoDBHandler = Depends(get_db_handler)
+async def update_goal(
+    goal_id: str, goal: Goal, db: AsyncDynamoDBHandler = Depends(get_db_handler)
 ):
     # Ensure the payload ID matches the URL ID for safety
     if goal.goal_id != goal_id:
         raise HTTPException(status_code=400, detail="ID mismatch in payload")
-    db.update_goal(goal)
+    await db.update_goal(goal)
     return {"status": "updated", "goal_id": goal_id}
 
 
@@ -120,26 +173,26 @@ milestones_router = APIRouter(prefix="/milestones", tags=["Milestones"])
 
 
 @milestones_router.post("/", response_model=Milestone)
-def create_milestone(
-    milestone: Milestone, db: DynamoDBHandler = Depends(get_db_handler)
+async def create_milestone(
+    milestone: Milestone, db: AsyncDynamoDBHandler = Depends(get_db_handler)
 ):
     # We don't need goal_id in the URL because it's in the Pydantic model
     try:
-        db.create_milestone(milestone)
+        await db.create_milestone(milestone)
         return milestone
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @milestones_router.put("/{milestone_id}")
-def update_milestone(
+async def update_milestone(
     milestone_id: str,
     milestone: Milestone,
-    db: DynamoDBHandler = Depends(get_db_handler),
+    db: AsyncDynamoDBHandler = Depends(get_db_handler),
 ):
     if milestone.milestone_id != milestone_id:
         raise HTTPException(status_code=400, detail="ID mismatch")
-    db.update_milestone(milestone)
+    await db.update_milestone(milestone)
     return {"status": "updated", "milestone_id": milestone_id}
 
 
@@ -148,19 +201,23 @@ trackers_router = APIRouter(prefix="/trackers", tags=["Trackers"])
 
 
 @trackers_router.post("/", response_model=Tracker)
-def create_tracker(tracker: Tracker, db: DynamoDBHandler = Depends(get_db_handler)):
+async def create_tracker(
+    tracker: Tracker, db: AsyncDynamoDBHandler = Depends(get_db_handler)
+):
     try:
-        db.create_tracker(tracker)
+        await db.create_tracker(tracker)
         return tracker
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @trackers_router.put("/{tracker_id}")
-def update_tracker(
-    tracker_id: str, tracker: Tracker, db: DynamoDBHandler = Depends(get_db_handler)
+async def update_tracker(
+    tracker_id: str,
+    tracker: Tracker,
+    db: AsyncDynamoDBHandler = Depends(get_db_handler),
 ):
-    db.update_tracker(tracker)
+    await db.update_tracker(tracker)
     return {"status": "updated"}
 
 
@@ -182,18 +239,20 @@ logs_router = APIRouter(prefix="/logs", tags=["Logs"])
 
 
 @logs_router.post("/", response_model=LogEntry)
-def log_progress(entry: LogEntry, db: DynamoDBHandler = Depends(get_db_handler)):
+async def log_progress(
+    entry: LogEntry, db: AsyncDynamoDBHandler = Depends(get_db_handler)
+):
     """
     Logs a data point and atomically updates the parent Tracker's state.
     """
     try:
         # 1. Fetch the tracker first to know the metric_type and current rules
-        tracker = db.get_tracker(entry.user_id, entry.tracker_id)
+        tracker = await db.get_tracker(entry.user_id, entry.tracker_id)
         if not tracker:
             raise HTTPException(status_code=404, detail="Tracker not found")
 
         # 2. Pass both the new entry and the tracker config to the DB handler
-        db.log_tracker_update(entry, tracker)
+        await db.log_tracker_update(entry, tracker)
 
         return entry
     except Exception as e:
@@ -201,55 +260,242 @@ def log_progress(entry: LogEntry, db: DynamoDBHandler = Depends(get_db_handler))
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@logs_router.post("/batch")
+async def log_progress_batch(
+    batch: LogBatch, db: AsyncDynamoDBHandler = Depends(get_db_handler)
+):
+    """
+    Logs many data points at once (e.g. values collected offline).
+    Entries are grouped by tracker and each tracker is updated once.
+    Payload: { "entries": [{ "user_id": "...", "tracker_id": "...", "value": 10 }, ...] }
+    """
+    try:
+        logged, rejected = await db.log_tracker_updates_bulk(batch.entries)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return {
+        "logged": len(logged),
+        "rejected": [
+            {**entry.model_dump(mode="json"), "reason": "Tracker not found"}
+            for entry in rejected
+        ],
+    }
+
+
+@logs_router.post("/compact")
+async def compact_tracker_logs(
+    user_id: str,
+    tracker_id: str,
+    before: Optional[date] = None,
+    db: AsyncDynamoDBHandler = Depends(get_db_handler),
+):
+    """
+    Packs a tracker's logs from closed months into one compact item per month.
+    History reads are unaffected. Usage: POST /logs/compact?user_id=123&tracker_id=456
+    """
+    try:
+        months = await db.compact_logs(user_id, tracker_id, before)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"months_packed": months}
+
+
+@logs_router.get("/rollup")
+async def get_tracker_rollup(
+    user_id: str,
+    tracker_id: str,
+    granularity: Literal["day", "week", "window"] = "day",
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: AsyncDynamoDBHandler = Depends(get_db_handler),
+):
+    """
+    Pre-aggregated history for charts: one point per day, week or tracker window.
+    Usage: GET /logs/rollup?user_id=123&tracker_id=456&granularity=week&start=2026-01-01
+    """
+    tracker = await db.get_tracker(user_id, tracker_id)
+    if not tracker:
+        raise HTTPException(status_code=404, detail="Tracker not found")
+    if granularity == "window" and not tracker.window_num_days:
+        raise HTTPException(status_code=400, detail="Tracker has no windows")
+
+    return FastJSONResponse(
+        content={
+            "tracker_id": tracker_id,
+            "granularity": granularity,
+            "aggregation_strategy": tracker.aggregation_strategy,
+            "unit": tracker.unit,
+            "points": await db.get_rollups(tracker, granularity, start, end),
+        }
+    )
+
+
 @logs_router.get("/")
-def get_tracker_history(
+async def get_tracker_history(
     user_id: str,
     tracker_id: str,
-    limit: int = 30,
-    db: DynamoDBHandler = Depends(get_db_handler),
+    limit: int = Query(30, ge=1, le=1000),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    db: AsyncDynamoDBHandler = Depends(get_db_handler),
 ):
     """
-    Fetches history for a specific tracker using Query Params.
-    Usage: GET /logs?user_id=123&tracker_id=456&limit=10
+    Fetches one page of history for a specific tracker, newest first.
+    Usage: GET /logs?user_id=123&tracker_id=456&limit=10&start=2026-01-01T00:00:00
+    Pass the returned next_cursor as ?cursor= to load older logs.
     """
-    return db.get_history_logs(user_id, tracker_id, limit)
+    try:
+        page = await db.get_history_logs(
+            user_id, tracker_id, limit, start=start, end=end, cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return FastJSONResponse(content=page)
 
 
 # --- 6. AI Agent Router (Kept Separate) ---
 ai_router = APIRouter(prefix="/ai", tags=["AI Agent"])
 
 
-@ai_router.post("/chat")
-def agent_chat(req: UserRequest):
-    config = {"configurable": {"thread_id": req.thread_id}}
-    current_state = agent_graph.get_state(config)
+async def ensure_thread_state(config: dict) -> dict:
+    """
+    Creates the thread's state if needed. Returns updates to send along with
+    the turn's input: the migration of a thread checkpointed by an older
+    release, so it is slimmed down in the same checkpoint write.
+    """
+    current_state = await agent_graph.aget_state(config)
 
     if not current_state.values:
         # Initialize state for this thread if it doesn't exist
         initial_state = initialize_state()
-        agent_graph.update_state(config, initial_state)
+        await agent_graph.aupdate_state(config, initial_state)
+        return {}
+    return migrate_state(current_state.values) or {}
+
+
+def chat_turn_input(req: UserRequest, state_updates: dict) -> dict:
+    return {
+        **state_updates,
+        "last_user_message": HumanMessage(content=req.message),
+        "user_id": req.thread_id,
+        "to_user": [],
+    }
+
+
+@ai_router.post("/chat")
+async def agent_chat(req: UserRequest):
+    config = {"configurable": {"thread_id": req.thread_id}}
+    state_updates = await ensure_thread_state(config)
 
     try:
         # Run the agent
-        result = agent_graph.invoke(
-            {
-                "last_user_message": HumanMessage(content=req.message),
-                "user_id": req.thread_id,
-                "to_user": [],
-            },
-            config,
-        )
+        result = await agent_graph.ainvoke(chat_turn_input(req, state_updates), config)
 
         # breakpoint()
 
-        return {
-            "response": result["to_user"],
-            "thread_id": req.thread_id,
-        }
+        return FastJSONResponse(
+            content={
+                "response": result["to_user"],
+                "thread_id": req.thread_id,
+            }
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@ai_router.get("/metrics/prompt-cache")
+async def prompt_cache_stats():
+    """Per-agent input vs. cached input tokens since startup, and the latest turns."""
+    return prompt_cache_metrics.snapshot()
+
+
+@ai_router.get("/metrics/structured-output")
+async def structured_output_stats():
+    """Per-agent structured replies, parse failures and repairs since startup."""
+    return structured_output_metrics.snapshot()
+
+
+@ai_router.get("/metrics/response-cache")
+async def response_cache_stats():
+    """Response cache size, hits (exact and near-duplicate) and misses."""
+    return response_cache.stats()
+
+
+def format_sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {dumps(data).decode()}\n\n"
+
+
+@ai_router.post("/chat/stream")
+async def agent_chat_stream(req: UserRequest):
+    """
+    Same turn as /ai/chat, streamed as Server-Sent Events:
+    - "token":   {"agent", "delta"} raw LLM output as it is generated
+    - "to_user": {"agent", "delta"} the reply's to_user text, decoded from the
+                 JSON while the model is still generating it
+    - "message": an AgentMessage as soon as its node appends it to to_user.
+                 It is the final text and replaces that agent's to_user deltas,
+                 which may stop short when a reply needs a repair call (those
+                 calls are not streamed)
+    - "done" / "error": end of the turn
+    """
+    config = {"configurable": {"thread_id": req.thread_id}}
+    state_updates = await ensure_thread_state(config)
+
+    async def event_stream():
+        sent = 0
+        # One extractor per LLM response, keyed by message id
+        extractors: Dict[str, StreamingJSONExtractor] = {}
+        to_user_sent: Dict[str, int] = {}
+        try:
+            async for mode, chunk in agent_graph.astream(
+                chat_turn_input(req, state_updates),
+                config,
+                stream_mode=["messages", "updates"],
+            ):
+                if mode == "messages":
+                    message_chunk, metadata = chunk
+                    if isinstance(message_chunk.content, str) and message_chunk.content:
+                        agent = metadata.get("langgraph_node")
+                        yield format_sse(
+                            "token", {"agent": agent, "delta": message_chunk.content}
+                        )
+
+                        message_id = message_chunk.id or agent
+                        extractor = extractors.setdefault(
+                            message_id, StreamingJSONExtractor()
+                        )
+                        extractor.feed(message_chunk.content)
+                        text = extractor.string_field("to_user") or ""
+                        done = to_user_sent.get(message_id, 0)
+                        if len(text) > done:
+                            to_user_sent[message_id] = len(text)
+                            yield format_sse(
+                                "to_user", {"agent": agent, "delta": text[done:]}
+                            )
+                    continue
+
+                # "updates" carries each node's returned state; to_user only grows
+                # during a turn, so anything past `sent` is new
+                for node_update in chunk.values():
+                    to_user = (node_update or {}).get("to_user") or []
+                    for agent_message in to_user[sent:]:
+                        yield format_sse("message", agent_message)
+                    sent = max(sent, len(to_user))
+
+            yield format_sse("done", {"thread_id": req.thread_id})
+        except Exception as e:
+            logger.error(f"Streaming chat failed: {e}")
+            yield format_sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # --- Register Routes ---
 app.include_router(dashboard_router)
 app.include_router(goals_router)
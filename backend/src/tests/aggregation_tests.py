@@ -0,0 +1,155 @@
+import pathlib
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+sys.path.append(
+    str(pathlib.Path(sys.path[0]).parent)
+)  # Add parent directory to path for imports
+
+from schemas.core_v2 import Tracker, WindowAggregate
+from persistence.tracker_aggregation import (
+    add_to_window,
+    apply_log,
+    as_utc,
+    in_target_range,
+    rebuild_progress,
+    rollup_buckets,
+    window_index,
+    windows_to_completion,
+    is_complete,
+)
+
+STRATEGIES = ["SUM", "ALL", "MIN", "MAX", "MEAN", "ONE-TIME"]
+START = datetime(2026, 1, 1)
+
+
+def random_tracker(rng: random.Random) -> Tracker:
+    low = rng.choice([None, Decimal(rng.randint(0, 5))])
+    high = rng.choice([None, (low or 0) + rng.randint(0, 10)])
+    windowed = rng.random() < 0.8
+    return Tracker(
+        user_id="prop_user",
+        milestone_id="prop_milestone",
+        log_prompt="How much today?",
+        unit="units",
+        aggregation_strategy=rng.choice(STRATEGIES),
+        target_range=(low, high),
+        window_num_days=rng.choice([1, 2, 7]) if windowed else None,
+        num_windows_to_completion=rng.choice([None, 1, 3, 5]) if windowed else None,
+    )
+
+
+def random_logs(rng: random.Random):
+    days = rng.randint(1, 40)
+    logs = []
+    for _ in range(rng.randint(1, 60)):
+        timestamp = START + timedelta(
+            days=rng.randrange(days), minutes=rng.randrange(24 * 60)
+        )
+        if rng.random() < 0.3:
+            # Clients may send aware timestamps in any offset
+            offset = timezone(timedelta(hours=rng.randint(-11, 12)))
+            timestamp = timestamp.replace(tzinfo=timezone.utc).astimezone(offset)
+        value = Decimal(rng.randint(-2, 12)) / rng.choice([1, 2, 4])
+        logs.append((timestamp, value))
+    return logs
+
+
+def brute_force(tracker: Tracker, logs):
+    """Recomputes progress from every raw log, with no incremental state."""
+    by_window = {}
+    for timestamp, value in logs:
+        day = as_utc(timestamp).date()
+        by_window.setdefault(window_index(tracker, day), []).append(value)
+
+    def aggregate(values):
+        strategy = tracker.aggregation_strategy
+        if strategy == "SUM":
+            return sum(values, Decimal(0))
+        if strategy == "MEAN":
+            return sum(values, Decimal(0)) / len(values)
+        if strategy == "MIN":
+            return min(values)
+        if strategy == "MAX":
+            return max(values)
+        hits = [in_target_range(tracker.target_range, v) for v in values]
+        return Decimal(int(all(hits) if strategy == "ALL" else any(hits)))
+
+    def succeeded(values):
+        if tracker.aggregation_strategy in ("ALL", "ONE-TIME"):
+            return aggregate(values) == 1
+        return in_target_range(tracker.target_range, aggregate(values))
+
+    best = run = previous_run = 0
+    for index in range(min(by_window), max(by_window) + 1):
+        previous_run = run
+        run = run + 1 if index in by_window and succeeded(by_window[index]) else 0
+        best = max(best, run)
+
+    current_value = aggregate(by_window[max(by_window)])
+    last_log_date = max(as_utc(timestamp) for timestamp, _ in logs)
+    # The latest window may still be open, so it doesn't break the run yet
+    return current_value, best, run or previous_run, last_log_date
+
+
+def log_with_rollups(tracker: Tracker, rollups, value, timestamp):
+    """What the storage backends do: update the "window" buckets and the
+    tracker, and rebuild from the buckets when the log's window is closed."""
+    for granularity, start in rollup_buckets(tracker, timestamp):
+        if granularity == "window":
+            window = rollups.setdefault(start, WindowAggregate())
+            add_to_window(window, value, tracker.target_range)
+    if not apply_log(tracker, value, timestamp):
+        rebuild_progress(tracker, rollups.items())
+
+
+def run_property_checks(cases: int = 2000, seed: int = 7):
+    rng = random.Random(seed)
+    failures = 0
+    for case in range(cases):
+        tracker = random_tracker(rng)
+        logs = random_logs(rng)
+
+        # Logs arrive in any order (e.g. offline syncs)
+        incremental = tracker.model_copy(deep=True)
+        rollups = {}
+        max_windows = 0
+        for timestamp, value in rng.sample(logs, len(logs)):
+            log_with_rollups(incremental, rollups, value, timestamp)
+            max_windows = max(max_windows, len(incremental.progress.windows))
+
+        expected = brute_force(tracker, logs)
+        actual = (
+            incremental.current_value,
+            incremental.progress.best_streak,
+            incremental.progress.current_streak,
+            incremental.last_log_date,
+        )
+        complete = expected[1] >= windows_to_completion(tracker)
+
+        # A round trip through the DB format must keep the state usable
+        reloaded = Tracker.from_db_format(incremental.to_db_format())
+
+        if (
+            actual != expected
+            or max_windows > 2
+            or is_complete(incremental) != complete
+            or reloaded.progress != incremental.progress
+        ):
+            failures += 1
+            print(f"❌ Case {case}: expected {expected}, got {actual}")
+            print(f"   {tracker.model_dump()}")
+
+    if failures:
+        print(
+            f"❌ {failures}/{cases} cases disagree with the brute-force recomputation"
+        )
+    else:
+        print(f"✅ {cases} random trackers match the brute-force recomputation")
+    return failures == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_property_checks() else 1)
@@ -0,0 +1,210 @@
+import asyncio
+import json
+import logging
+import os
+import pathlib
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+
+sys.path.append(
+    str(pathlib.Path(sys.path[0]).parent)
+)  # Add parent directory to path for imports
+
+import llms.openai_api as openai_api
+from agents.agent_graph import build_async_goal_app, build_goal_app
+from agents.agent_utils import initialize_state
+
+# Stand-in for a gpt-5-mini round trip
+LLM_LATENCY = 0.5
+# Starlette runs sync `def` routes on a thread pool of this size
+ROUTE_THREADS = 40
+SESSIONS = 300
+
+
+class EmptyDynamoDB(ThreadingHTTPServer):
+    """Local DynamoDB endpoint for users with no goals yet."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), EmptyDynamoDBRequest)
+
+
+class EmptyDynamoDBRequest(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        operation = self.headers["X-Amz-Target"].split(".")[-1]
+        result = {"Items": [], "Count": 0, "ScannedCount": 0}
+        body = json.dumps(result if operation == "Query" else {}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-amz-json-1.0")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubLLM:
+    """Answers every orchestrator turn after LLM_LATENCY; tracks calls in flight."""
+
+    def __init__(self):
+        self.in_flight = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def _reply(self):
+        body = {
+            "intent": None,
+            "goal_id": None,
+            "summary": None,
+            "to_user": "What would you like to work on today?",
+        }
+        return AIMessage(content=json.dumps(body), usage_metadata=None)
+
+    def _enter(self):
+        with self._lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+
+    def _exit(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def invoke(self, context, *args, **kwargs):
+        self._enter()
+        time.sleep(LLM_LATENCY)
+        self._exit()
+        return self._reply()
+
+    async def ainvoke(self, context, *args, **kwargs):
+        self._enter()
+        await asyncio.sleep(LLM_LATENCY)
+        self._exit()
+        return self._reply()
+
+
+def turn_input(thread_id):
+    return {
+        "last_user_message": HumanMessage(content="Hi, I'm back"),
+        "user_id": thread_id,
+        "to_user": [],
+    }
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+async def drive(chat_turn):
+    latencies, replies = [], []
+
+    async def session(n):
+        start = time.perf_counter()
+        replies.append(await chat_turn(f"bench_thread_{n}"))
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(session(n) for n in range(SESSIONS)))
+    return latencies, replies, time.perf_counter() - start
+
+
+async def sync_graph():
+    """/ai/chat before: a sync route running graph.invoke on a route thread."""
+    graph = build_goal_app(MemorySaver())
+    routes = ThreadPoolExecutor(max_workers=ROUTE_THREADS)
+
+    def route(thread_id):
+        config = {"configurable": {"thread_id": thread_id}}
+        graph.update_state(config, initialize_state())
+        return graph.invoke(turn_input(thread_id), config)["to_user"]
+
+    async def chat_turn(thread_id):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(routes, route, thread_id)
+
+    try:
+        return await drive(chat_turn)
+    finally:
+        routes.shutdown()
+
+
+async def async_graph():
+    """/ai/chat now: an async route awaiting graph.ainvoke."""
+    graph = build_async_goal_app(MemorySaver())
+
+    async def chat_turn(thread_id):
+        config = {"configurable": {"thread_id": thread_id}}
+        await graph.aupdate_state(config, initialize_state())
+        return (await graph.ainvoke(turn_input(thread_id), config))["to_user"]
+
+    return await drive(chat_turn)
+
+
+def run_benchmark():
+    # Nodes log every turn; keep only errors
+    logging.disable(logging.WARNING)
+    server = EmptyDynamoDB()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ.update(
+        {
+            "AWS_ENDPOINT_URL_DYNAMODB": f"http://127.0.0.1:{server.server_port}",
+            "AWS_ACCESS_KEY_ID": "benchmark",
+            "AWS_SECRET_ACCESS_KEY": "benchmark",
+        }
+    )
+    print(
+        f"{SESSIONS} concurrent chat sessions, one turn each, "
+        f"stub LLM {LLM_LATENCY * 1000:.0f} ms"
+    )
+    print(
+        f"{'scenario':<28}{'p50 ms':>9}{'p99 ms':>9}{'turns/s':>9}"
+        f"{'peak LLM calls':>16}"
+    )
+    results = {}
+    for label, scenario in [
+        ("sync graph, route threads", sync_graph),
+        ("async graph", async_graph),
+    ]:
+        llm = StubLLM()
+        openai_api.get_llm = lambda **kwargs: llm
+        latencies, replies, elapsed = asyncio.run(scenario())
+        answered = sum(1 for reply in replies if reply)
+        results[label] = (percentile(latencies, 0.99), llm.peak, answered)
+        print(
+            f"{label:<28}{percentile(latencies, 0.5) * 1000:>9.0f}"
+            f"{percentile(latencies, 0.99) * 1000:>9.0f}"
+            f"{SESSIONS / elapsed:>9.0f}{llm.peak:>16}"
+            f"  {'✅' if answered == SESSIONS else f'❌ {answered} answered'}"
+        )
+    server.shutdown()
+
+    before_p99, before_peak, before_answered = results["sync graph, route threads"]
+    after_p99, after_peak, after_answered = results["async graph"]
+    passed = (
+        before_answered == after_answered == SESSIONS
+        and before_peak <= ROUTE_THREADS
+        and after_peak > ROUTE_THREADS
+        and after_p99 < before_p99
+    )
+    print(
+        f"{'✅' if passed else '❌'} {after_peak} chats waiting on the LLM at once "
+        f"(sync: {before_peak}), p99 {before_p99 * 1000:.0f} ms -> "
+        f"{after_p99 * 1000:.0f} ms"
+    )
+    return passed
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_benchmark() else 1)
@@ -0,0 +1,195 @@
+import gzip
+import json
+import pathlib
+import sys
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+sys.path.append(
+    str(pathlib.Path(sys.path[0]).parent)
+)  # Add parent directory to path for imports
+
+import agents.orchestrator_agent as orchestrator_agent
+from agents.agent_utils import (
+    MAX_CONTEXT_MESSAGES,
+    initialize_state,
+    migrate_state,
+    slim_message,
+)
+from schemas.core_v2 import Goal, Milestone, Tracker
+
+_serde = JsonPlusSerializer()
+# Same level as the DynamoDB saver's enable_checkpoint_compression
+GZIP_LEVEL = 6
+
+
+def llm_reply(turn: int) -> AIMessage:
+    """An AIMessage shaped like a real gpt-5-mini response."""
+    body = {
+        "intent": "MILESTONE_FORMULATION",
+        "reroute_reason": None,
+        "is_complete": False,
+        "milestones": None,
+        "to_user": f"Turn {turn}: how many sessions a week feel realistic to you?",
+    }
+    return AIMessage(
+        content=json.dumps(body),
+        additional_kwargs={"refusal": None},
+        response_metadata={
+            "token_usage": {
+                "completion_tokens": 180,
+                "prompt_tokens": 2400,
+                "total_tokens": 2580,
+                "completion_tokens_details": {"reasoning_tokens": 0},
+                "prompt_tokens_details": {"cached_tokens": 1920},
+            },
+            "model_provider": "openai",
+            "model_name": "gpt-5-mini-2025-08-07",
+            "system_fingerprint": None,
+            "id": f"chatcmpl-{turn:024d}",
+            "service_tier": "default",
+            "finish_reason": "stop",
+            "logprobs": None,
+        },
+        id=f"lc_run--{turn:08d}-0000-0000-0000-000000000000-0",
+        usage_metadata={
+            "input_tokens": 2400,
+            "output_tokens": 180,
+            "total_tokens": 2580,
+            "input_token_details": {"audio": 0, "cache_read": 1920},
+            "output_token_details": {"audio": 0, "reasoning": 0},
+        },
+    )
+
+
+def unversioned_state(turns: int, milestones: int, trackers_each: int) -> dict:
+    """A thread as checkpointed before state version 2."""
+    state = initialize_state()
+    del state["state_version"]
+    state["user_id"] = "bench_user"
+    goal = Goal(
+        user_id="bench_user",
+        what="Run a half marathon",
+        when="October 2027",
+        why="To prove to myself I can stick with something hard",
+    )
+    m_objs, t_objs = [], []
+    for i in range(milestones):
+        milestone = Milestone(
+            user_id="bench_user",
+            goal_id=goal.goal_id,
+            statement=f"Run {5 + i * 3} km without stopping, three times a week",
+            depends_on=[m_objs[-1].milestone_id] if m_objs else [],
+        )
+        m_objs.append(milestone)
+        for _ in range(trackers_each):
+            t_objs.append(
+                Tracker(
+                    user_id="bench_user",
+                    milestone_id=milestone.milestone_id,
+                    log_prompt="How many kilometres did you run today?",
+                    unit="km",
+                    aggregation_strategy="SUM",
+                    target_range=(5 + i * 3, None),
+                    window_num_days=7,
+                    num_windows_to_completion=4,
+                )
+            )
+    state["structured_data"] = {
+        "goal": goal,
+        "milestones": m_objs,
+        "trackers": t_objs,
+        "goal_id": goal.goal_id,
+    }
+    for turn in range(turns):
+        state["current_context"].append(
+            HumanMessage(content=f"Turn {turn}: I can probably do three a week.")
+        )
+        state["current_context"].append(llm_reply(turn))
+    state["last_user_message"] = HumanMessage(content="Sounds good, let's do it.")
+    return state
+
+
+def checkpoint_bytes(state: dict):
+    _, raw = _serde.dumps_typed(state)
+    return len(raw), len(gzip.compress(raw, compresslevel=GZIP_LEVEL))
+
+
+def run_benchmark():
+    ok = True
+    print(
+        f"{'scenario':<36}{'before':>10}{'after':>10}{'gzip before':>14}{'gzip after':>12}"
+    )
+    for turns, milestones, trackers_each in [(2, 3, 1), (7, 5, 2), (14, 8, 3)]:
+        before = unversioned_state(turns, milestones, trackers_each)
+        after = {**before, **migrate_state(before)}
+
+        data = after["structured_data"]
+        refs_ok = (
+            data["goal_id"] == before["structured_data"]["goal"].goal_id
+            and len(data["milestone_ids"]) == milestones
+            and len(data["tracker_ids"]) == milestones * trackers_each
+            and all(
+                m.content == n.content
+                for m, n in zip(
+                    before["current_context"][-MAX_CONTEXT_MESSAGES:],
+                    after["current_context"],
+                )
+            )
+            and migrate_state(after) is None
+        )
+
+        # One more turn in each shape: what every later step writes
+        before["current_context"].append(llm_reply(turns))
+        after["current_context"].append(slim_message(llm_reply(turns)))
+        raw_before, gz_before = checkpoint_bytes(before)
+        raw_after, gz_after = checkpoint_bytes(after)
+        ok = ok and refs_ok and raw_after < raw_before
+
+        label = f"{turns} turns, {milestones} ms x {trackers_each} trackers"
+        print(
+            f"{label:<36}{raw_before:>10}{raw_after:>10}{gz_before:>14}{gz_after:>12}"
+            f"  {raw_after / raw_before:5.0%}  {'✅' if refs_ok else '❌ refs'}"
+        )
+    return ok
+
+
+def check_user_goals_stay_out_of_checkpoints(goals: int = 20):
+    """The orchestrator's goal list is cached per process, not in PlanState."""
+    user_goals = [
+        dict(what=f"Goal {i}", when="2027", why="Because it matters", id=f"g{i}")
+        for i in range(goals)
+    ]
+    fetches = []
+
+    def get_user_goals(user_id):
+        fetches.append(user_id)
+        return user_goals
+
+    orchestrator_agent.get_user_goals = get_user_goals
+    state = initialize_state()
+    state["user_id"] = "bench_user"
+    # Checkpointed while PlanState still held the whole snapshot
+    state["structured_data"]["user_goals"] = {"version": "old", "goals": user_goals}
+    raw_before, _ = checkpoint_bytes(state)
+    first = orchestrator_agent.load_user_goals(state)
+    second = orchestrator_agent.load_user_goals(state)
+    raw_after, _ = checkpoint_bytes(state)
+
+    passed = (
+        first == second == user_goals
+        and len(fetches) == 1
+        and "user_goals" not in state["structured_data"]
+        and raw_after < raw_before
+    )
+    print(
+        f"{'✅' if passed else '❌'} {goals} goals read {len(fetches)} time(s) in two "
+        f"turns, state {raw_before} -> {raw_after} bytes"
+    )
+    return passed
+
+
+if __name__ == "__main__":
+    results = [run_benchmark(), check_user_goals_stay_out_of_checkpoints()]
+    sys.exit(0 if all(results) else 1)
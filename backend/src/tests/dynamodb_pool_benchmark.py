@@ -0,0 +1,207 @@
+import asyncio
+import json
+import os
+import pathlib
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from boto3.dynamodb.types import TypeSerializer
+
+sys.path.append(
+    str(pathlib.Path(sys.path[0]).parent)
+)  # Add parent directory to path for imports
+
+from persistence.async_dynamodb_database import AsyncDynamoDBHandler
+from persistence.dynamodb_database import DynamoDBHandler
+from schemas.core_v2 import Goal, Milestone, Tracker
+
+# Stand-in network costs of the regional endpoint
+QUERY_LATENCY = 0.010
+# Paid once per new connection, like TCP + TLS setup
+CONNECT_LATENCY = 0.030
+# Starlette runs sync `def` routes on a thread pool of this size
+ROUTE_THREADS = 40
+CONCURRENT_CLIENTS = 50
+REQUESTS = 150
+
+_serializer = TypeSerializer()
+
+
+def make_partition(goals=3, milestones_each=3, trackers_each=2):
+    items = {"Goals": [], "Milestones": [], "Trackers": []}
+    for g in range(goals):
+        goal = Goal(user_id="user_1", what=f"Goal {g}", when="2027", why="health")
+        items["Goals"].append(goal.to_db_format())
+        for m in range(milestones_each):
+            milestone = Milestone(
+                user_id="user_1", goal_id=goal.goal_id, statement=f"Milestone {m}"
+            )
+            items["Milestones"].append(milestone.to_db_format())
+            for _ in range(trackers_each):
+                tracker = Tracker(
+                    user_id="user_1",
+                    milestone_id=milestone.milestone_id,
+                    log_prompt="How many km?",
+                    unit="km",
+                    aggregation_strategy="SUM",
+                    target_range=(Decimal(5), None),
+                    current_value=Decimal(0),
+                )
+                items["Trackers"].append(tracker.to_db_format())
+    return {
+        table: [{k: _serializer.serialize(v) for k, v in item.items()} for item in rows]
+        for table, rows in items.items()
+    }
+
+
+class FakeDynamoDB(ThreadingHTTPServer):
+    """
+    Local DynamoDB endpoint that answers Query with one user's partition.
+    Counts the connections clients open.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, partition):
+        super().__init__(("127.0.0.1", 0), FakeDynamoDBRequest)
+        self.partition = partition
+        self.connections = 0
+        self._lock = threading.Lock()
+
+    def count_connection(self):
+        with self._lock:
+            self.connections += 1
+
+
+class FakeDynamoDBRequest(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.count_connection()
+        time.sleep(CONNECT_LATENCY)
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        assert self.headers["X-Amz-Target"].endswith(".Query")
+        time.sleep(QUERY_LATENCY)
+        items = self.server.partition[request["TableName"]]
+        body = json.dumps(
+            {"Items": items, "Count": len(items), "ScannedCount": len(items)}
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-amz-json-1.0")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+async def drive(request):
+    """CONCURRENT_CLIENTS clients sending REQUESTS dashboard reads between them."""
+    latencies, trees = [], []
+    remaining = iter(range(REQUESTS))
+
+    async def client():
+        for _ in remaining:
+            start = time.perf_counter()
+            trees.append(await request("user_1"))
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(CONCURRENT_CLIENTS)))
+    return latencies, trees, time.perf_counter() - start
+
+
+async def per_request_handlers():
+    """server_v2 before: a sync route building a DynamoDBHandler per request."""
+    routes = ThreadPoolExecutor(max_workers=ROUTE_THREADS)
+
+    def route(user_id):
+        return DynamoDBHandler(cache=None).get_full_user_state(user_id)
+
+    async def request(user_id):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(routes, route, user_id)
+
+    try:
+        return await drive(request)
+    finally:
+        routes.shutdown()
+
+
+async def shared_async_handler():
+    """server_v2 now: async routes awaiting one process-wide handler."""
+    handler = AsyncDynamoDBHandler()
+    # Every read goes to the endpoint, as in the per-request case
+    handler.sync.cache = None
+    try:
+        return await drive(handler.get_full_user_state)
+    finally:
+        handler.close()
+
+
+def run_benchmark():
+    partition = make_partition()
+    server = FakeDynamoDB(partition)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ.update(
+        {
+            "AWS_ENDPOINT_URL_DYNAMODB": f"http://127.0.0.1:{server.server_port}",
+            "AWS_ACCESS_KEY_ID": "benchmark",
+            "AWS_SECRET_ACCESS_KEY": "benchmark",
+        }
+    )
+    expected = len(partition["Trackers"])
+
+    print(
+        f"{CONCURRENT_CLIENTS} clients, {REQUESTS} dashboard reads, "
+        f"{QUERY_LATENCY * 1000:.0f} ms per query, "
+        f"{CONNECT_LATENCY * 1000:.0f} ms per new connection"
+    )
+    print(f"{'scenario':<28}{'p50 ms':>9}{'p99 ms':>9}{'req/s':>9}{'connections':>13}")
+    results = {}
+    for label, scenario in [
+        ("handler per request", per_request_handlers),
+        ("shared async handler", shared_async_handler),
+    ]:
+        server.connections = 0
+        latencies, trees, elapsed = asyncio.run(scenario())
+        complete = all(
+            sum(len(m["trackers"]) for g in tree["goals"] for m in g["milestones"])
+            == expected
+            for tree in trees
+        )
+        results[label] = (percentile(latencies, 0.99), complete)
+        print(
+            f"{label:<28}{percentile(latencies, 0.5) * 1000:>9.1f}"
+            f"{percentile(latencies, 0.99) * 1000:>9.1f}"
+            f"{REQUESTS / elapsed:>9.0f}{server.connections:>13}"
+            f"  {'✅' if complete else '❌ incomplete trees'}"
+        )
+    server.shutdown()
+
+    before_p99, before_ok = results["handler per request"]
+    after_p99, after_ok = results["shared async handler"]
+    passed = before_ok and after_ok and after_p99 < before_p99
+    print(
+        f"{'✅' if passed else '❌'} p99 {before_p99 * 1000:.0f} ms -> "
+        f"{after_p99 * 1000:.0f} ms"
+    )
+    return passed
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_benchmark() else 1)
@@ -0,0 +1,89 @@
+import json
+import pathlib
+import statistics
+import sys
+import time
+
+sys.path.append(
+    str(pathlib.Path(sys.path[0]).parent)
+)  # Add parent directory to path for imports
+
+from agents.intent_router import (
+    NO_INTENT,
+    TfidfIntentModel,
+    classify_by_rules,
+    classify_intent,
+)
+
+FIXTURES = pathlib.Path(__file__).with_name("intent_fixtures.jsonl")
+# Share of routed turns that may go to the wrong agent
+MAX_MISROUTE_RATE = 0.05
+REPEATS = 200
+
+
+def load_fixtures():
+    with open(FIXTURES) as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    train = [r for r in rows if r["split"] == "train"]
+    evaluation = [r for r in rows if r["split"] == "eval"]
+    return train, evaluation
+
+
+def evaluate(name, classify, rows):
+    """
+    `intent` is the agent the turn should reach, or null when only the LLM
+    should decide. A routed turn is correct if it matches; abstaining is
+    never wrong, it just costs the LLM call.
+    """
+    routed = correct = 0
+    misroutes = []
+    for row in rows:
+        decision = classify(row["text"])
+        if decision is None:
+            continue
+        routed += 1
+        if decision.intent == row["intent"]:
+            correct += 1
+        else:
+            misroutes.append((row["text"], row["intent"], decision.intent))
+
+    latencies = []
+    for _ in range(REPEATS):
+        for row in rows:
+            start = time.perf_counter()
+            classify(row["text"])
+            latencies.append((time.perf_counter() - start) * 1e6)
+    latencies.sort()
+
+    labeled = sum(1 for r in rows if r["intent"])
+    misroute_rate = len(misroutes) / routed if routed else 0.0
+    print(f"\n{name}")
+    print(
+        f"  coverage:  {routed}/{len(rows)} turns routed locally "
+        f"({routed / len(rows):.0%}; {correct}/{labeled} of the routable ones)"
+    )
+    print(f"  precision: {correct}/{routed} ({1 - misroute_rate:.1%})")
+    print(
+        f"  latency:   mean {statistics.mean(latencies):.1f}us, "
+        f"p95 {latencies[int(len(latencies) * 0.95)]:.1f}us, "
+        f"max {latencies[-1]:.1f}us"
+    )
+    for text, expected, actual in misroutes:
+        print(f"  ❌ {text!r}: expected {expected}, routed to {actual}")
+    ok = misroute_rate <= MAX_MISROUTE_RATE
+    print(f"  {'✅' if ok else '❌'} misroute rate {misroute_rate:.1%}")
+    return ok
+
+
+if __name__ == "__main__":
+    train, evaluation = load_fixtures()
+    model = TfidfIntentModel.fit((r["text"], r["intent"] or NO_INTENT) for r in train)
+    results = [
+        evaluate("Rules only (eval split)", classify_by_rules, evaluation),
+        evaluate(
+            "Rules + TF-IDF trained on the train split (eval split)",
+            lambda text: classify_intent(text, model=model),
+            evaluation,
+        ),
+    ]
+    sys.exit(0 if all(results) else 1)
@@ -0,0 +1,95 @@
+import json
+import pathlib
+import random
+import sys
+
+sys.path.append(
+    str(pathlib.Path(sys.path[0]).parent)
+)  # Add parent directory to path for imports
+
+from agents.agent_utils import StreamingJSONExtractor, extract_json
+
+TRICKY_TEXT = [
+    "Great! Let's go.",
+    'She said "hi" \\ then left',
+    "Braces { and } and [brackets] inside a string",
+    "Unicode: café 🎯 — done",
+    "Tabs\tand\nnewlines",
+    "",
+]
+
+RESPONSES = [
+    # (raw LLM output, expected value)
+    ('{"intent": "GOAL", "to_user": "Hi"}', {"intent": "GOAL", "to_user": "Hi"}),
+    ('```json\n{"a": 1}\n```', {"a": 1}),
+    ('Sure! {"a": [1, {"b": "}"}]} Hope that helps {really}.', {"a": [1, {"b": "}"}]}),
+    ('Use {curly} braces: {"ok": true}', {"ok": True}),
+    ('[1, 2, {"x": null}] trailing ]', [1, 2, {"x": None}]),
+    ("no json here", None),
+]
+
+
+def random_payload(rng: random.Random) -> dict:
+    return {
+        "intent": rng.choice(["GOAL_FORMATION", None, "ORCHESTRATOR"]),
+        "to_user": " ".join(rng.choice(TRICKY_TEXT) for _ in range(rng.randint(0, 4))),
+        "goal_details": rng.choice(
+            [None, {"what": "Run {fast}", "when": "2027", "why": '"Health"'}]
+        ),
+        "is_complete": rng.random() < 0.5,
+    }
+
+
+def random_chunks(text: str, rng: random.Random):
+    pos = 0
+    while pos < len(text):
+        size = rng.randint(1, 8)
+        yield text[pos : pos + size]
+        pos += size
+
+
+def run_extract_json_checks():
+    failures = 0
+    for raw, expected in RESPONSES:
+        actual = extract_json(raw)
+        if actual == expected:
+            print(f"✅ extract_json {raw[:40]!r}")
+        else:
+            failures += 1
+            print(f"❌ extract_json {raw!r}: {actual!r} != {expected!r}")
+    return failures
+
+
+def run_streaming_checks(cases=2000, seed=11):
+    rng = random.Random(seed)
+    failures = 0
+    for case in range(cases):
+        payload = random_payload(rng)
+        keys = list(payload)
+        rng.shuffle(keys)
+        body = json.dumps(
+            {k: payload[k] for k in keys}, ensure_ascii=rng.random() < 0.5
+        )
+        raw = rng.choice(["", "Here you go {not json}: ", "```json\n"]) + body
+        raw += rng.choice(["", " Anything else?", "\n```", " } ]"])
+
+        extractor = StreamingJSONExtractor()
+        prefix_ok = True
+        for chunk in random_chunks(raw, rng):
+            extractor.feed(chunk)
+            partial = extractor.string_field("to_user")
+            if partial is not None and not payload["to_user"].startswith(partial):
+                prefix_ok = False
+        value = extractor.close()
+
+        if value != payload or not prefix_ok:
+            failures += 1
+            if failures <= 5:
+                print(f"❌ case {case}: {raw!r} -> {value!r} (prefix ok: {prefix_ok})")
+    print(f"{'✅' if not failures else '❌'} streaming: {cases - failures}/{cases}")
+    return failures
+
+
+if __name__ == "__main__":
+    failures = run_extract_json_checks() + run_streaming_checks()
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,120 @@
+import pathlib
+import sys
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+sys.path.append(
+    str(pathlib.Path(sys.path[0]).parent)
+)  # Add parent directory to path for imports
+
+from json_responses import FastJSONResponse
+from schemas.core_v2 import Goal, Milestone, Tracker
+from persistence.dynamodb_database import DynamoDBHandler
+from persistence.tracker_aggregation import apply_log
+
+
+def sample_payloads():
+    goal = Goal(user_id="user_1", what="Run a marathon ✨", when="2027", why="Health")
+    milestone = Milestone(
+        user_id="user_1", goal_id=goal.goal_id, statement='Run 10k "easy"'
+    )
+    tracker = Tracker(
+        user_id="user_1",
+        milestone_id=milestone.milestone_id,
+        log_prompt="How many km did you run today?",
+        unit="km",
+        aggregation_strategy="MEAN",
+        target_range=(Decimal("2.5"), None),
+        window_num_days=7,
+        num_windows_to_completion=4,
+    )
+    for day, value in enumerate(["3", "4.25", "0.1", "12"]):
+        apply_log(tracker, Decimal(value), datetime(2026, 1, 1) + timedelta(days=day))
+
+    # /dashboard
+    yield "dashboard", DynamoDBHandler._attach_user_tree(
+        [Goal.json_from_db(goal.to_db_format())],
+        {goal.goal_id: [Milestone.json_from_db(milestone.to_db_format())]},
+        {milestone.milestone_id: [Tracker.json_from_db(tracker.to_db_format())]},
+    )
+    # /goals/{user_id}
+    yield "goals", [goal, goal.model_copy(update={"what": "Ünïcödé   goal"})]
+    # /logs (DynamoDB numbers are Decimal)
+    yield "logs", {
+        "items": [
+            {
+                "timestamp": "2026-01-02T07:30:00",
+                "value": Decimal("10"),
+                "tracker_id": "T1",
+            },
+            {
+                "timestamp": "2026-01-01T07:30:00.000005",
+                "value": Decimal("2.50"),
+                "tracker_id": "T1",
+            },
+            {
+                "timestamp": "2025-12-31T23:00:00+00:00",
+                "value": Decimal("-0.125"),
+                "tracker_id": "T1",
+            },
+            {
+                "timestamp": "2025-12-30T23:00:00",
+                "value": Decimal("1E+2"),
+                "tracker_id": "T1",
+            },
+        ],
+        "next_cursor": "VDEjMjAyNS0xMi0zMFQyMzowMDowMA==",
+    }
+    yield "empty logs", {"items": [], "next_cursor": None}
+    # /logs/rollup
+    yield "rollup", {
+        "tracker_id": "T1",
+        "granularity": "week",
+        "aggregation_strategy": "MEAN",
+        "unit": "km",
+        "points": [
+            {
+                "start": "2025-12-29",
+                "value": Decimal("1.857142857142857142857142857"),
+                "count": 14,
+                "sum": Decimal("26"),
+                "min": Decimal("0"),
+                "max": None,
+            }
+        ],
+    }
+    # /ai/chat
+    yield "chat", {
+        "response": [
+            {"agent": "orchestrator", "message": "Hi! Let's set a goal.\n\n- step 1"},
+            {"agent": "goal_formulator", "message": "Emoji 🎯 and tabs\t"},
+        ],
+        "thread_id": "user_1",
+    }
+    # Native types orjson encodes itself
+    yield "datetimes", {
+        "naive": datetime(2026, 1, 1, 8, 0, 0, 120000),
+        "utc": datetime(2026, 1, 1, tzinfo=timezone.utc),
+        "offset": datetime(2026, 1, 1, tzinfo=timezone(timedelta(hours=-5))),
+        "date": datetime(2026, 1, 1).date(),
+    }
+
+
+def run_byte_identity_checks():
+    failures = 0
+    for name, payload in sample_payloads():
+        expected = JSONResponse(content=jsonable_encoder(payload)).body
+        actual = FastJSONResponse(content=payload).body
+        if actual == expected:
+            print(f"✅ {name}")
+        else:
+            failures += 1
+            print(f"❌ {name}\n   expected {expected!r}\n   actual   {actual!r}")
+    return failures == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_byte_identity_checks() else 1)
@@ -0,0 +1,194 @@
+import asyncio
+import json
+import os
+import pathlib
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_openai import ChatOpenAI
+
+sys.path.append(
+    str(pathlib.Path(sys.path[0]).parent)
+)  # Add parent directory to path for imports
+
+import llms.openai_api as openai_api
+
+# Stand-in costs of the OpenAI API
+COMPLETION_LATENCY = 0.020
+# Paid once per new connection, like TCP + TLS setup
+CONNECT_LATENCY = 0.050
+TURNS = 50
+CONCURRENT_CHATS = 16
+
+# The clients one chat turn used: orchestrator, resilience coach and planner
+TURN_CALLS = [
+    ("gpt-5-mini", 0.3, "minimal"),
+    ("gpt-5-mini", 0.1, None),
+    ("gpt-4.1-mini", 0.1, None),
+]
+CONTEXT = [
+    SystemMessage(content="# ORCHESTRATOR\nRespond with JSON."),
+    HumanMessage(content="I ran 5 km today"),
+]
+
+
+class FakeOpenAI(ThreadingHTTPServer):
+    """Local OpenAI-compatible /chat/completions endpoint that counts connections."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeOpenAIRequest)
+        self.connections = 0
+        self._lock = threading.Lock()
+
+    def count_connection(self):
+        with self._lock:
+            self.connections += 1
+
+
+class FakeOpenAIRequest(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.count_connection()
+        time.sleep(CONNECT_LATENCY)
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        time.sleep(COMPLETION_LATENCY)
+        body = json.dumps(
+            {
+                "id": "chatcmpl-benchmark",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request["model"],
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {
+                            "role": "assistant",
+                            "content": '{"to_user": "Nice run!"}',
+                        },
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": 40,
+                    "completion_tokens": 8,
+                    "total_tokens": 48,
+                },
+            }
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def new_client(model, temperature, reasoning_effort):
+    """What every call did before get_llm: construct its own ChatOpenAI."""
+    kwargs = {"reasoning_effort": reasoning_effort} if reasoning_effort else {}
+    return ChatOpenAI(model=model, temperature=temperature, **kwargs)
+
+
+def shared_client(model, temperature, reasoning_effort):
+    return openai_api.get_llm(model, temperature, reasoning_effort)
+
+
+def sync_turns(client_for):
+    # One untimed turn: imports and, for get_llm, the process's first clients
+    for key in TURN_CALLS:
+        client_for(*key).invoke(CONTEXT)
+    setup = 0.0
+    start = time.perf_counter()
+    for _ in range(TURNS):
+        for key in TURN_CALLS:
+            setup_start = time.perf_counter()
+            llm = client_for(*key)
+            setup += time.perf_counter() - setup_start
+            llm.invoke(CONTEXT)
+    return (time.perf_counter() - start) / TURNS, setup / TURNS
+
+
+async def async_turns(client_for):
+    """CONCURRENT_CHATS chats taking TURNS turns between them, on one loop."""
+    for key in TURN_CALLS:
+        await client_for(*key).ainvoke(CONTEXT)
+    setup = 0.0
+    remaining = iter(range(TURNS))
+
+    async def chat():
+        nonlocal setup
+        for _ in remaining:
+            for key in TURN_CALLS:
+                setup_start = time.perf_counter()
+                llm = client_for(*key)
+                setup += time.perf_counter() - setup_start
+                await llm.ainvoke(CONTEXT)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(chat() for _ in range(CONCURRENT_CHATS)))
+    elapsed = (time.perf_counter() - start) / TURNS
+    if client_for is shared_client:
+        await openai_api.aclose_http_clients()
+    return elapsed, setup / TURNS
+
+
+def run_benchmark():
+    server = FakeOpenAI()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_port}/v1"
+    os.environ["OPENAI_API_KEY"] = "benchmark"
+
+    print(
+        f"{TURNS} turns of {len(TURN_CALLS)} LLM calls, "
+        f"{COMPLETION_LATENCY * 1000:.0f} ms per completion, "
+        f"{CONNECT_LATENCY * 1000:.0f} ms per new connection"
+    )
+    print(f"{'scenario':<36}{'ms/turn':>9}{'setup ms/turn':>15}{'connections':>13}")
+    results = {}
+    for label, run in [
+        ("sync, ChatOpenAI per call", lambda: sync_turns(new_client)),
+        ("sync, get_llm", lambda: sync_turns(shared_client)),
+        (
+            f"async x{CONCURRENT_CHATS}, ChatOpenAI per call",
+            lambda: asyncio.run(async_turns(new_client)),
+        ),
+        (
+            f"async x{CONCURRENT_CHATS}, get_llm",
+            lambda: asyncio.run(async_turns(shared_client)),
+        ),
+    ]:
+        server.connections = 0
+        per_turn, setup = run()
+        results[label] = (per_turn, setup, server.connections)
+        print(
+            f"{label:<36}{per_turn * 1000:>9.1f}{setup * 1000:>15.2f}"
+            f"{server.connections:>13}"
+        )
+    server.shutdown()
+
+    rows = list(results.values())
+    passed = all(
+        shared[1] < fresh[1] and shared[2] <= fresh[2]
+        for fresh, shared in (rows[0:2], rows[2:4])
+    )
+    print(
+        f"{'✅' if passed else '❌'} get_llm spends less on client setup per turn "
+        f"and opens no more connections"
+    )
+    return passed
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_benchmark() else 1)
@@ -0,0 +1,315 @@
+import pathlib
+import sys
+import threading
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from boto3.dynamodb.types import TypeDeserializer
+
+sys.path.append(
+    str(pathlib.Path(sys.path[0]).parent)
+)  # Add parent directory to path for imports
+
+from schemas.core_v2 import LogEntry, Tracker
+from persistence.dynamodb_database import DynamoDBHandler
+from persistence.sqlite_database import SQLiteHandler
+
+_deserializer = TypeDeserializer()
+
+
+class TransactionCanceledException(Exception):
+    pass
+
+
+class FakeTable:
+    """Just enough of a boto3 Table for the log ingestion path."""
+
+    def __init__(self, name, sort_key):
+        self.name = name
+        self.sort_key = sort_key
+        self.items = {}
+        # When set, eventually consistent reads return the item as it was
+        # before its last write, like a replica that hasn't caught up
+        self.lagging = False
+        self.previous = {}
+
+    def key(self, item):
+        return (item["user_id"], item[self.sort_key])
+
+    def put_item(self, Item):
+        key = self.key(Item)
+        if self.lagging and key in self.items:
+            self.previous[key] = self.items[key]
+        self.items[key] = dict(Item)
+
+    def get_item(self, Key, ConsistentRead=False):
+        key = self.key(Key)
+        item = self.items.get(key)
+        if self.lagging and not ConsistentRead:
+            item = self.previous.get(key, item)
+        return {"Item": dict(item)} if item else {}
+
+
+class FakeClient:
+    """TransactWriteItems with the two conditions the handler uses."""
+
+    def __init__(self, db):
+        self.db = db
+        self.exceptions = type(
+            "exceptions",
+            (),
+            {"TransactionCanceledException": TransactionCanceledException},
+        )
+        # Tracker ids whose next transaction fails like a dropped connection
+        self.fail_next = set()
+        # Transactions are atomic, so concurrent writers see all or nothing
+        self._lock = threading.Lock()
+
+    def transact_write_items(self, TransactItems):
+        with self._lock:
+            self._transact(TransactItems)
+
+    def _transact(self, TransactItems):
+        writes = []
+        for action in TransactItems:
+            kind, params = next(iter(action.items()))
+            table = self.db.tables[params["TableName"]]
+            if kind == "Put":
+                item = {
+                    k: _deserializer.deserialize(v) for k, v in params["Item"].items()
+                }
+                if params.get("ConditionExpression") and table.key(item) in table.items:
+                    raise TransactionCanceledException("[ConditionalCheckFailed]")
+                writes.append((table, item))
+            else:
+                key = {
+                    k: _deserializer.deserialize(v) for k, v in params["Key"].items()
+                }
+                values = {
+                    k: _deserializer.deserialize(v)
+                    for k, v in params["ExpressionAttributeValues"].items()
+                }
+                if key["tracker_id"] in self.fail_next:
+                    self.fail_next.discard(key["tracker_id"])
+                    raise ConnectionError("connection reset")
+                current = table.items.get(table.key(key))
+                if (
+                    current is None
+                    or current["progress"]["version"] != values[":expected"]
+                ):
+                    raise TransactionCanceledException("[ConditionalCheckFailed]")
+                writes.append(
+                    (
+                        table,
+                        {
+                            **current,
+                            "progress": values[":progress"],
+                            "current_value": values[":val"],
+                            "last_log_date": values[":ts"],
+                        },
+                    )
+                )
+        for table, item in writes:
+            table.put_item(Item=item)
+
+
+class FakeDynamoDB:
+    def __init__(self):
+        self.tables = {
+            "Trackers": FakeTable("Trackers", "tracker_id"),
+            "Logs": FakeTable("Logs", "sk"),
+            "Rollups": FakeTable("Rollups", "sk"),
+        }
+        self.meta = type("meta", (), {"client": FakeClient(self)})
+
+    def Table(self, name):
+        return self.tables[name]
+
+    def batch_get_item(self, RequestItems):
+        responses = {}
+        for name, request in RequestItems.items():
+            table = self.tables[name]
+            responses[name] = [
+                dict(table.items[table.key(k)])
+                for k in request["Keys"]
+                if table.key(k) in table.items
+            ]
+        return {"Responses": responses, "UnprocessedKeys": {}}
+
+
+def fake_handler() -> DynamoDBHandler:
+    handler = DynamoDBHandler.__new__(DynamoDBHandler)
+    handler.page_size = None
+    handler.cache = None
+    handler.dynamodb = FakeDynamoDB()
+    handler.goals_table = None
+    handler.milestones_table = None
+    handler.trackers_table = handler.dynamodb.Table("Trackers")
+    handler.logs_table = handler.dynamodb.Table("Logs")
+    handler.rollups_table = handler.dynamodb.Table("Rollups")
+    return handler
+
+
+def make_tracker(handler, tracker_id):
+    tracker = Tracker(
+        user_id="user_1",
+        milestone_id="m1",
+        tracker_id=tracker_id,
+        log_prompt="How many km?",
+        unit="km",
+        aggregation_strategy="SUM",
+        target_range=(Decimal(10), None),
+        window_num_days=7,
+        current_value=Decimal(0),
+    )
+    handler.create_tracker(tracker)
+    return tracker
+
+
+def week_sum(handler, tracker_id):
+    tracker = handler.get_tracker("user_1", tracker_id)
+    rollup = handler.rollups_table.items[("user_1", f"{tracker_id}#week#2026-01-05")]
+    return tracker.current_value, rollup["sum"], rollup["count"]
+
+
+def test_bulk_retry_after_partial_failure():
+    handler = fake_handler()
+    for tracker_id in ("T1", "T2"):
+        make_tracker(handler, tracker_id)
+    batch = [
+        LogEntry(
+            user_id="user_1",
+            tracker_id=tracker_id,
+            timestamp=datetime(2026, 1, 5, 7) + timedelta(days=day),
+            value=Decimal(3),
+        )
+        for tracker_id in ("T1", "T2")
+        for day in range(3)
+    ]
+
+    # T1 is written, then T2's transaction fails and the client resends it all
+    handler.dynamodb.meta.client.fail_next.add("T2")
+    try:
+        handler.log_tracker_updates_bulk(batch)
+        first_failed = False
+    except ConnectionError:
+        first_failed = True
+    logged, rejected = handler.log_tracker_updates_bulk(batch)
+
+    expected = (Decimal(9), Decimal(9), 3)
+    results = {t: week_sum(handler, t) for t in ("T1", "T2")}
+    passed = (
+        first_failed
+        and len(logged) == 6
+        and not rejected
+        and all(r == expected for r in results.values())
+    )
+    print(
+        f"{'✅' if passed else '❌'} bulk retry after a partial failure: "
+        f"{results} (expected {expected} each)"
+    )
+    return passed
+
+
+def test_single_log_resubmit():
+    handler = fake_handler()
+    tracker = make_tracker(handler, "T1")
+    entry = LogEntry(
+        user_id="user_1",
+        tracker_id="T1",
+        timestamp=datetime(2026, 1, 6, 7),
+        value=Decimal(4),
+    )
+    tracker = handler.log_tracker_update(entry, tracker)
+    version = tracker.progress.version
+    # The client never saw the response and sends the same log again
+    again = handler.log_tracker_update(entry, handler.get_tracker("user_1", "T1"))
+
+    result = week_sum(handler, "T1")
+    passed = result == (Decimal(4), Decimal(4), 1) and again.progress.version == version
+    print(f"{'✅' if passed else '❌'} single log resubmitted: {result}")
+    return passed
+
+
+def test_concurrent_writers():
+    handler = fake_handler()
+    tracker = make_tracker(handler, "T1")
+    handler.trackers_table.lagging = True
+    writers = 4
+    barrier = threading.Barrier(writers)
+    errors = []
+
+    # Every writer starts from the same tracker version, so all but one lose
+    # the first round and must retry against what the others wrote
+    def write(day):
+        entry = LogEntry(
+            user_id="user_1",
+            tracker_id="T1",
+            timestamp=datetime(2026, 1, 5, 7) + timedelta(days=day),
+            value=Decimal(2),
+        )
+        barrier.wait()
+        try:
+            handler.log_tracker_update(entry, tracker)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(day,)) for day in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    handler.trackers_table.lagging = False
+    result = week_sum(handler, "T1")
+    expected = (Decimal(2 * writers), Decimal(2 * writers), writers)
+    passed = not errors and result == expected
+    print(
+        f"{'✅' if passed else '❌'} {writers} concurrent writers: {result} "
+        f"(expected {expected}){f', errors: {errors}' if errors else ''}"
+    )
+    return passed
+
+
+def test_history_mixes_naive_and_aware_timestamps():
+    handler = SQLiteHandler(":memory:", cache=None)
+    tracker = make_tracker(handler, "T1")
+    # 09:00Z, 08:00Z and 07:00Z, written naive, with an offset and in UTC
+    for timestamp in (
+        datetime(2026, 1, 5, 9),
+        datetime(2026, 1, 5, 10, tzinfo=timezone(timedelta(hours=2))),
+        datetime(2026, 1, 5, 7, tzinfo=timezone.utc),
+    ):
+        entry = LogEntry(
+            user_id="user_1", tracker_id="T1", timestamp=timestamp, value=Decimal(1)
+        )
+        tracker = handler.log_tracker_update(entry, tracker)
+
+    def hours(page):
+        return [datetime.fromisoformat(log["timestamp"]).hour for log in page["items"]]
+
+    newest_first = hours(handler.get_history_logs("user_1", "T1"))
+    after = hours(
+        handler.get_history_logs(
+            "user_1", "T1", start=datetime(2026, 1, 5, 8, 30, tzinfo=timezone.utc)
+        )
+    )
+    before = hours(
+        handler.get_history_logs("user_1", "T1", end=datetime(2026, 1, 5, 8, 30))
+    )
+    passed = newest_first == [9, 8, 7] and after == [9] and before == [8, 7]
+    print(
+        f"{'✅' if passed else '❌'} history across naive and aware timestamps: "
+        f"{newest_first}, after 08:30Z {after}, before {before}"
+    )
+    return passed
+
+
+if __name__ == "__main__":
+    results = [
+        test_bulk_retry_after_partial_failure(),
+        test_single_log_resubmit(),
+        test_concurrent_writers(),
+        test_history_mixes_naive_and_aware_timestamps(),
+    ]
+    sys.exit(0 if all(results) else 1)
@@ -0,0 +1,218 @@
+import json
+import pathlib
+import sys
+from decimal import Decimal
+
+sys.path.append(
+    str(pathlib.Path(sys.path[0]).parent)
+)  # Add parent directory to path for imports
+
+import persistence.dynamodb_database as dynamodb_database
+from persistence.dynamodb_database import DynamoDBHandler
+from schemas.core_v2 import Goal, Milestone, Tracker
+
+# DynamoDB stops a Query page once it has read 1 MB
+PAGE_BYTES = 1024 * 1024
+
+
+class PagedTable:
+    """
+    Stand-in for one user's partition: Query returns at most 1 MB (or Limit
+    items) per page, with LastEvaluatedKey set while more items remain.
+    """
+
+    def __init__(self, name, sort_key, items):
+        self.name = name
+        self.sort_key = sort_key
+        self.items = sorted(items, key=lambda item: item[sort_key])
+        self.pages = 0
+
+    def query(self, **kwargs):
+        self.pages += 1
+        start = 0
+        if "ExclusiveStartKey" in kwargs:
+            last = kwargs["ExclusiveStartKey"][self.sort_key]
+            start = next(
+                i for i, item in enumerate(self.items) if item[self.sort_key] > last
+            )
+        page, size = [], 0
+        for item in self.items[start:]:
+            item_size = len(json.dumps(item, default=str))
+            if page and (
+                size + item_size > PAGE_BYTES or len(page) == kwargs.get("Limit")
+            ):
+                break
+            page.append(item)
+            size += item_size
+        response = {"Items": page}
+        if start + len(page) < len(self.items):
+            response["LastEvaluatedKey"] = {
+                "user_id": page[-1]["user_id"],
+                self.sort_key: page[-1][self.sort_key],
+            }
+        return response
+
+
+class ThrottledDynamoDB:
+    """BatchGetItem that only serves `per_call` keys and returns the rest as
+    UnprocessedKeys, the way a throttled table does."""
+
+    def __init__(self, table, per_call):
+        self.table = table
+        self.per_call = per_call
+        self.calls = 0
+
+    def batch_get_item(self, RequestItems):
+        self.calls += 1
+        request = RequestItems[self.table.name]
+        keys = request["Keys"]
+        served, rest = keys[: self.per_call], keys[self.per_call :]
+        by_id = {item[self.table.sort_key]: item for item in self.table.items}
+        response = {
+            "Responses": {
+                self.table.name: [
+                    by_id[k[self.table.sort_key]]
+                    for k in served
+                    if k[self.table.sort_key] in by_id
+                ]
+            },
+            "UnprocessedKeys": {},
+        }
+        if rest:
+            response["UnprocessedKeys"] = {self.table.name: {**request, "Keys": rest}}
+        return response
+
+
+class RecordingSleep:
+    def __init__(self):
+        self.delays = []
+
+    def sleep(self, seconds):
+        self.delays.append(seconds)
+
+
+def make_partition(goals=40, milestones_each=20, trackers_each=2):
+    """A user whose milestones and trackers each span several 1 MB pages."""
+    goal_items, milestone_items, tracker_items = [], [], []
+    padding = "x" * 2000
+    for g in range(goals):
+        goal = Goal(user_id="user_1", what=f"Goal {g}", when="2027", why=padding)
+        goal_items.append(goal.to_db_format())
+        for m in range(milestones_each):
+            milestone = Milestone(
+                user_id="user_1", goal_id=goal.goal_id, statement=f"{m} {padding}"
+            )
+            milestone_items.append(milestone.to_db_format())
+            for _ in range(trackers_each):
+                tracker = Tracker(
+                    user_id="user_1",
+                    milestone_id=milestone.milestone_id,
+                    log_prompt=padding,
+                    unit="km",
+                    aggregation_strategy="SUM",
+                    target_range=(Decimal(5), None),
+                    current_value=Decimal(0),
+                )
+                tracker_items.append(tracker.to_db_format())
+    return goal_items, milestone_items, tracker_items
+
+
+def fake_handler(goal_items, milestone_items, tracker_items) -> DynamoDBHandler:
+    handler = DynamoDBHandler.__new__(DynamoDBHandler)
+    handler.page_size = None
+    handler.cache = None
+    handler.goals_table = PagedTable("Goals", "goal_id", goal_items)
+    handler.milestones_table = PagedTable("Milestones", "milestone_id", milestone_items)
+    handler.trackers_table = PagedTable("Trackers", "tracker_id", tracker_items)
+    return handler
+
+
+def test_full_partition_is_read():
+    goal_items, milestone_items, tracker_items = make_partition()
+    handler = fake_handler(goal_items, milestone_items, tracker_items)
+    tree = handler.get_full_user_state("user_1")
+
+    milestones = [m for g in tree["goals"] for m in g["milestones"]]
+    trackers = [t for m in milestones for t in m["trackers"]]
+    counts = (len(tree["goals"]), len(milestones), len(trackers))
+    expected = (len(goal_items), len(milestone_items), len(tracker_items))
+    pages = (
+        handler.goals_table.pages,
+        handler.milestones_table.pages,
+        handler.trackers_table.pages,
+    )
+    megabytes = sum(len(json.dumps(t, default=str)) for t in tracker_items) / 2**20
+    passed = counts == expected and pages[1] > 1 and pages[2] > 1
+    print(
+        f"{'✅' if passed else '❌'} dashboard read {counts} of {expected} "
+        f"goals/milestones/trackers in {pages} pages "
+        f"(trackers partition {megabytes:.1f} MB)"
+    )
+    return passed
+
+
+def test_page_size_limit():
+    goal_items, milestone_items, tracker_items = make_partition(goals=3)
+    handler = fake_handler(goal_items, milestone_items, tracker_items)
+    handler.page_size = 7
+    goals = handler.get_goals_for_user("user_1")
+    passed = len(goals) == 3 and handler.goals_table.pages == 1
+    milestones = list(handler._iter_by_user(handler.milestones_table, "user_1"))
+    passed = passed and len(milestones) == 60 and handler.milestones_table.pages == 9
+    print(
+        f"{'✅' if passed else '❌'} Limit=7: {len(milestones)} milestones "
+        f"in {handler.milestones_table.pages} pages"
+    )
+    return passed
+
+
+def test_batch_get_retries_unprocessed_keys_with_backoff():
+    _, _, tracker_items = make_partition(goals=5)
+    handler = fake_handler([], [], tracker_items)
+    handler.dynamodb = ThrottledDynamoDB(handler.trackers_table, per_call=30)
+    sleeper = RecordingSleep()
+    real_time = dynamodb_database.time
+    dynamodb_database.time = sleeper
+    try:
+        trackers = handler.get_trackers_batch(
+            ("user_1", t["tracker_id"]) for t in tracker_items
+        )
+        # 200 keys: two requests of 100, each served in 4 calls of 30
+        passed = (
+            len(trackers) == len(tracker_items)
+            and handler.dynamodb.calls == 8
+            and len(sleeper.delays) == 6
+            and all(
+                0 <= d <= dynamodb_database.BATCH_GET_MAX_DELAY for d in sleeper.delays
+            )
+        )
+        print(
+            f"{'✅' if passed else '❌'} BatchGetItem returned {len(trackers)}/"
+            f"{len(tracker_items)} trackers in {handler.dynamodb.calls} calls, "
+            f"{len(sleeper.delays)} backoff sleeps"
+        )
+
+        handler.dynamodb = ThrottledDynamoDB(handler.trackers_table, per_call=0)
+        try:
+            handler.get_trackers_batch([("user_1", tracker_items[0]["tracker_id"])])
+            gave_up = False
+        except RuntimeError:
+            gave_up = True
+        attempts = dynamodb_database.BATCH_GET_MAX_ATTEMPTS
+        gave_up = gave_up and handler.dynamodb.calls == attempts
+        print(
+            f"{'✅' if gave_up else '❌'} a table that never serves the keys "
+            f"raises after {handler.dynamodb.calls} attempts"
+        )
+        return passed and gave_up
+    finally:
+        dynamodb_database.time = real_time
+
+
+if __name__ == "__main__":
+    results = [
+        test_full_partition_is_read(),
+        test_page_size_limit(),
+        test_batch_get_retries_unprocessed_keys_with_backoff(),
+    ]
+    sys.exit(0 if all(results) else 1)
@@ -0,0 +1,127 @@
+import json
+import pathlib
+import sys
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+sys.path.append(
+    str(pathlib.Path(sys.path[0]).parent)
+)  # Add parent directory to path for imports
+
+import llms.openai_api as openai_api
+from llms.response_cache import (
+    SIMILARITY_THRESHOLD,
+    ResponseCache,
+    cosine,
+    ngram_embedding,
+)
+from schemas.comm import GoalFormulatorResponse, OrchestratorResponse
+
+SYSTEM = SystemMessage(content="# GOAL FORMULATOR\nRespond with JSON.")
+
+
+class FakeLLM:
+    """Answers with the goal the last user message asked for."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, context, **kwargs):
+        self.calls += 1
+        what = context[-1].content
+        body = {
+            "intent": "GOAL_FORMATION",
+            "is_complete": True,
+            "goal_details": {"what": what, "why": "health", "when": "March"},
+            "to_user": f"Great, your goal is: {what}",
+        }
+        return AIMessage(content=json.dumps(body), usage_metadata=None)
+
+
+def fresh_cache():
+    cache = ResponseCache(enabled=True, embed=ngram_embedding)
+    openai_api.response_cache = cache
+    return cache
+
+
+def ask(llm, text, response_model=GoalFormulatorResponse):
+    openai_api.get_llm = lambda **kwargs: llm
+    context = [SYSTEM, HumanMessage(content=text)]
+    return openai_api.low_reasoning_gpt5mini_structured(
+        context, response_model, agent="GOAL_FORMULATOR", cacheable=True
+    )
+
+
+def test_near_duplicate_goals_do_not_share_a_reply():
+    pairs = [
+        ("I want to run a 5k by March", "I want to run a 10k by March"),
+        ("lose 10 pounds by June", "lose 20 pounds by June"),
+        ("save 5000 dollars by December", "save 8000 dollars by December"),
+    ]
+    ok = True
+    for first, second in pairs:
+        similarity = cosine(ngram_embedding(first), ngram_embedding(second))
+        fresh_cache()
+        llm = FakeLLM()
+        _, a = ask(llm, first)
+        _, b = ask(llm, second)
+        # Close enough that a plain semantic lookup would reuse the first reply
+        passed = (
+            similarity >= SIMILARITY_THRESHOLD
+            and llm.calls == 2
+            and a.goal_details.what == first
+            and b.goal_details.what == second
+        )
+        print(
+            f"{'✅' if passed else '❌'} {first!r} vs {second!r} "
+            f"(similarity {similarity:.3f}): {llm.calls} LLM calls"
+        )
+        ok = ok and passed
+    return ok
+
+
+def test_exact_repeat_is_served_from_cache():
+    cache = fresh_cache()
+    llm = FakeLLM()
+    ask(llm, "Run a 5k by March")
+    _, parsed = ask(llm, "  run a 5k by march!")
+    passed = (
+        llm.calls == 1
+        and parsed.goal_details.what == "Run a 5k by March"
+        and cache.stats()["hits"] == 1
+    )
+    print(f"{'✅' if passed else '❌'} exact repeat reused: {llm.calls} LLM call")
+    return passed
+
+
+def test_conversational_replies_still_match_semantically():
+    cache = ResponseCache(enabled=True, embed=ngram_embedding)
+    context = [SYSTEM, HumanMessage(content="I want to get fit")]
+    near = [SYSTEM, HumanMessage(content="I want to get fit!!")]
+    nearer = [SYSTEM, HumanMessage(content="i want to get fitter")]
+    reply = AIMessage(content="{}")
+    cache.put("ORCHESTRATOR", context, reply)
+    hit = cache.get("ORCHESTRATOR", nearer) is not None
+    exact_only = cache.get("ORCHESTRATOR", nearer, semantic=False) is None
+    exact = cache.get("ORCHESTRATOR", near, semantic=False) is not None
+    passed = (
+        hit
+        and exact_only
+        and exact
+        and openai_api.allows_semantic_reuse(OrchestratorResponse)
+        and not openai_api.allows_semantic_reuse(GoalFormulatorResponse)
+    )
+    print(
+        f"{'✅' if passed else '❌'} near-duplicate lookup: semantic={hit}, "
+        f"exact-only miss={exact_only}, exact hit={exact}"
+    )
+    return passed
+
+
+if __name__ == "__main__":
+    results = [
+        test_near_duplicate_goals_do_not_share_a_reply(),
+        test_exact_repeat_is_served_from_cache(),
+        test_conversational_replies_still_match_semantically(),
+    ]
+    sys.exit(0 if all(results) else 1)
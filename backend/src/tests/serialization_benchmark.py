@@ -0,0 +1,92 @@
+import pathlib
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+sys.path.append(
+    str(pathlib.Path(sys.path[0]).parent)
+)  # Add parent directory to path for imports
+
+from schemas.core_v2 import Goal, Milestone, Tracker
+from persistence.tracker_aggregation import apply_log
+
+STRATEGIES = ["SUM", "ALL", "MIN", "MAX", "MEAN", "ONE-TIME"]
+
+_serializer = TypeSerializer()
+_deserializer = TypeDeserializer()
+
+
+def as_stored(model) -> dict:
+    """model.to_db_format() as a DynamoDB read returns it (numbers become Decimal)."""
+    item = model.to_db_format()
+    return {
+        k: _deserializer.deserialize(_serializer.serialize(v)) for k, v in item.items()
+    }
+
+
+def make_items(n: int, rng: random.Random):
+    goals, milestones, trackers = [], [], []
+    for i in range(n):
+        goal = Goal(user_id="bench_user", what=f"Goal {i}", when="2027", why="Because")
+        milestone = Milestone(
+            user_id="bench_user",
+            goal_id=goal.goal_id,
+            statement=f"Milestone {i}",
+            depends_on=[milestones[-1]["milestone_id"]] if milestones else [],
+        )
+        tracker = Tracker(
+            user_id="bench_user",
+            milestone_id=milestone.milestone_id,
+            log_prompt="How many pages did you write today?",
+            unit="pages",
+            aggregation_strategy=rng.choice(STRATEGIES),
+            target_range=(rng.choice([None, 1]), rng.choice([None, 10])),
+            window_num_days=rng.choice([None, 1, 7]),
+            num_windows_to_completion=rng.choice([None, 4]),
+        )
+        for day in range(rng.randint(0, 10)):
+            apply_log(
+                tracker, rng.randint(0, 12), datetime(2026, 1, 1) + timedelta(days=day)
+            )
+        goals.append(as_stored(goal))
+        milestones.append(as_stored(milestone))
+        trackers.append(as_stored(tracker))
+    return goals, milestones, trackers
+
+
+def per_item_us(fn, items) -> float:
+    start = time.perf_counter()
+    for item in items:
+        fn(item)
+    return (time.perf_counter() - start) / len(items) * 1e6
+
+
+def run_benchmark(sizes=(1000, 10000), seed=3):
+    rng = random.Random(seed)
+    ok = True
+    for n in sizes:
+        goals, milestones, trackers = make_items(n, rng)
+        print(f"--- {n} items per user (per-item cost, µs) ---")
+        for model, items in [
+            (Goal, goals),
+            (Milestone, milestones),
+            (Tracker, trackers),
+        ]:
+            slow = lambda item: model.from_db_format(item).model_dump(mode="json")
+            mismatches = sum(slow(item) != model.json_from_db(item) for item in items)
+            ok = ok and not mismatches
+            slow_us = per_item_us(slow, items)
+            fast_us = per_item_us(model.json_from_db, items)
+            print(
+                f"{model.__name__:<10} validate+dump {slow_us:7.2f}  "
+                f"json_from_db {fast_us:7.2f}  ({slow_us / fast_us:4.1f}x)  "
+                f"{'✅' if not mismatches else f'❌ {mismatches} mismatches'}"
+            )
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_benchmark() else 1)